@@ -0,0 +1,87 @@
+"""
+Benchmark: compresión zstd de SessionContent.body.
+
+Entrena un diccionario con la mitad de un corpus de exports sintéticos (mismo
+generador que benchmarks.html_normalizer, con sesiones de largo variable) y
+mide sobre la otra mitad el tamaño guardado y la latencia de lectura
+(descompresión por fila) sin comprimir, con zstd y con zstd + diccionario.
+No toca la base de datos.
+
+Uso (desde db_api/):
+    python -m benchmarks.content_compression --documents 400 --level 9
+"""
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+os.environ.setdefault("SECRET_KEY", "bench")
+
+import django
+
+django.setup()
+
+from django.conf import settings
+
+from benchmarks.html_normalizer import build_document
+from fenix.compression import compress_text, decompress_text, save_dictionary, train_dictionary
+
+
+def _corpus(documents: int) -> list[str]:
+    rng = random.Random(0)
+    return [build_document(rng.randint(2, 60), seed) for seed in range(documents)]
+
+
+def _measure(rows: list[str], dict_id: int) -> tuple[int, list[float], list[float]]:
+    stored = 0
+    writes = []
+    reads = []
+    for row in rows:
+        start = time.perf_counter()
+        data = compress_text(row, dict_id)
+        writes.append((time.perf_counter() - start) * 1000)
+        stored += len(data)
+
+        start = time.perf_counter()
+        decompress_text(data)
+        reads.append((time.perf_counter() - start) * 1000)
+    return stored, writes, reads
+
+
+def _report(name: str, raw: int, stored: int, writes: list[float], reads: list[float]) -> None:
+    print(
+        f"{name:<16} {stored / 1024:9.0f} KiB  x{raw / stored:5.1f}   "
+        f"write p50 {statistics.median(writes):6.3f} ms   read p50 {statistics.median(reads):6.3f} ms"
+    )
+
+
+def main(documents: int, level: int, dictionary_size: int) -> None:
+    settings.FENIX_CONTENT_ZSTD_LEVEL = level
+    settings.FENIX_CONTENT_DICTIONARY_DIR = tempfile.mkdtemp()
+
+    corpus = _corpus(documents)
+    training, rows = corpus[::2], corpus[1::2]
+    raw = sum(len(row.encode("utf-8")) for row in rows)
+    print(f"{len(rows)} rows ({raw / len(rows) / 1024:.0f} KiB mean), zstd level {level}, "
+          f"dictionary {dictionary_size / 1024:.0f} KiB trained on {len(training)} documents")
+
+    start = time.perf_counter()
+    dictionary = train_dictionary(training, dictionary_size)
+    save_dictionary(dictionary)
+    print(f"training {time.perf_counter() - start:.1f} s\n")
+
+    print(f"{'text (before)':<16} {raw / 1024:9.0f} KiB")
+    _report("zstd", raw, *_measure(rows, 0))
+    _report("zstd + dict", raw, *_measure(rows, dictionary.dict_id()))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--documents", type=int, default=400)
+    parser.add_argument("--level", type=int, default=9)
+    parser.add_argument("--dictionary-size", type=int, default=112640)
+    args = parser.parse_args()
+    main(args.documents, args.level, args.dictionary_size)
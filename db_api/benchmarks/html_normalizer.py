@@ -0,0 +1,129 @@
+"""
+Benchmark: formateo del HTML de los informes antes de subirlo a S3.
+
+Compara BeautifulSoup(...).prettify() (árbol DOM completo) con el normalizador
+en streaming de fenix.services.html_normalizer: tiempo y pico de memoria por
+documento, bytes que acaban en S3 (indentado vs minificado + gzip) y throughput
+con varios informes a la vez procesados con threads (mismo proceso, GIL) o con
+un pool de procesos. El corpus imita los exports de
+sesión: <style> grande, turnos con markdown renderizado, bloques <pre><code>,
+tablas y listas.
+
+Uso (desde db_api/):
+    python -m benchmarks.html_normalizer --turns 400 --iterations 5 --documents 8
+"""
+import argparse
+import multiprocessing
+import random
+import statistics
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from bs4 import BeautifulSoup
+
+from fenix.services.html_normalizer import encode_report, normalize_html
+
+_STYLE = "".join(
+    f".turn-{i} .msg pre code{{font-family:monospace;padding:{i}px;border:1px solid #ddd}}"
+    for i in range(200)
+)
+
+_CODE = (
+    "def handler(event, context):\n"
+    "    items = [x for x in event['items'] if x['total'] &gt; 0]\n"
+    "    return {'statusCode': 200, 'body': json.dumps(items)}\n"
+)
+
+
+def _turn(i: int, rng: random.Random) -> str:
+    role = "user" if i % 2 == 0 else "assistant"
+    words = " ".join(rng.choice(("refactor", "webhook", "migración", "pagos", "tests", "<b>ok</b>")) for _ in range(40))
+    rows = "".join(
+        f"<tr><td>{j}</td><td><code>src/module_{j}.py</code></td><td>+{rng.randint(1, 90)}</td></tr>"
+        for j in range(rng.randint(0, 6))
+    )
+    return (
+        f'<div class="turn turn-{i % 200} {role}" data-index="{i}">'
+        f'<div class="meta"><span class="role">{role}</span><time>2025-01-01T10:{i % 60:02d}:00Z</time></div>'
+        f'<div class="msg"><p>{words}</p><ul><li>Paso uno &amp; dos</li><li>Paso <em>tres</em></li></ul>'
+        f'<pre><code class="language-python">{_CODE * rng.randint(1, 4)}</code></pre>'
+        f'{f"<table><thead><tr><th>#</th><th>Fichero</th><th>Líneas</th></tr></thead><tbody>{rows}</tbody></table>" if rows else ""}'
+        f'<p>Ver <a href="https://github.com/org/project/pull/{i}">PR #{i}</a><br>siguiente línea</p></div></div>'
+    )
+
+
+def build_document(turns: int, seed: int = 0) -> str:
+    rng = random.Random(seed)
+    body = "".join(_turn(i, rng) for i in range(turns))
+    return (
+        '<!DOCTYPE html><html lang="es"><head><meta charset="utf-8"><title>Sesión</title>'
+        f"<style>{_STYLE}</style></head><body><main>{body}</main>"
+        "<script>document.querySelectorAll('pre').forEach(p => p.dataset.ready = 1 && true)</script>"
+        "</body></html>"
+    )
+
+
+def _prettify(html_content: str) -> str:
+    return BeautifulSoup(html_content, "html.parser").prettify()
+
+
+def _measure(fn, document: str, iterations: int) -> tuple[list[float], int]:
+    timings = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn(document)
+        timings.append((time.perf_counter() - start) * 1000)
+
+    tracemalloc.start()
+    fn(document)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return timings, peak
+
+
+def _report(name: str, timings: list[float], peak: int) -> float:
+    mean = statistics.mean(timings)
+    print(f"{name:<22} mean {mean:9.1f} ms   p50 {statistics.median(timings):9.1f} ms   peak {peak / 2**20:7.1f} MiB")
+    return mean
+
+
+def _throughput(executor, fn, documents: list[str]) -> float:
+    start = time.perf_counter()
+    list(executor.map(fn, documents))
+    return time.perf_counter() - start
+
+
+def main(turns: int, iterations: int, documents: int, workers: int) -> None:
+    document = build_document(turns)
+    assert normalize_html(document) == _prettify(document)
+    print(f"{len(document) / 1024:.0f} KiB document ({turns} turns), {iterations} iterations")
+
+    before = _report("bs4 prettify (before)", *_measure(_prettify, document, iterations))
+    after = _report("streaming (after)", *_measure(normalize_html, document, iterations))
+    print(f"speedup x{before / after:.1f}")
+    _report("minify + gzip (stored)", *_measure(encode_report, document, iterations))
+
+    pretty = len(_prettify(document).encode("utf-8"))
+    stored = len(encode_report(document))
+    print(f"\nS3 object: prettify {pretty / 1024:.0f} KiB -> minified + gzip {stored / 1024:.0f} KiB (x{pretty / stored:.1f} smaller)")
+
+    corpus = [build_document(turns, seed) for seed in range(documents)]
+    print(f"\n{documents} documents, {workers} workers")
+    with ThreadPoolExecutor(workers) as threads:
+        threaded = _throughput(threads, encode_report, corpus)
+    with ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn")) as processes:
+        list(processes.map(encode_report, corpus[:workers]))  # warm-up: arranque de los hijos
+        pooled = _throughput(processes, encode_report, corpus)
+    print(f"{'threads':<22} {threaded:9.2f} s   {documents / threaded:6.1f} docs/s")
+    print(f"{'process pool':<22} {pooled:9.2f} s   {documents / pooled:6.1f} docs/s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=400)
+    parser.add_argument("--iterations", type=int, default=5)
+    parser.add_argument("--documents", type=int, default=8)
+    parser.add_argument("--workers", type=int, default=2)
+    args = parser.parse_args()
+    main(args.turns, args.iterations, args.documents, args.workers)
@@ -0,0 +1,138 @@
+"""
+Benchmark: serialización de un listado grande de sesiones.
+
+Compara el camino anterior (dicts a mano -> validación Pydantic del schema de
+respuesta -> json.dumps con NinjaJSONEncoder) con el actual (UserDicts ->
+trusted_response con orjson, sin revalidar). No toca la base de datos:
+usa instancias del ORM sin guardar.
+
+Uso (desde db_api/):
+    python -m benchmarks.serialization --rows 200 --iterations 300
+"""
+import argparse
+import os
+import statistics
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+os.environ.setdefault("SECRET_KEY", "bench")
+
+import django
+
+django.setup()
+
+from ninja.renderers import JSONRenderer
+
+from fenix.models import Session, User
+from fenix.rendering import UserDicts, trusted_response
+from fenix.schemas import SessionPageOut
+
+
+def _rows(count: int, owners: int) -> list[Session]:
+    now = datetime.now(timezone.utc)
+    users = [
+        User(github_handle=f"user{i}", email=f"user{i}@example.com", display_name=f"User {i}", created_at=now)
+        for i in range(owners)
+    ]
+    return [
+        Session(
+            id=uuid.uuid4(),
+            title=f"Session {i}",
+            description="Refactor del módulo de pagos y migración de webhooks",
+            assistant_type="claude-code",
+            repo="git@github.com:org/project.git",
+            metadata={"branch": "main", "files": i % 7},
+            owner=users[i % owners],
+            is_public=bool(i % 2),
+            report_url=f"https://bucket.s3.amazonaws.com/blobs/{i:064d}.html",
+            report_status="ready",
+            created_at=now - timedelta(seconds=i),
+        )
+        for i in range(count)
+    ]
+
+
+def _before(sessions: list[Session]) -> bytes:
+    items = [
+        {
+            "id": s.id,
+            "title": s.title,
+            "description": s.description,
+            "assistant_type": s.assistant_type,
+            "repo": s.repo,
+            "metadata": s.metadata,
+            "owner": {
+                "github_handle": s.owner.github_handle,
+                "email": s.owner.email,
+                "display_name": s.owner.display_name,
+                "is_active": s.owner.is_active,
+                "created_at": s.owner.created_at
+            },
+            "is_public": s.is_public,
+            "report_url": s.report_url,
+            "report_status": s.report_status,
+            "created_at": s.created_at
+        }
+        for s in sessions
+    ]
+    validated = SessionPageOut.model_validate({"items": items, "next_cursor": None})
+    return JSONRenderer().render(None, validated.model_dump(), response_status=200).encode("utf-8")
+
+
+def _after(sessions: list[Session]) -> bytes:
+    owners = UserDicts()
+    items = [
+        {
+            "id": s.id,
+            "title": s.title,
+            "description": s.description,
+            "assistant_type": s.assistant_type,
+            "repo": s.repo,
+            "metadata": s.metadata,
+            "owner": owners[s.owner],
+            "is_public": s.is_public,
+            "report_url": s.report_url,
+            "report_status": s.report_status,
+            "created_at": s.created_at
+        }
+        for s in sessions
+    ]
+    return trusted_response({"items": items, "next_cursor": None}).content
+
+
+def _measure(fn, sessions: list[Session], iterations: int) -> list[float]:
+    timings = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn(sessions)
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def _report(name: str, timings: list[float], size: int) -> float:
+    mean = statistics.mean(timings)
+    print(f"{name:<28} mean {mean:7.3f} ms   p50 {statistics.median(timings):7.3f} ms   {size / 1024:7.1f} KiB")
+    return mean
+
+
+def main(rows: int, owners: int, iterations: int) -> None:
+    sessions = _rows(rows, owners)
+    print(f"{rows} sessions, {owners} distinct owners, {iterations} iterations")
+
+    for fn in (_before, _after):
+        _measure(fn, sessions, 10)  # warm-up
+
+    before = _report("pydantic + json (before)", _measure(_before, sessions, iterations), len(_before(sessions)))
+    after = _report("trusted + orjson (after)", _measure(_after, sessions, iterations), len(_after(sessions)))
+    print(f"speedup x{before / after:.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=200)
+    parser.add_argument("--owners", type=int, default=10)
+    parser.add_argument("--iterations", type=int, default=300)
+    args = parser.parse_args()
+    main(args.rows, args.owners, args.iterations)
@@ -41,17 +41,23 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'fenix',
 ]
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'fenix.middleware.RequestMetricsMiddleware',
+    # Respuestas con gzip si el cliente lo acepta (httpx siempre lo hace); después de las métricas para medirlo
+    'django.middleware.gzip.GZipMiddleware',
+    'fenix.middleware.RequestDecompressionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'fenix.middleware.ReplicaRoutingMiddleware',
 ]
 
 ROOT_URLCONF = 'config.urls'
@@ -78,17 +84,51 @@ WSGI_APPLICATION = 'config.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.0/ref/settings/#databases
 
+# Conexiones persistentes: cada thread reusa su conexión durante DB_CONN_MAX_AGE segundos
+# en vez de abrir una por request (0 = una por request; en modo ASGI dejar en 0)
+DB_CONN_MAX_AGE = int(os.environ.get('DB_CONN_MAX_AGE', '60'))
+# Antes de reusar una conexión se comprueba que siga viva (descarta las caídas por el servidor/LB)
+DB_CONN_HEALTH_CHECKS = os.environ.get('DB_CONN_HEALTH_CHECKS', 'true').lower() == 'true'
+DB_CONNECT_TIMEOUT = int(os.environ.get('DB_CONNECT_TIMEOUT', '5'))
+
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql',
+        # Backend de postgresql con métricas de conexiones (ver fenix/db y GET /fenix/metrics/db)
+        'ENGINE': 'fenix.db.postgresql',
         'NAME': 'damelo',       # Replace with your database name
         'USER': DB_USER,       # Replace with your database user
         'PASSWORD': DB_PASSWORD,  # Replace with your database password
         'HOST': DB_HOST,          # Set to your PostgreSQL server address
         'PORT': '5432',               # Default port is 5432
+        'CONN_MAX_AGE': DB_CONN_MAX_AGE,
+        'CONN_HEALTH_CHECKS': DB_CONN_HEALTH_CHECKS,
+        'OPTIONS': {
+            'connect_timeout': DB_CONNECT_TIMEOUT,
+        },
     }
 }
 
+# Réplica de lectura opcional: los GET de la API leen de ella (ver fenix/routers.py)
+DB_REPLICA_HOST = os.environ.get('DB_REPLICA_HOST')
+
+if DB_REPLICA_HOST:
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'HOST': DB_REPLICA_HOST,
+        # En tests no se crea otra base en el host de la réplica
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_ROUTERS = ['fenix.routers.ReplicaRouter']
+
+# Alias de DATABASES usado como réplica (None = todo a la primaria)
+FENIX_READ_REPLICA = os.environ.get('FENIX_READ_REPLICA') or ('replica' if DB_REPLICA_HOST else None)
+# Segundos tras una escritura en los que las lecturas de ese usuario van a la primaria
+FENIX_REPLICA_STICKY_SECONDS = int(os.environ.get('FENIX_REPLICA_STICKY_SECONDS', '10'))
+FENIX_REPLICA_STICKY_MAXSIZE = int(os.environ.get('FENIX_REPLICA_STICKY_MAXSIZE', '10000'))
+# Alias de CACHES para compartir la ventana entre procesos (p.ej. 'default' con REDIS_URL)
+FENIX_REPLICA_STICKY_CACHE_BACKEND = os.environ.get('FENIX_REPLICA_STICKY_CACHE_BACKEND') or None
+
 # Password validation
 # https://docs.djangoproject.com/en/5.0/ref/settings/#auth-password-validators
 
@@ -135,4 +175,97 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # MCP AUTHENTICATION
 # ============================================
 
-MCP_API_KEY = os.environ.get('MCP_API_KEY')
\ No newline at end of file
+MCP_API_KEY = os.environ.get('MCP_API_KEY')
+
+
+# ============================================
+# CACHES
+# ============================================
+
+# Sin REDIS_URL cada proceso usa su propia caché en memoria
+REDIS_URL = os.environ.get('REDIS_URL')
+
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+
+# Caché de usuarios autenticados (get_user_from_request)
+FENIX_PRINCIPAL_CACHE_TTL = int(os.environ.get('FENIX_PRINCIPAL_CACHE_TTL', '60'))
+FENIX_PRINCIPAL_CACHE_MAXSIZE = int(os.environ.get('FENIX_PRINCIPAL_CACHE_MAXSIZE', '10000'))
+# Alias de CACHES para compartirla entre procesos (p.ej. 'default' con REDIS_URL); None = LRU por proceso
+FENIX_PRINCIPAL_CACHE_BACKEND = os.environ.get('FENIX_PRINCIPAL_CACHE_BACKEND') or None
+
+# Caché de permisos (rol por equipo y sesiones visibles vía equipos)
+FENIX_ACCESS_CACHE_TTL = int(os.environ.get('FENIX_ACCESS_CACHE_TTL', '30'))
+FENIX_ACCESS_CACHE_MAXSIZE = int(os.environ.get('FENIX_ACCESS_CACHE_MAXSIZE', '10000'))
+FENIX_ACCESS_CACHE_BACKEND = os.environ.get('FENIX_ACCESS_CACHE_BACKEND') or None
+
+
+# ============================================
+# SEARCH
+# ============================================
+
+# Configuración de texto de Postgres para la búsqueda full-text ('simple' no aplica stemming de un idioma)
+FENIX_SEARCH_CONFIG = os.environ.get('FENIX_SEARCH_CONFIG', 'simple')
+
+
+# ============================================
+# ACTIVITY FEED
+# ============================================
+
+# Días que se conservan las entradas del feed (`manage.py prune_activity`)
+FENIX_ACTIVITY_RETENTION_DAYS = int(os.environ.get('FENIX_ACTIVITY_RETENTION_DAYS', '90'))
+
+
+# ============================================
+# REQUEST METRICS
+# ============================================
+
+# Queries por request a partir de las que se loguea un warning
+FENIX_QUERY_BUDGET = int(os.environ.get('FENIX_QUERY_BUDGET', '20'))
+# Veces que una misma query (misma forma, otros parámetros) se repite en una request = posible N+1
+FENIX_QUERY_REPEAT_THRESHOLD = int(os.environ.get('FENIX_QUERY_REPEAT_THRESHOLD', '5'))
+# Token del scraper (Authorization: Bearer ...) para /fenix/metrics y /fenix/metrics/db; sin token quedan cerrados
+FENIX_METRICS_TOKEN = os.environ.get('FENIX_METRICS_TOKEN') or None
+
+
+# ============================================
+# REPORTES HTML
+# ============================================
+
+# Procesos del pool que minifica y comprime el HTML antes de subirlo a S3 (0 = en el propio proceso)
+FENIX_HTML_FORMAT_WORKERS = int(os.environ.get('FENIX_HTML_FORMAT_WORKERS', '2'))
+# Documentos más cortos que esto se procesan sin pasar por el pool
+FENIX_HTML_FORMAT_POOL_MIN_CHARS = int(os.environ.get('FENIX_HTML_FORMAT_POOL_MIN_CHARS', str(256 * 1024)))
+# Segundos máximos de minificado; si se supera se sube el HTML original (comprimido)
+FENIX_HTML_FORMAT_TIMEOUT = float(os.environ.get('FENIX_HTML_FORMAT_TIMEOUT', '60'))
+# ?pretty=true devuelve sin indentar los informes más grandes que esto (caracteres)
+FENIX_REPORT_PRETTY_MAX_CHARS = int(os.environ.get('FENIX_REPORT_PRETTY_MAX_CHARS', str(8 * 1024 * 1024)))
+# Nivel de gzip de los informes en S3: se comprimen una vez y se descargan muchas
+FENIX_REPORT_GZIP_LEVEL = int(os.environ.get('FENIX_REPORT_GZIP_LEVEL', '9'))
+
+
+# ============================================
+# COMPRESIÓN DEL CONTENIDO
+# ============================================
+
+# Nivel de zstd de SessionContent.body
+FENIX_CONTENT_ZSTD_LEVEL = int(os.environ.get('FENIX_CONTENT_ZSTD_LEVEL', '9'))
+# Diccionarios entrenados (<dict_id>.zdict); no borrar uno con el que se comprimieron filas
+FENIX_CONTENT_DICTIONARY_DIR = os.environ.get('FENIX_CONTENT_DICTIONARY_DIR', str(BASE_DIR / 'fenix' / 'dictionaries'))
+# Diccionario para los contenidos nuevos (0 = sin diccionario)
+FENIX_CONTENT_DICTIONARY_ID = int(os.environ.get('FENIX_CONTENT_DICTIONARY_ID', '0'))
+
+
+# ============================================
+# SUBIDAS DIRECTAS A S3
+# ============================================
+
+# Segundos de validez de las URLs prefirmadas de POST /sessions/uploads
+FENIX_DIRECT_UPLOAD_EXPIRES = int(os.environ.get('FENIX_DIRECT_UPLOAD_EXPIRES', '900'))
+# Tamaño máximo de un HTML subido directamente al bucket
+FENIX_DIRECT_UPLOAD_MAX_BYTES = int(os.environ.get('FENIX_DIRECT_UPLOAD_MAX_BYTES', str(50 * 1024 * 1024)))
@@ -1,27 +1,64 @@
 from ninja import NinjaAPI, Router
-from ninja.security import APIKeyHeader
-from django.shortcuts import get_object_or_404
-from django.http import HttpRequest
+from ninja.security import APIKeyHeader, HttpBearer
+from django.shortcuts import get_object_or_404, aget_object_or_404
+from django.http import HttpRequest, HttpResponse, Http404
+from django.db import connections, transaction
 from django.db.models import Q
-from typing import List
+from django.conf import settings
+from datetime import datetime
+from typing import Optional
 from dotenv import load_dotenv
 
+import hmac
 import os
 
-from .models import User, Team, Session, TeamUser, TeamSession
+from .models import User, Team, Session, SessionContent, SessionUploadCheck, TeamUser, TeamSession, ActivityEntry
 from .schemas import (
     UserOut, ValidateOrCreateUserIn, ValidateOrCreateUserOut,
-    TeamOut, TeamCreateIn, TeamDetailOut, TeamAddMemberIn, TeamMemberOut,
-    SessionOut, SessionCreateIn, SessionDetailOut, SessionUpdateIn,
-    ShareSessionWithTeamIn, ShareSessionWithTeamOut, TeamSessionOut,
-    ErrorOut, SuccessOut
+    TeamOut, TeamCreateIn, TeamDetailOut, TeamAddMemberIn, TeamMemberOut, TeamPageOut,
+    SessionOut, SessionCreateIn, SessionDetailFieldsOut, SessionUpdateIn, SessionPageOut, SessionSearchOut,
+    SessionUploadIn, SessionUploadOut, SessionFinalizeIn,
+    ShareSessionWithTeamIn, ShareSessionWithTeamOut, TeamSessionOut, TeamSessionPageOut,
+    SessionBatchGetIn, SessionBatchGetOut, ShareSessionsWithTeamIn, ShareSessionWithTeamsIn, ShareBatchOut,
+    TeamAddMembersIn, MemberBatchOut,
+    ActivityPageOut, ErrorOut, SuccessOut, UploadStateOut
+)
+from .pagination import apaginate, clamp_limit, InvalidCursor
+from .db.instrumentation import db_stats
+from .metrics import endpoint_metrics
+from .rendering import ORJSONRenderer, UserDicts, trusted_response
+from .fieldsets import (
+    SESSION_COLUMNS, SESSION_DETAIL_COLUMNS, InvalidFields, parse_fields, only_session_fields, session_out
+)
+from .repos import normalize_repo_key
+from .services.content_service import get_or_create_content, release_content
+from .services.report_jobs import enqueue_report_upload
+from .services.s3_service import UPLOAD_CONTENT_TYPE, apretty_html, s3_service
+from .services.upload_service import (
+    UploadError, check_uploaded_object, needs_upload, stage_upload, upload_key, validate_sha256, validate_size
+)
+from .services.principal_cache import get_principal, aget_principal
+from .services.access_cache import get_access, aget_access, invalidate_access, invalidate_team_access
+from .services.search_service import search_visible_sessions, update_search_metadata, update_search_vector
+from .services.visibility_service import (
+    visible_via_teams, grant_members, grant_session_to_teams, grant_team_sessions
+)
+from .services.activity_service import (
+    record_member_added, record_members_added, record_session_shared, record_sessions_shared, record_session_updated
 )
-from .services.s3_service import s3_service
 
 load_dotenv()
 
 MCP_API_KEY = os.environ.get('MCP_API_KEY')
 
+# Máximo de items por request en los endpoints batch
+BATCH_MAX_ITEMS = 100
+
+# Roles que se pueden dar al añadir un miembro (owner solo lo tiene quien crea el equipo)
+ASSIGNABLE_ROLES = ('admin', 'member')
+
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
 # ============================================
 # AUTHENTICATION
 # ============================================
@@ -47,6 +84,20 @@ class MCPAuth(APIKeyHeader):
         # Retornar github_handle para que esté disponible en request.auth
         return github_handle
 
+
+class MetricsAuth(HttpBearer):
+    """
+    Autenticación de los endpoints de métricas para el scraper de Prometheus.
+    Token propio (FENIX_METRICS_TOKEN), independiente del API key de MCP y de los usuarios.
+    Sin token configurado no se autentica nadie.
+    """
+
+    def authenticate(self, request: HttpRequest, token: str):
+        expected = settings.FENIX_METRICS_TOKEN
+        if not expected or not hmac.compare_digest(token.encode(), expected.encode()):
+            return None
+        return 'metrics'
+
 # ============================================
 # API INSTANCE
 # ============================================
@@ -54,10 +105,12 @@ class MCPAuth(APIKeyHeader):
 api = NinjaAPI(
     title="Dámelo API",
     version="2.0.0",
-    description="API para compartir sesiones de asistentes de IA - Personal y Teams"
+    description="API para compartir sesiones de asistentes de IA - Personal y Teams",
+    renderer=ORJSONRenderer(),
 )
 
 auth = MCPAuth()
+metrics_auth = MetricsAuth()
 
 
 # ============================================
@@ -66,10 +119,77 @@ auth = MCPAuth()
 
 def get_user_from_request(request: HttpRequest) -> User:
     """
-    Obtiene el objeto User a partir del github_handle en request.auth
+    Obtiene el objeto User a partir del github_handle en request.auth.
+    Usa la caché de principals; solo va a la base de datos en un miss.
     """
-    github_handle = request.auth
-    return get_object_or_404(User, github_handle=github_handle)
+    user = get_principal(request.auth)
+    if user is None:
+        raise Http404("User not found")
+    return user
+
+
+async def aget_user_from_request(request: HttpRequest) -> User:
+    """Versión async de get_user_from_request"""
+    user = await aget_principal(request.auth)
+    if user is None:
+        raise Http404("User not found")
+    return user
+
+
+def attach_session_report(session: Session, content: SessionContent) -> None:
+    """
+    Asigna a la sesión el reporte de su contenido. Si el blob aún no está en S3,
+    encola la subida y la sesión queda en report_status='pending'.
+    Debe llamarse dentro de una transacción.
+    """
+    session.report_url = content.report_url
+    session.report_status = 'ready' if content.report_url else 'pending'
+
+    if not content.report_url:
+        enqueue_report_upload(content)
+
+
+# Columnas de SessionContent para leer el body junto con el estado de su subida directa
+CONTENT_STATE_COLUMNS = ('body', 'report_job__staged_key', 'report_job__status', 'report_job__last_error')
+# Mismo estado para la subida de una sesión que reutiliza un contenido de otros (SessionUploadCheck)
+UPLOAD_CHECK_COLUMNS = ('s3_key', 'status', 'last_error')
+
+
+def upload_state_error(staged_key: Optional[str], job_status: Optional[str], last_error: Optional[str]) -> Optional[dict]:
+    """
+    409 de una subida directa aún sin ingerir (el body está vacío) o sin verificar, o None.
+
+    Con el job o la verificación fallidos (p. ej. el objeto no coincidía con su
+    sha256) no se va a ingerir nunca: hay que volver a subirlo.
+    """
+    if staged_key is None:
+        return None
+    if job_status == 'failed':
+        return {"detail": f"Session content upload failed: {last_error or 'unknown error'}", "upload_status": "failed"}
+    return {"detail": "Session content is still being uploaded; retry later", "upload_status": "pending"}
+
+
+async def asession_body(session: Session) -> tuple[Optional[str], Optional[dict]]:
+    """Body de la sesión, o el 409 si su subida directa aún no se ingirió o no se verificó"""
+    check = await SessionUploadCheck.objects.filter(session_id=session.id).values_list(*UPLOAD_CHECK_COLUMNS).afirst()
+    if check is not None:
+        return None, upload_state_error(*check)
+
+    body, *state = await SessionContent.objects.values_list(*CONTENT_STATE_COLUMNS).aget(id=session.content_id)
+    error = upload_state_error(*state)
+    return (None, error) if error else (body, None)
+
+
+def invalid_role_error(role: str) -> Optional[dict]:
+    """Error 400 si el rol no se puede asignar al añadir un miembro, o None"""
+    if role not in ASSIGNABLE_ROLES:
+        return {"detail": f"Invalid role '{role}': must be one of {', '.join(ASSIGNABLE_ROLES)}"}
+    return None
+
+
+def unique_batch(items: list) -> list:
+    """Quita duplicados de una lista de IDs/handles de un batch, conservando el orden"""
+    return list(dict.fromkeys(items))
 
 
 # ============================================
@@ -88,12 +208,18 @@ def validate_or_create_user(request, payload: ValidateOrCreateUserIn):
     # Verificar si el usuario ya existe
     try:
         user = User.objects.get(github_handle=github_handle)
-        # Usuario existe, actualizamos datos si vienen en el payload
-        if payload.email:
+        # Usuario existe, actualizamos solo los datos que vienen en el payload y cambiaron
+        changed_fields = []
+        if payload.email and payload.email != user.email:
             user.email = payload.email
-        if payload.display_name:
+            changed_fields.append('email')
+        if payload.display_name and payload.display_name != user.display_name:
             user.display_name = payload.display_name
-        user.save()
+            changed_fields.append('display_name')
+
+        # Sin cambios no hay escritura (los reconnects no generan tráfico de escritura)
+        if changed_fields:
+            user.save(update_fields=changed_fields + ['updated_at'])
 
         return 200, {
             "github_handle": user.github_handle,
@@ -126,9 +252,9 @@ def validate_or_create_user(request, payload: ValidateOrCreateUserIn):
 # ============================================
 
 @api.get("/users/me", auth=auth, response=UserOut, tags=["Users"])
-def get_current_user(request):
+async def get_current_user(request):
     """Obtener información del usuario autenticado"""
-    user = get_user_from_request(request)
+    user = await aget_user_from_request(request)
     return {
         "github_handle": user.github_handle,
         "email": user.email,
@@ -176,47 +302,50 @@ def create_team(request, payload: TeamCreateIn):
     }
 
 
-@api.get("/teams", auth=auth, response=List[TeamOut], tags=["Teams"])
-def list_teams(request):
-    """Listar equipos del usuario"""
-    user = get_user_from_request(request)
+@api.get("/teams", auth=auth, response={200: TeamPageOut, 400: ErrorOut}, tags=["Teams"])
+async def list_teams(request, cursor: Optional[str] = None, limit: Optional[int] = None):
+    """Listar equipos del usuario (paginado por cursor)"""
+    user = await aget_user_from_request(request)
 
     # Obtener equipos donde el usuario es miembro
     teams = Team.objects.filter(
         team_users__user=user
     ).select_related('owner').distinct()
 
-    return [
+    try:
+        teams, next_cursor = await apaginate(teams, cursor, limit)
+    except InvalidCursor:
+        return 400, {"detail": "Invalid cursor"}
+
+    owners = UserDicts()
+    items = [
         {
             "id": team.id,
             "name": team.name,
             "description": team.description,
-            "owner": {
-                "github_handle": team.owner.github_handle,
-                "email": team.owner.email,
-                "display_name": team.owner.display_name,
-                "is_active": team.owner.is_active,
-                "created_at": team.owner.created_at
-            },
+            "owner": owners[team.owner],
             "created_at": team.created_at
         }
         for team in teams
     ]
 
+    return trusted_response({"items": items, "next_cursor": next_cursor})
+
 
 @api.get("/teams/{team_id}", auth=auth, response={200: TeamDetailOut, 403: ErrorOut, 404: ErrorOut}, tags=["Teams"])
-def get_team(request, team_id: str):
+async def get_team(request, team_id: str):
     """Obtener detalles de un equipo"""
-    user = get_user_from_request(request)
+    user = await aget_user_from_request(request)
 
-    team = get_object_or_404(Team, id=team_id)
+    team = await aget_object_or_404(Team.objects.select_related('owner'), id=team_id)
 
     # Verificar que el usuario es miembro del equipo
-    if not TeamUser.objects.filter(team=team, user=user).exists():
+    access = await aget_access(user.github_handle)
+    if not access.is_member(team.id):
         return 403, {"detail": "You are not a member of this team"}
 
     # Obtener miembros del equipo
-    members = TeamUser.objects.filter(team=team).select_related('user')
+    members = [member async for member in TeamUser.objects.filter(team=team).select_related('user')]
 
     return {
         "id": team.id,
@@ -256,10 +385,13 @@ def add_team_member(request, team_id: str, payload: TeamAddMemberIn):
     team = get_object_or_404(Team, id=team_id)
 
     # Verificar que el usuario es owner o admin del equipo
-    membership = TeamUser.objects.filter(team=team, user=user).first()
-    if not membership or membership.role not in ['owner', 'admin']:
+    if not get_access(user.github_handle).is_team_admin(team.id):
         return 403, {"detail": "Only owners and admins can add members"}
 
+    error = invalid_role_error(payload.role)
+    if error:
+        return 400, error
+
     # Buscar usuario a añadir
     try:
         new_member = User.objects.get(github_handle=payload.github_handle)
@@ -270,12 +402,14 @@ def add_team_member(request, team_id: str, payload: TeamAddMemberIn):
     if TeamUser.objects.filter(team=team, user=new_member).exists():
         return 400, {"detail": f"@{payload.github_handle} is already a member"}
 
-    # Añadir miembro
-    TeamUser.objects.create(
-        team=team,
-        user=new_member,
-        role=payload.role
-    )
+    # Añadir miembro y avisar al equipo en su feed
+    with transaction.atomic():
+        TeamUser.objects.create(
+            team=team,
+            user=new_member,
+            role=payload.role
+        )
+        record_member_added(team, new_member, actor=user)
 
     return 201, {
         "success": True,
@@ -283,6 +417,59 @@ def add_team_member(request, team_id: str, payload: TeamAddMemberIn):
     }
 
 
+@api.post("/teams/{team_id}/members/batch", auth=auth, response={200: MemberBatchOut, 400: ErrorOut, 403: ErrorOut, 404: ErrorOut}, tags=["Teams"])
+def add_team_members(request, team_id: str, payload: TeamAddMembersIn):
+    """Añadir varios miembros a un equipo; devuelve el resultado de cada uno"""
+    user = get_user_from_request(request)
+
+    team = get_object_or_404(Team, id=team_id)
+
+    if not get_access(user.github_handle).is_team_admin(team.id):
+        return 403, {"detail": "Only owners and admins can add members"}
+
+    if len(payload.members) > BATCH_MAX_ITEMS:
+        return 400, {"detail": f"At most {BATCH_MAX_ITEMS} members per request"}
+
+    # Mismas reglas que el alta individual; un handle repetido sería ambiguo (¿qué rol gana?)
+    roles = {}
+    for member in payload.members:
+        error = invalid_role_error(member.role)
+        if error:
+            return 400, error
+        if member.github_handle in roles:
+            return 400, {"detail": f"@{member.github_handle} appears more than once"}
+        roles[member.github_handle] = member.role
+    handles = list(roles)
+
+    users = User.objects.in_bulk(handles)
+    existing = set(TeamUser.objects.filter(team=team, user_id__in=handles).values_list('user_id', flat=True))
+    to_add = [users[h] for h in handles if h in users and h not in existing]
+
+    if to_add:
+        with transaction.atomic():
+            # ignore_conflicts: un alta concurrente del mismo miembro no hace fallar el batch
+            TeamUser.objects.bulk_create(
+                [TeamUser(team=team, user=new_member, role=roles[new_member.github_handle]) for new_member in to_add],
+                ignore_conflicts=True,
+            )
+            # bulk_create no dispara signals: visibilidad, permisos y feed a mano
+            grant_members(team.id, [m.github_handle for m in to_add])
+            for new_member in to_add:
+                invalidate_access(new_member.github_handle)
+            record_members_added(team, to_add, actor=user)
+
+    results = []
+    for handle in handles:
+        if handle not in users:
+            results.append({"github_handle": handle, "status": "not_found"})
+        elif handle in existing:
+            results.append({"github_handle": handle, "status": "already_member"})
+        else:
+            results.append({"github_handle": handle, "status": "added", "role": roles[handle]})
+
+    return {"added": len(to_add), "results": results}
+
+
 @api.delete("/teams/{team_id}/members/{github_handle}", auth=auth, response={200: SuccessOut, 403: ErrorOut, 404: ErrorOut}, tags=["Teams"])
 def remove_team_member(request, team_id: str, github_handle: str):
     """Remover miembro de un equipo"""
@@ -291,8 +478,7 @@ def remove_team_member(request, team_id: str, github_handle: str):
     team = get_object_or_404(Team, id=team_id)
 
     # Verificar que el usuario es owner o admin del equipo
-    membership = TeamUser.objects.filter(team=team, user=user).first()
-    if not membership or membership.role not in ['owner', 'admin']:
+    if not get_access(user.github_handle).is_team_admin(team.id):
         return 403, {"detail": "Only owners and admins can remove members"}
 
     # Buscar miembro a remover
@@ -316,32 +502,27 @@ def remove_team_member(request, team_id: str, github_handle: str):
 
 @api.post("/sessions", auth=auth, response={201: SessionOut, 400: ErrorOut}, tags=["Sessions"])
 def create_session(request, payload: SessionCreateIn):
-    """Crear una nueva sesión y subir session_data a S3"""
+    """
+    Crear una nueva sesión. La subida del reporte a S3 se encola y la hace el worker;
+    el cliente puede consultar report_status. Si el contenido ya estaba subido, no se encola nada.
+    """
     user = get_user_from_request(request)
 
-    # Crear sesión primero para obtener el ID real
-    session = Session.objects.create(
-        title=payload.title,
-        description=payload.description,
-        session_data=payload.session_data,
-        assistant_type=payload.assistant_type,
-        repo=payload.repo,
-        metadata=payload.metadata or {},
-        owner=user,
-        is_public=payload.is_public
-    )
-
-    # Subir session_data a S3 como archivo .md
-    report_url = s3_service.upload_session_report(
-        session_id=str(session.id),
-        content=payload.session_data,
-        github_handle=user.github_handle
-    )
-
-    # Actualizar sesión con la URL del reporte
-    if report_url:
-        session.report_url = report_url
+    with transaction.atomic():
+        content, _ = get_or_create_content(payload.session_data)
+        session = Session(
+            title=payload.title,
+            description=payload.description,
+            content=content,
+            assistant_type=payload.assistant_type,
+            repo=payload.repo,
+            metadata=payload.metadata or {},
+            owner=user,
+            is_public=payload.is_public
+        )
+        attach_session_report(session, content)
         session.save()
+        update_search_vector(session, content.body)
 
     return 201, {
         "id": session.id,
@@ -359,128 +540,369 @@ def create_session(request, payload: SessionCreateIn):
         },
         "is_public": session.is_public,
         "report_url": session.report_url,
+        "report_status": session.report_status,
         "created_at": session.created_at
     }
 
 
-@api.get("/sessions", auth=auth, response=List[SessionOut], tags=["Sessions"])
-def list_sessions(request, assistant_type: str = None):
-    """Listar sesiones del usuario"""
+@api.post("/sessions/uploads", auth=auth, response={200: SessionUploadOut, 400: ErrorOut}, tags=["Sessions"])
+def create_session_upload(request, payload: SessionUploadIn):
+    """
+    Subida directa, paso 1: URL prefirmada para subir el HTML (normalizado) al bucket.
+    Si el usuario ya tiene una sesión con ese contenido no hace falta subir nada.
+    """
     user = get_user_from_request(request)
 
+    try:
+        validate_sha256(payload.sha256)
+        validate_size(payload.size)
+    except UploadError as e:
+        return 400, {"detail": str(e)}
+
+    if not needs_upload(payload.sha256, user.github_handle):
+        return {"upload_required": False}
+
+    key = upload_key(user.github_handle)
+    return {
+        "upload_required": True,
+        "key": key,
+        "url": s3_service.presign_upload(key),
+        "headers": {"Content-Type": UPLOAD_CONTENT_TYPE},
+        "expires_in": settings.FENIX_DIRECT_UPLOAD_EXPIRES
+    }
+
+
+@api.post("/sessions/uploads/finalize", auth=auth, response={201: SessionOut, 400: ErrorOut}, tags=["Sessions"])
+def finalize_session_upload(request, payload: SessionFinalizeIn):
+    """
+    Subida directa, paso 2: crea la sesión con el HTML ya subido (key + sha256).
+    El worker de informes lo ingiere; hasta entonces GET /sessions/{id} responde 409 con
+    upload_status 'pending' (o 'failed' si el objeto no coincidía con el sha256).
+    """
+    user = get_user_from_request(request)
+
+    try:
+        validate_sha256(payload.sha256)
+        if payload.key:
+            check_uploaded_object(user.github_handle, payload.key)
+
+        with transaction.atomic():
+            content, staged, check_key = stage_upload(payload.sha256, payload.key, user.github_handle)
+            session = Session(
+                title=payload.title,
+                description=payload.description,
+                content=content,
+                assistant_type=payload.assistant_type,
+                repo=payload.repo,
+                metadata=payload.metadata or {},
+                owner=user,
+                is_public=payload.is_public
+            )
+            if check_key:
+                # Contenido de otros: ni body, ni informe, ni índice hasta que el worker verifique la subida
+                session.save()
+                SessionUploadCheck.objects.create(session=session, s3_key=check_key)
+            else:
+                attach_session_report(session, content)
+                session.save()
+                if not staged:
+                    update_search_vector(session, content.body)
+    except UploadError as e:
+        return 400, {"detail": str(e)}
+
+    return 201, session_out(session, UserDicts())
+
+
+@api.get("/sessions", auth=auth, response={200: SessionPageOut, 400: ErrorOut}, exclude_unset=True, tags=["Sessions"])
+async def list_sessions(
+    request,
+    assistant_type: str = None,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = None,
+    fields: Optional[str] = None
+):
+    """Listar sesiones del usuario (paginado por cursor; `fields` limita los campos devueltos)"""
+    user = await aget_user_from_request(request)
+
+    try:
+        selected = parse_fields(fields, SESSION_COLUMNS)
+    except InvalidFields as e:
+        return 400, {"detail": str(e)}
+
     # Sesiones propias del usuario
     sessions = Session.objects.filter(owner=user)
 
     if assistant_type:
         sessions = sessions.filter(assistant_type=assistant_type)
 
-    sessions = sessions.select_related('owner').order_by('-created_at')
+    sessions = only_session_fields(sessions.for_listing(), selected)
 
-    return [
-        {
-            "id": s.id,
-            "title": s.title,
-            "description": s.description,
-            "assistant_type": s.assistant_type,
-            "repo": s.repo,
-            "metadata": s.metadata,
-            "owner": {
-                "github_handle": s.owner.github_handle,
-                "email": s.owner.email,
-                "display_name": s.owner.display_name,
-                "is_active": s.owner.is_active,
-                "created_at": s.owner.created_at
-            },
-            "is_public": s.is_public,
-            "report_url": s.report_url,
-            "created_at": s.created_at
-        }
-        for s in sessions
-    ]
+    try:
+        sessions, next_cursor = await apaginate(sessions, cursor, limit)
+    except InvalidCursor:
+        return 400, {"detail": "Invalid cursor"}
 
+    owners = UserDicts()
+    items = [session_out(s, owners, selected) for s in sessions]
+
+    return trusted_response({"items": items, "next_cursor": next_cursor})
 
-@api.get("/sessions/by-repo", auth=auth, response={200: List[SessionOut], 400: ErrorOut}, tags=["Sessions"])
-def list_sessions_by_repo(request, repo: str):
-    """Listar sesiones de un repo compartidas en equipos del usuario"""
-    user = get_user_from_request(request)
 
-    if not repo:
+@api.get("/sessions/by-repo", auth=auth, response={200: SessionPageOut, 400: ErrorOut}, exclude_unset=True, tags=["Sessions"])
+async def list_sessions_by_repo(
+    request,
+    repo: str,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = None,
+    fields: Optional[str] = None
+):
+    """Listar sesiones de un repo compartidas en equipos del usuario (paginado por cursor)"""
+    user = await aget_user_from_request(request)
+
+    try:
+        selected = parse_fields(fields, SESSION_COLUMNS)
+    except InvalidFields as e:
+        return 400, {"detail": str(e)}
+
+    repo_key = normalize_repo_key(repo)
+    if not repo_key:
         return 400, {"detail": "repo parameter is required"}
 
-    # Obtener equipos del usuario
-    user_teams = Team.objects.filter(team_users__user=user)
+    # Sesiones del repo (en cualquier forma: owner/repo, HTTPS, SSH...) compartidas con
+    # algún equipo del usuario: un rango del índice (user, repo_key, created_at) de SessionVisibility
+    rows = visible_via_teams(user.github_handle, repo_key).select_related('session__owner')
+    rows = only_session_fields(rows, selected, prefix='session__', extra=('created_at', 'session'))
 
-    # Buscar sesiones:
-    # 1. Que tengan el repo especificado
-    # 2. Que estén compartidas con algún equipo del usuario
-    sessions = Session.objects.filter(
-        repo=repo,
-        shared_with_teams__team__in=user_teams
-    ).select_related('owner').distinct().order_by('-created_at')
+    try:
+        rows, next_cursor = await apaginate(rows, cursor, limit, id_field='session_id')
+    except InvalidCursor:
+        return 400, {"detail": "Invalid cursor"}
+    sessions = [row.session for row in rows]
 
-    return [
-        {
-            "id": s.id,
-            "title": s.title,
-            "description": s.description,
-            "assistant_type": s.assistant_type,
-            "repo": s.repo,
-            "metadata": s.metadata,
-            "owner": {
-                "github_handle": s.owner.github_handle,
-                "email": s.owner.email,
-                "display_name": s.owner.display_name,
-                "is_active": s.owner.is_active,
-                "created_at": s.owner.created_at
-            },
-            "is_public": s.is_public,
-            "report_url": s.report_url,
-            "created_at": s.created_at
-        }
-        for s in sessions
-    ]
+    owners = UserDicts()
+    items = [session_out(s, owners, selected) for s in sessions]
+
+    return trusted_response({"items": items, "next_cursor": next_cursor})
+
+
+@api.get("/sessions/search", auth=auth, response={200: SessionSearchOut, 400: ErrorOut}, exclude_unset=True, tags=["Sessions"])
+async def search_sessions(request, q: str, limit: Optional[int] = None, fields: Optional[str] = None):
+    """
+    Buscar sesiones por texto (título, descripción y contenido), ordenadas por relevancia.
+    Solo devuelve sesiones que el usuario puede abrir: propias, públicas o compartidas con sus equipos.
+    """
+    user = await aget_user_from_request(request)
 
+    q = q.strip()
+    if not q:
+        return 400, {"detail": "q parameter is required"}
 
-@api.get("/sessions/{session_id}", auth=auth, response={200: SessionDetailOut, 403: ErrorOut, 404: ErrorOut}, tags=["Sessions"])
-def get_session(request, session_id: str):
-    """Obtener detalles completos de una sesión"""
+    try:
+        selected = parse_fields(fields, SESSION_COLUMNS)
+    except InvalidFields as e:
+        return 400, {"detail": str(e)}
+
+    sessions = only_session_fields(search_visible_sessions(user, q), selected)[:clamp_limit(limit)]
+
+    owners = UserDicts()
+    items = [session_out(s, owners, selected) async for s in sessions]
+
+    return trusted_response({"items": items})
+
+
+@api.post("/sessions/batch-get", auth=auth, response={200: SessionBatchGetOut, 400: ErrorOut}, tags=["Sessions"])
+async def get_sessions_batch(request, payload: SessionBatchGetIn):
+    """
+    Obtener varias sesiones completas por ID (mismas reglas de acceso que get_session).
+
+    Las de subida directa aún sin ingerir vienen con status upload_pending o upload_failed.
+    """
+    user = await aget_user_from_request(request)
+
+    session_ids = unique_batch(payload.session_ids)
+    if len(session_ids) > BATCH_MAX_ITEMS:
+        return 400, {"detail": f"At most {BATCH_MAX_ITEMS} sessions per request"}
+
+    sessions = {s.id: s async for s in Session.objects.select_related('owner').filter(id__in=session_ids)}
+    access = await aget_access(user.github_handle)
+    allowed = {
+        s.id for s in sessions.values()
+        if s.owner == user or s.is_public or access.can_see_via_team(s.id)
+    }
+
+    # Sesiones con un contenido de otros cuya subida aún no se verificó: no ven el body
+    checks = SessionUploadCheck.objects.filter(session_id__in=allowed).values_list('session_id', *UPLOAD_CHECK_COLUMNS)
+    unverified = {session_id: upload_state_error(*state) async for session_id, *state in checks}
+
+    # Un solo SELECT de cuerpos, y solo de las sesiones permitidas
+    content_ids = {sessions[session_id].content_id for session_id in allowed if session_id not in unverified}
+    bodies = {}
+    upload_states = {}
+    contents = SessionContent.objects.filter(id__in=content_ids).values_list('id', *CONTENT_STATE_COLUMNS)
+    async for content_id, body, *state in contents:
+        error = upload_state_error(*state)
+        if error:
+            upload_states[content_id] = f"upload_{error['upload_status']}"
+        else:
+            bodies[content_id] = body
+
+    owners = UserDicts()
+    results = []
+    for session_id in session_ids:
+        session = sessions.get(session_id)
+        if session is None:
+            results.append({"session_id": session_id, "status": "not_found"})
+            continue
+        if session_id not in allowed:
+            results.append({"session_id": session_id, "status": "forbidden"})
+            continue
+        if session_id in unverified:
+            results.append({"session_id": session_id, "status": f"upload_{unverified[session_id]['upload_status']}"})
+            continue
+        if session.content_id in upload_states:
+            results.append({"session_id": session_id, "status": upload_states[session.content_id]})
+            continue
+
+        results.append({
+            "session_id": session_id,
+            "status": "ok",
+            "session": {
+                "id": session.id,
+                "title": session.title,
+                "description": session.description,
+                "session_data": bodies[session.content_id],
+                "assistant_type": session.assistant_type,
+                "repo": session.repo,
+                "metadata": session.metadata,
+                "owner": owners[session.owner],
+                "is_public": session.is_public,
+                "report_url": session.report_url,
+                "report_status": session.report_status,
+                "created_at": session.created_at,
+                "updated_at": session.updated_at
+            }
+        })
+
+    return trusted_response({"results": results})
+
+
+@api.post("/sessions/{session_id}/teams", auth=auth, response={200: ShareBatchOut, 400: ErrorOut, 403: ErrorOut, 404: ErrorOut}, tags=["Team Sessions"])
+def share_session_with_teams(request, session_id: str, payload: ShareSessionWithTeamsIn):
+    """Compartir una sesión propia con varios equipos; devuelve el resultado de cada uno"""
     user = get_user_from_request(request)
 
-    session = get_object_or_404(Session, id=session_id)
+    session = get_object_or_404(Session.objects.for_listing(), id=session_id)
+
+    if session.owner != user:
+        return 403, {"detail": "You can only share your own sessions"}
+
+    team_ids = unique_batch(payload.team_ids)
+    if len(team_ids) > BATCH_MAX_ITEMS:
+        return 400, {"detail": f"At most {BATCH_MAX_ITEMS} teams per request"}
+
+    teams = Team.objects.in_bulk(team_ids)
+    access = get_access(user.github_handle)
+    already = set(TeamSession.objects.filter(session=session, team_id__in=team_ids).values_list('team_id', flat=True))
+    to_share = [teams[t] for t in team_ids if t in teams and access.is_member(t) and t not in already]
+
+    if to_share:
+        with transaction.atomic():
+            TeamSession.objects.bulk_create(
+                [TeamSession(team=team, session=session) for team in to_share],
+                ignore_conflicts=True,
+            )
+            # bulk_create no dispara signals: visibilidad, permisos y feed a mano
+            grant_session_to_teams(session.id, [team.id for team in to_share])
+            for team in to_share:
+                invalidate_team_access(team.id)
+                record_session_shared(team, session, actor=user)
+
+    results = []
+    for team_id in team_ids:
+        if team_id not in teams:
+            status = "not_found"
+        elif not access.is_member(team_id):
+            status = "forbidden"
+        elif team_id in already:
+            status = "already_shared"
+        else:
+            status = "shared"
+        results.append({"team_id": team_id, "session_id": session.id, "status": status})
+
+    return {"shared": len(to_share), "results": results}
+
+
+@api.get("/sessions/{session_id}", auth=auth, response={200: SessionDetailFieldsOut, 400: ErrorOut, 403: ErrorOut, 404: ErrorOut, 409: UploadStateOut}, exclude_unset=True, tags=["Sessions"])
+async def get_session(request, session_id: str, fields: Optional[str] = None):
+    """Obtener detalles completos de una sesión (`fields` limita los campos devueltos)"""
+    user = await aget_user_from_request(request)
+
+    try:
+        selected = parse_fields(fields, SESSION_DETAIL_COLUMNS)
+    except InvalidFields as e:
+        return 400, {"detail": str(e)}
+
+    sessions = only_session_fields(
+        Session.objects.select_related('owner'), selected, extra=('is_public',), columns=SESSION_DETAIL_COLUMNS
+    )
+    session = await aget_object_or_404(sessions, id=session_id)
 
     # Verificar acceso: owner, sesión pública, o miembro de equipo con acceso
     has_access = (
-        session.owner == user or
+        session.owner_id == user.github_handle or
         session.is_public or
-        TeamSession.objects.filter(
-            session=session,
-            team__team_users__user=user
-        ).exists()
+        (await aget_access(user.github_handle)).can_see_via_team(session.id)
     )
 
     if not has_access:
         return 403, {"detail": "You don't have access to this session"}
 
-    return {
-        "id": session.id,
-        "title": session.title,
-        "description": session.description,
-        "session_data": session.session_data,
-        "assistant_type": session.assistant_type,
-        "repo": session.repo,
-        "metadata": session.metadata,
-        "owner": {
-            "github_handle": session.owner.github_handle,
-            "email": session.owner.email,
-            "display_name": session.owner.display_name,
-            "is_active": session.owner.is_active,
-            "created_at": session.owner.created_at
-        },
-        "is_public": session.is_public,
-        "report_url": session.report_url,
-        "created_at": session.created_at,
-        "updated_at": session.updated_at
-    }
+    if selected is None:
+        selected = tuple(SESSION_DETAIL_COLUMNS)
+
+    data = session_out(session, UserDicts(), tuple(f for f in selected if f in SESSION_COLUMNS))
+
+    # El contenido solo se lee una vez verificado el acceso, y solo si se pidió
+    if "session_data" in selected:
+        body, error = await asession_body(session)
+        if error:
+            return 409, error
+        data["session_data"] = body
+    if "updated_at" in selected:
+        data["updated_at"] = session.updated_at
+
+    return trusted_response(data)
+
+
+@api.get("/sessions/{session_id}/report", auth=auth, response={403: ErrorOut, 404: ErrorOut, 409: UploadStateOut}, tags=["Sessions"])
+async def get_session_report(request, session_id: str, pretty: bool = False):
+    """
+    HTML del informe leído de la base de datos.
+
+    En S3 se guarda minificado; `pretty=true` lo devuelve indentado para leerlo
+    (fuera del thread de la petición; los muy grandes se devuelven sin indentar).
+    """
+    user = await aget_user_from_request(request)
+
+    session = await aget_object_or_404(Session.objects.only('id', 'owner_id', 'is_public', 'content_id'), id=session_id)
+
+    has_access = (
+        session.owner_id == user.github_handle or
+        session.is_public or
+        (await aget_access(user.github_handle)).can_see_via_team(session.id)
+    )
+
+    if not has_access:
+        return 403, {"detail": "You don't have access to this session"}
+
+    body, error = await asession_body(session)
+    if error:
+        return 409, error
+
+    if pretty:
+        body = await apretty_html(body)
+
+    return HttpResponse(body, content_type='text/html; charset=utf-8')
 
 
 @api.patch("/sessions/{session_id}", auth=auth, response={200: SessionOut, 403: ErrorOut, 404: ErrorOut}, tags=["Sessions"])
@@ -494,21 +916,46 @@ def update_session(request, session_id: str, payload: SessionUpdateIn):
     if session.owner != user:
         return 403, {"detail": "Only the owner can update this session"}
 
-    # Actualizar campos si están presentes
-    if payload.title is not None:
-        session.title = payload.title
-    if payload.description is not None:
-        session.description = payload.description
-    if payload.session_data is not None:
-        session.session_data = payload.session_data
-    if payload.repo is not None:
-        session.repo = payload.repo
-    if payload.metadata is not None:
-        session.metadata = payload.metadata
-    if payload.is_public is not None:
-        session.is_public = payload.is_public
-
-    session.save()
+    # Actualizar solo los campos presentes que cambian
+    changed_fields = []
+    for field in ('title', 'description', 'repo', 'metadata', 'is_public'):
+        value = getattr(payload, field)
+        if value is not None and value != getattr(session, field):
+            setattr(session, field, value)
+            changed_fields.append(field)
+
+    previous_content_id = session.content_id
+
+    with transaction.atomic():
+        if payload.session_data is not None:
+            content, _ = get_or_create_content(payload.session_data)
+            if content.id != previous_content_id:
+                session.content = content
+                attach_session_report(session, content)
+                changed_fields.append('session_data')
+
+        # Sin cambios no hay escritura, ni reindexado, ni entrada en el feed
+        if changed_fields:
+            session.save()
+
+            # Una subida sin verificar deja de importar si cambia el contenido; si no, la
+            # sesión sigue sin ver el body y no se indexa
+            check_key = SessionUploadCheck.objects.filter(session=session).values_list('s3_key', flat=True).first()
+            if check_key and 'session_data' in changed_fields:
+                SessionUploadCheck.objects.filter(session=session).delete()
+                transaction.on_commit(lambda: s3_service.delete_upload(check_key))
+
+            # Reindexar solo si cambió algo de lo que se busca; el cuerpo solo se lee si es nuevo
+            if 'session_data' in changed_fields:
+                update_search_vector(session, session.content.body)
+            elif ('title' in changed_fields or 'description' in changed_fields) and not check_key:
+                if not update_search_metadata(session):
+                    update_search_vector(session, session.content.body)
+
+            record_session_updated(session, actor=user, changed_fields=changed_fields)
+
+    if session.content_id != previous_content_id:
+        release_content(previous_content_id)
 
     return {
         "id": session.id,
@@ -526,6 +973,7 @@ def update_session(request, session_id: str, payload: SessionUpdateIn):
         },
         "is_public": session.is_public,
         "report_url": session.report_url,
+        "report_status": session.report_status,
         "created_at": session.created_at
     }
 
@@ -559,10 +1007,10 @@ def share_session_with_team(request, team_id: str, payload: ShareSessionWithTeam
     user = get_user_from_request(request)
 
     team = get_object_or_404(Team, id=team_id)
-    session = get_object_or_404(Session, id=payload.session_id)
+    session = get_object_or_404(Session.objects.for_listing(), id=payload.session_id)
 
     # Verificar que el usuario es miembro del equipo
-    if not TeamUser.objects.filter(team=team, user=user).exists():
+    if not get_access(user.github_handle).is_member(team.id):
         return 403, {"detail": "You are not a member of this team"}
 
     # Verificar que el usuario es el dueño de la sesión
@@ -573,11 +1021,13 @@ def share_session_with_team(request, team_id: str, payload: ShareSessionWithTeam
     if TeamSession.objects.filter(team=team, session=session).exists():
         return 400, {"detail": "Session already shared with this team"}
 
-    # Compartir sesión
-    TeamSession.objects.create(
-        team=team,
-        session=session
-    )
+    # Compartir sesión y avisar al equipo en su feed
+    with transaction.atomic():
+        TeamSession.objects.create(
+            team=team,
+            session=session
+        )
+        record_session_shared(team, session, actor=user)
 
     return 201, {
         "success": True,
@@ -587,45 +1037,97 @@ def share_session_with_team(request, team_id: str, payload: ShareSessionWithTeam
     }
 
 
-@api.get("/teams/{team_id}/sessions", auth=auth, response={200: List[TeamSessionOut], 403: ErrorOut, 404: ErrorOut}, tags=["Team Sessions"])
-def list_team_sessions(request, team_id: str):
-    """Listar sesiones compartidas con un equipo"""
+@api.post("/teams/{team_id}/sessions/batch", auth=auth, response={200: ShareBatchOut, 400: ErrorOut, 403: ErrorOut, 404: ErrorOut}, tags=["Team Sessions"])
+def share_sessions_with_team(request, team_id: str, payload: ShareSessionsWithTeamIn):
+    """Compartir varias sesiones propias con un equipo; devuelve el resultado de cada una"""
     user = get_user_from_request(request)
 
     team = get_object_or_404(Team, id=team_id)
 
+    if not get_access(user.github_handle).is_member(team.id):
+        return 403, {"detail": "You are not a member of this team"}
+
+    session_ids = unique_batch(payload.session_ids)
+    if len(session_ids) > BATCH_MAX_ITEMS:
+        return 400, {"detail": f"At most {BATCH_MAX_ITEMS} sessions per request"}
+
+    sessions = Session.objects.for_listing().in_bulk(session_ids)
+    already = set(TeamSession.objects.filter(team=team, session_id__in=session_ids).values_list('session_id', flat=True))
+    to_share = [
+        sessions[s] for s in session_ids
+        if s in sessions and sessions[s].owner_id == user.github_handle and s not in already
+    ]
+
+    if to_share:
+        with transaction.atomic():
+            TeamSession.objects.bulk_create(
+                [TeamSession(team=team, session=session) for session in to_share],
+                ignore_conflicts=True,
+            )
+            # bulk_create no dispara signals: visibilidad, permisos y feed a mano
+            grant_team_sessions(team.id, [session.id for session in to_share])
+            invalidate_team_access(team.id)
+            record_sessions_shared(team, to_share, actor=user)
+
+    results = []
+    for session_id in session_ids:
+        if session_id not in sessions:
+            status = "not_found"
+        elif sessions[session_id].owner_id != user.github_handle:
+            status = "forbidden"
+        elif session_id in already:
+            status = "already_shared"
+        else:
+            status = "shared"
+        results.append({"team_id": team.id, "session_id": session_id, "status": status})
+
+    return {"shared": len(to_share), "results": results}
+
+
+@api.get("/teams/{team_id}/sessions", auth=auth, response={200: TeamSessionPageOut, 400: ErrorOut, 403: ErrorOut, 404: ErrorOut}, exclude_unset=True, tags=["Team Sessions"])
+async def list_team_sessions(
+    request,
+    team_id: str,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = None,
+    fields: Optional[str] = None
+):
+    """Listar sesiones compartidas con un equipo (paginado por cursor; `fields` aplica a cada sesión)"""
+    user = await aget_user_from_request(request)
+
+    try:
+        selected = parse_fields(fields, SESSION_COLUMNS)
+    except InvalidFields as e:
+        return 400, {"detail": str(e)}
+
+    team = await aget_object_or_404(Team, id=team_id)
+
     # Verificar que el usuario es miembro del equipo
-    if not TeamUser.objects.filter(team=team, user=user).exists():
+    access = await aget_access(user.github_handle)
+    if not access.is_member(team.id):
         return 403, {"detail": "You are not a member of this team"}
 
     # Obtener sesiones compartidas con el equipo
     team_sessions = TeamSession.objects.filter(team=team).select_related('session', 'session__owner')
+    team_sessions = only_session_fields(team_sessions, selected, prefix='session__', extra=('created_at', 'session'))
+
+    try:
+        team_sessions, next_cursor = await apaginate(team_sessions, cursor, limit)
+    except InvalidCursor:
+        return 400, {"detail": "Invalid cursor"}
 
-    return [
+    owners = UserDicts()
+    items = [
         {
             "id": ts.id,
-            "session": {
-                "id": ts.session.id,
-                "title": ts.session.title,
-                "description": ts.session.description,
-                "assistant_type": ts.session.assistant_type,
-                "repo": ts.session.repo,
-                "metadata": ts.session.metadata,
-                "owner": {
-                    "github_handle": ts.session.owner.github_handle,
-                    "email": ts.session.owner.email,
-                    "display_name": ts.session.owner.display_name,
-                    "is_active": ts.session.owner.is_active,
-                    "created_at": ts.session.owner.created_at
-                },
-                "is_public": ts.session.is_public,
-                "created_at": ts.session.created_at
-            },
+            "session": session_out(ts.session, owners, selected),
             "shared_at": ts.created_at
         }
         for ts in team_sessions
     ]
 
+    return trusted_response({"items": items, "next_cursor": next_cursor})
+
 
 @api.delete("/teams/{team_id}/sessions/{session_id}", auth=auth, response={200: SuccessOut, 403: ErrorOut, 404: ErrorOut}, tags=["Team Sessions"])
 def unshare_session_from_team(request, team_id: str, session_id: str):
@@ -633,11 +1135,10 @@ def unshare_session_from_team(request, team_id: str, session_id: str):
     user = get_user_from_request(request)
 
     team = get_object_or_404(Team, id=team_id)
-    session = get_object_or_404(Session, id=session_id)
+    session = get_object_or_404(Session.objects.for_listing(), id=session_id)
 
     # Verificar que el usuario es owner/admin del equipo o dueño de la sesión
-    membership = TeamUser.objects.filter(team=team, user=user).first()
-    is_team_admin = membership and membership.role in ['owner', 'admin']
+    is_team_admin = get_access(user.github_handle).is_team_admin(team.id)
     is_session_owner = session.owner == user
 
     if not (is_team_admin or is_session_owner):
@@ -653,11 +1154,80 @@ def unshare_session_from_team(request, team_id: str, session_id: str):
     }
 
 
+# ============================================
+# ACTIVITY FEED
+# ============================================
+
+@api.get("/activity", auth=auth, response={200: ActivityPageOut, 400: ErrorOut}, tags=["Activity"])
+async def list_activity(
+    request,
+    since: Optional[datetime] = None,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = None,
+):
+    """
+    Feed de actividad del usuario en todos sus equipos: sesiones compartidas,
+    sesiones actualizadas y nuevos miembros (paginado por cursor, más nuevo primero).
+    `since` limita el feed a lo ocurrido después de esa fecha.
+    """
+    user = await aget_user_from_request(request)
+
+    entries = ActivityEntry.objects.filter(recipient=user).select_related('team', 'session')
+    if since is not None:
+        entries = entries.filter(created_at__gt=since)
+
+    try:
+        entries, next_cursor = await apaginate(entries, cursor, limit)
+    except InvalidCursor:
+        return 400, {"detail": "Invalid cursor"}
+
+    items = [
+        {
+            "id": entry.id,
+            "verb": entry.verb,
+            "actor": entry.actor_id,
+            "team": {"id": entry.team.id, "name": entry.team.name} if entry.team else None,
+            "session": {
+                "id": entry.session.id,
+                "title": entry.session.title,
+                "repo": entry.session.repo,
+                "report_url": entry.session.report_url,
+            } if entry.session else None,
+            "member": entry.member_id,
+            "changed_fields": entry.changed_fields,
+            "created_at": entry.created_at
+        }
+        for entry in entries
+    ]
+
+    return trusted_response({"items": items, "next_cursor": next_cursor})
+
+
 # ============================================
 # HEALTH CHECK
 # ============================================
 
 @api.get("/health", tags=["Health"])
-def health_check(request):
+async def health_check(request):
     """Health check endpoint"""
     return {"status": "ok", "version": "2.0.0"}
+
+
+@api.get("/metrics", auth=metrics_auth, tags=["Health"])
+def prometheus_metrics(request):
+    """Métricas por endpoint (queries, DB, S3, serialización) en formato de texto de Prometheus"""
+    return HttpResponse(endpoint_metrics.render_prometheus(), content_type=PROMETHEUS_CONTENT_TYPE)
+
+
+@api.get("/metrics/db", auth=metrics_auth, tags=["Health"])
+def db_metrics(request):
+    """Métricas de conexiones a la base de datos de este proceso"""
+    databases = {
+        alias: {
+            "vendor": connections[alias].vendor,
+            "conn_max_age": connections[alias].settings_dict['CONN_MAX_AGE'],
+            "health_checks": connections[alias].settings_dict['CONN_HEALTH_CHECKS'],
+        }
+        for alias in connections
+    }
+    return {"databases": databases, "connections": db_stats.snapshot()}
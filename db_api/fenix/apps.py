@@ -4,3 +4,9 @@ from django.apps import AppConfig
 class FenixConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'fenix'
+
+    def ready(self):
+        from . import metrics, signals  # noqa: F401
+        from .compression import load_configured_dictionary
+
+        load_configured_dictionary()
@@ -0,0 +1,128 @@
+"""
+Compresión zstd de SessionContent.body.
+
+Cada frame lleva el dict_id del diccionario con que se comprimió, así que al
+leer se elige solo; al escribir se usa FENIX_CONTENT_DICTIONARY_ID. Los
+diccionarios se entrenan con `manage.py train_content_dictionary` y viven en
+FENIX_CONTENT_DICTIONARY_DIR: uno que ya comprimió filas no se puede borrar. Si
+falta el de FENIX_CONTENT_DICTIONARY_ID la aplicación no arranca.
+"""
+import threading
+from pathlib import Path
+from typing import Iterable, Optional
+
+import zstandard
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+_lock = threading.Lock()
+_dictionaries: dict[int, zstandard.ZstdCompressionDict] = {}
+
+# ZstdCompressor/ZstdDecompressor no son thread-safe: uno por thread y diccionario
+_local = threading.local()
+
+
+def dictionary_path(dict_id: int) -> Path:
+    return Path(settings.FENIX_CONTENT_DICTIONARY_DIR) / f"{dict_id}.zdict"
+
+
+def get_dictionary(dict_id: int) -> zstandard.ZstdCompressionDict:
+    """Diccionario por id, leído del disco la primera vez"""
+    dictionary = _dictionaries.get(dict_id)
+    if dictionary is None:
+        with _lock:
+            dictionary = _dictionaries.get(dict_id)
+            if dictionary is None:
+                dictionary = zstandard.ZstdCompressionDict(dictionary_path(dict_id).read_bytes())
+                _dictionaries[dict_id] = dictionary
+    return dictionary
+
+
+def load_configured_dictionary() -> None:
+    """
+    Carga al arrancar el diccionario de FENIX_CONTENT_DICTIONARY_ID.
+
+    Sin él no se puede guardar ningún contenido nuevo: mejor no arrancar que
+    fallar en cada escritura (o recomprimir con --recompress en una máquina que no lo tiene).
+
+    Raises:
+        ImproperlyConfigured: El .zdict no existe o no es el diccionario de ese id
+    """
+    dict_id = settings.FENIX_CONTENT_DICTIONARY_ID
+    if not dict_id:
+        return
+
+    path = dictionary_path(dict_id)
+    try:
+        dictionary = get_dictionary(dict_id)
+    except OSError as e:
+        raise ImproperlyConfigured(f"FENIX_CONTENT_DICTIONARY_ID={dict_id} but {path} cannot be read: {e}")
+
+    if dictionary.dict_id() != dict_id:
+        with _lock:
+            _dictionaries.pop(dict_id, None)
+        raise ImproperlyConfigured(f"{path} is not the zstd dictionary {dict_id}")
+
+
+def train_dictionary(samples: Iterable[str], size: int) -> zstandard.ZstdCompressionDict:
+    """
+    Entrena un diccionario con cuerpos reales.
+
+    Args:
+        samples: Cuerpos HTML (cuantos más y más variados, mejor)
+        size: Tamaño máximo del diccionario en bytes
+
+    Returns:
+        El diccionario, con un dict_id aleatorio
+    """
+    return zstandard.train_dictionary(
+        size, [sample.encode('utf-8') for sample in samples], level=settings.FENIX_CONTENT_ZSTD_LEVEL
+    )
+
+
+def save_dictionary(dictionary: zstandard.ZstdCompressionDict) -> Path:
+    """Escribe el diccionario en FENIX_CONTENT_DICTIONARY_DIR como <dict_id>.zdict"""
+    path = dictionary_path(dictionary.dict_id())
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(dictionary.as_bytes())
+    return path
+
+
+def _compressor(dict_id: int, level: int) -> zstandard.ZstdCompressor:
+    compressors = _local.__dict__.setdefault('compressors', {})
+    compressor = compressors.get((dict_id, level))
+    if compressor is None:
+        dictionary = get_dictionary(dict_id) if dict_id else None
+        compressor = compressors[(dict_id, level)] = zstandard.ZstdCompressor(level=level, dict_data=dictionary)
+    return compressor
+
+
+def _decompressor(dict_id: int) -> zstandard.ZstdDecompressor:
+    decompressors = _local.__dict__.setdefault('decompressors', {})
+    decompressor = decompressors.get(dict_id)
+    if decompressor is None:
+        dictionary = get_dictionary(dict_id) if dict_id else None
+        decompressor = decompressors[dict_id] = zstandard.ZstdDecompressor(dict_data=dictionary)
+    return decompressor
+
+
+def compress_text(text: str, dict_id: Optional[int] = None) -> bytes:
+    """
+    Comprime un texto en un frame zstd.
+
+    Args:
+        text: Texto a comprimir
+        dict_id: Diccionario a usar (por defecto FENIX_CONTENT_DICTIONARY_ID; 0 = ninguno)
+
+    Returns:
+        Frame zstd con el tamaño original y el dict_id en la cabecera
+    """
+    if dict_id is None:
+        dict_id = settings.FENIX_CONTENT_DICTIONARY_ID
+    return _compressor(dict_id, settings.FENIX_CONTENT_ZSTD_LEVEL).compress(text.encode('utf-8'))
+
+
+def decompress_text(data: bytes) -> str:
+    """Descomprime un frame de compress_text con el diccionario que indica su cabecera"""
+    dict_id = zstandard.get_frame_parameters(data).dict_id
+    return _decompressor(dict_id).decompress(data).decode('utf-8')
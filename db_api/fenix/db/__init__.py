@@ -0,0 +1,7 @@
+"""
+Backends de base de datos instrumentados.
+
+`ENGINE: 'fenix.db.postgresql'` (o `'fenix.db.sqlite3'` en local) es el backend
+de Django con métricas de conexiones: cuántas se abren, cuánto tarda abrirlas,
+cuántas fallan y cuántas se descartan por el health check. Ver `GET /metrics/db`.
+"""
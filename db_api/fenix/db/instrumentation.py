@@ -0,0 +1,100 @@
+"""
+Métricas de las conexiones a la base de datos (por proceso).
+"""
+import threading
+import time
+
+from django.core.signals import request_started
+
+
+class ConnectionStats:
+    """Contadores thread-safe de apertura, reutilización y descarte de conexiones"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.open = 0
+            self.max_open = 0
+            self.opened = 0
+            self.closed = 0
+            self.connect_errors = 0
+            self.unusable = 0
+            self.connect_seconds_total = 0.0
+            self.connect_seconds_max = 0.0
+            self.requests = 0
+
+    def connected(self, seconds: float) -> None:
+        with self._lock:
+            self.open += 1
+            self.max_open = max(self.max_open, self.open)
+            self.opened += 1
+            self.connect_seconds_total += seconds
+            self.connect_seconds_max = max(self.connect_seconds_max, seconds)
+
+    def connect_failed(self) -> None:
+        with self._lock:
+            self.connect_errors += 1
+
+    def disconnected(self) -> None:
+        with self._lock:
+            self.open = max(self.open - 1, 0)
+            self.closed += 1
+
+    def discarded(self) -> None:
+        with self._lock:
+            self.unusable += 1
+
+    def request(self) -> None:
+        with self._lock:
+            self.requests += 1
+
+    def snapshot(self) -> dict:
+        """Estado actual; `reuse_ratio` es la fracción de requests que no abrió conexión nueva"""
+        with self._lock:
+            avg = self.connect_seconds_total / self.opened if self.opened else 0.0
+            reuse = 1 - self.opened / self.requests if self.requests else None
+            return {
+                "open": self.open,
+                "max_open": self.max_open,
+                "opened": self.opened,
+                "closed": self.closed,
+                "connect_errors": self.connect_errors,
+                "unusable": self.unusable,
+                "connect_ms_avg": round(avg * 1000, 3),
+                "connect_ms_max": round(self.connect_seconds_max * 1000, 3),
+                "requests": self.requests,
+                "reuse_ratio": round(max(reuse, 0.0), 4) if reuse is not None else None,
+            }
+
+
+db_stats = ConnectionStats()
+
+request_started.connect(lambda **kwargs: db_stats.request(), dispatch_uid='fenix_db_stats_request', weak=False)
+
+
+class InstrumentedConnectionMixin:
+    """Mezclar delante del DatabaseWrapper de un backend de Django"""
+
+    def get_new_connection(self, conn_params):
+        started = time.perf_counter()
+        try:
+            connection = super().get_new_connection(conn_params)
+        except Exception:
+            db_stats.connect_failed()
+            raise
+        db_stats.connected(time.perf_counter() - started)
+        return connection
+
+    def _close(self):
+        if self.connection is not None:
+            db_stats.disconnected()
+        return super()._close()
+
+    def is_usable(self):
+        usable = super().is_usable()
+        if not usable:
+            db_stats.discarded()
+        return usable
@@ -0,0 +1,35 @@
+"""
+Campos de modelo propios de fenix.
+"""
+from django.db import models
+
+from .compression import compress_text, decompress_text
+
+
+class CompressedTextField(models.BinaryField):
+    """
+    Texto guardado comprimido con zstd en una columna binaria (bytea en PostgreSQL).
+
+    En Python el valor es siempre str: se comprime al escribir y se descomprime
+    al leer. Un valor bytes se toma como ya comprimido y se guarda tal cual.
+    """
+    description = "Text compressed with zstd"
+
+    def from_db_value(self, value, expression, connection):
+        if value is None:
+            return value
+        return decompress_text(bytes(value))
+
+    def to_python(self, value):
+        if value is None or isinstance(value, str):
+            return value
+        return decompress_text(bytes(value))
+
+    def get_prep_value(self, value):
+        value = super().get_prep_value(value)
+        if isinstance(value, str):
+            return compress_text(value)
+        return value
+
+    def value_to_string(self, obj):
+        return self.value_from_object(obj)
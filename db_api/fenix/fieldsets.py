@@ -0,0 +1,143 @@
+"""
+Sparse fieldsets (`?fields=id,title,repo`) para los endpoints de sesiones.
+
+Un fieldset reduce a la vez las columnas del SELECT (`.only()`, y sin JOIN
+con users si no se pide `owner`) y las claves del JSON de cada item.
+"""
+from typing import Optional
+
+from django.db.models import QuerySet
+
+from .rendering import UserDicts
+
+# Campo de SessionOut -> columnas de Session que necesita
+SESSION_COLUMNS = {
+    "id": ("id",),
+    "title": ("title",),
+    "description": ("description",),
+    "assistant_type": ("assistant_type",),
+    "repo": ("repo",),
+    "metadata": ("metadata",),
+    "owner": ("owner__github_handle", "owner__email", "owner__display_name", "owner__is_active", "owner__created_at"),
+    "is_public": ("is_public",),
+    "report_url": ("report_url",),
+    "report_status": ("report_status",),
+    "created_at": ("created_at",),
+}
+
+# Campos extra de SessionDetailOut (session_data se lee de SessionContent aparte)
+SESSION_DETAIL_COLUMNS = {
+    **SESSION_COLUMNS,
+    "session_data": ("content",),
+    "updated_at": ("updated_at",),
+}
+
+# Siempre se leen: clave del keyset de paginación y owner_id para los chequeos de acceso
+ALWAYS_LOADED = ("id", "created_at", "owner", "content")
+
+
+class InvalidFields(ValueError):
+    """El parámetro fields pide campos que no existen"""
+
+
+def parse_fields(fields: Optional[str], allowed: dict) -> Optional[tuple[str, ...]]:
+    """
+    Parsea `fields=a,b,c` contra los campos permitidos.
+
+    Args:
+        fields: Valor del query param (None o vacío = todos los campos)
+        allowed: Mapa de campos válidos (SESSION_COLUMNS o SESSION_DETAIL_COLUMNS)
+
+    Returns:
+        Campos pedidos en el orden del schema, o None si se piden todos
+
+    Raises:
+        InvalidFields: Si algún campo no existe
+    """
+    if not fields:
+        return None
+
+    requested = {f.strip() for f in fields.split(",") if f.strip()}
+    unknown = requested - allowed.keys()
+    if unknown:
+        raise InvalidFields(f"Unknown fields: {', '.join(sorted(unknown))}")
+
+    return tuple(f for f in allowed if f in requested)
+
+
+def only_session_fields(
+    queryset: QuerySet,
+    selected: Optional[tuple[str, ...]],
+    prefix: str = "",
+    extra: tuple[str, ...] = (),
+    columns: dict = SESSION_COLUMNS,
+) -> QuerySet:
+    """
+    Restringe el SELECT a las columnas de los campos pedidos.
+
+    Args:
+        queryset: Queryset de Session, o de un modelo que llega a Session por `prefix`
+        selected: Campos pedidos (None = no se toca el queryset)
+        prefix: Camino hasta Session, p.ej. 'session__' para TeamSession
+        extra: Columnas propias del modelo base que siempre hacen falta
+        columns: Mapa campo -> columnas
+
+    Returns:
+        Queryset con .only() y select_related ajustados
+    """
+    if selected is None:
+        return queryset
+
+    needed = {f"{prefix}{column}" for field in selected for column in columns[field]}
+    needed.update(f"{prefix}{column}" for column in ALWAYS_LOADED)
+    needed.update(extra)
+
+    # Sin owner no hace falta el JOIN con fenix_users
+    related = [prefix[:-2]] if prefix else []
+    if "owner" in selected:
+        related.append(f"{prefix}owner")
+
+    queryset = queryset.select_related(None)
+    if related:
+        queryset = queryset.select_related(*related)
+    return queryset.only(*sorted(needed))
+
+
+_SESSION_GETTERS = {
+    "id": lambda s, owners: s.id,
+    "title": lambda s, owners: s.title,
+    "description": lambda s, owners: s.description,
+    "assistant_type": lambda s, owners: s.assistant_type,
+    "repo": lambda s, owners: s.repo,
+    "metadata": lambda s, owners: s.metadata,
+    "owner": lambda s, owners: owners[s.owner],
+    "is_public": lambda s, owners: s.is_public,
+    "report_url": lambda s, owners: s.report_url,
+    "report_status": lambda s, owners: s.report_status,
+    "created_at": lambda s, owners: s.created_at,
+}
+
+
+def session_out(session, owners: UserDicts, selected: Optional[tuple[str, ...]] = None) -> dict:
+    """
+    Dict de SessionOut para una sesión, limitado a los campos pedidos.
+
+    Con un fieldset solo se leen los atributos pedidos, así que nunca se
+    dispara la carga de una columna diferida por .only().
+    """
+    if selected is not None:
+        return {field: _SESSION_GETTERS[field](session, owners) for field in selected}
+
+    return {
+        "id": session.id,
+        "title": session.title,
+        "description": session.description,
+        "assistant_type": session.assistant_type,
+        "repo": session.repo,
+        "metadata": session.metadata,
+        "owner": owners[session.owner],
+        "is_public": session.is_public,
+        "report_url": session.report_url,
+        "report_status": session.report_status,
+        "created_at": session.created_at
+    }
@@ -0,0 +1,26 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from fenix.services.report_jobs import process_due_jobs
+
+
+class Command(BaseCommand):
+    help = "Worker que sube a S3 los reportes encolados en ReportJob (con reintentos y backoff)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help="Procesar los jobs vencidos y salir")
+        parser.add_argument('--batch-size', type=int, default=20, help="Jobs por iteración")
+        parser.add_argument('--interval', type=float, default=2.0, help="Segundos de espera cuando la cola está vacía")
+
+    def handle(self, *args, **options):
+        while True:
+            processed = process_due_jobs(limit=options['batch_size'])
+            if processed:
+                self.stdout.write(f"Processed {processed} report job(s)")
+
+            if options['once']:
+                return
+
+            if processed < options['batch_size']:
+                time.sleep(options['interval'])
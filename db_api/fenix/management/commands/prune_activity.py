@@ -0,0 +1,15 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from fenix.services.activity_service import prune_activity
+
+
+class Command(BaseCommand):
+    help = "Borra las entradas del feed de actividad más antiguas que la retención configurada"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=settings.FENIX_ACTIVITY_RETENTION_DAYS)
+
+    def handle(self, *args, **options):
+        deleted = prune_activity(options['days'])
+        self.stdout.write(f"Deleted {deleted} activity entr{'y' if deleted == 1 else 'ies'}")
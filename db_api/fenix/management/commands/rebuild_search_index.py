@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from fenix.models import Session
+from fenix.services.search_service import search_enabled, update_search_vector
+
+
+class Command(BaseCommand):
+    help = "Recalcula SessionSearch.vector (necesario tras la migración 0010 para las sesiones existentes)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help="Reindexar también las sesiones que ya tienen vector")
+        parser.add_argument('--batch-size', type=int, default=200)
+
+    def handle(self, *args, **options):
+        if not search_enabled():
+            raise CommandError("Full-text search requires PostgreSQL")
+
+        sessions = Session.objects.select_related('content').only('id', 'title', 'description', 'content__body')
+        if not options['all']:
+            sessions = sessions.filter(search__vector__isnull=True)
+
+        indexed = 0
+        for session in sessions.iterator(chunk_size=options['batch_size']):
+            update_search_vector(session, session.content.body)
+            indexed += 1
+
+        self.stdout.write(f"Indexed {indexed} session(s)")
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from fenix.services.access_cache import access_cache
+from fenix.services.visibility_service import rebuild_visibility
+
+
+class Command(BaseCommand):
+    help = "Reconstruye SessionVisibility desde TeamSession × TeamUser (reparación; se mantiene sola con signals)"
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            rows = rebuild_visibility()
+        access_cache.clear()
+
+        self.stdout.write(f"Rebuilt {rows} visibility row(s)")
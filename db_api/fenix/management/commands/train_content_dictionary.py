@@ -0,0 +1,60 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from fenix.compression import save_dictionary, train_dictionary
+from fenix.models import SessionContent
+
+
+class Command(BaseCommand):
+    help = (
+        "Entrena un diccionario zstd con los contenidos más recientes y lo guarda en "
+        "FENIX_CONTENT_DICTIONARY_DIR; con --recompress reescribe las filas existentes con él"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--samples', type=int, default=2000, help="Contenidos con los que entrenar")
+        parser.add_argument('--size', type=int, default=112640, help="Tamaño máximo del diccionario en bytes")
+        parser.add_argument(
+            '--recompress', action='store_true',
+            help="Recomprimir todas las filas con FENIX_CONTENT_DICTIONARY_ID (no entrena)"
+        )
+        parser.add_argument('--batch-size', type=int, default=200)
+
+    def handle(self, *args, **options):
+        if options['recompress']:
+            self.recompress(options['batch_size'])
+            return
+
+        samples = list(
+            SessionContent.objects.order_by('-created_at').values_list('body', flat=True)[:options['samples']]
+        )
+        if not samples:
+            raise CommandError("No session contents to train on")
+
+        try:
+            dictionary = train_dictionary(samples, options['size'])
+        except Exception as e:
+            raise CommandError(f"Training failed ({len(samples)} samples): {e}")
+
+        path = save_dictionary(dictionary)
+        self.stdout.write(f"Wrote {path} ({len(dictionary.as_bytes())} bytes, {len(samples)} samples)")
+        self.stdout.write(
+            f"Deploy it, set FENIX_CONTENT_DICTIONARY_ID={dictionary.dict_id()} and run --recompress"
+        )
+
+    def recompress(self, batch_size: int) -> None:
+        contents = SessionContent.objects.only('id', 'body').order_by('pk')
+
+        recompressed = 0
+        batch = []
+        for content in contents.iterator(chunk_size=batch_size):
+            # body ya es str: al guardarlo se comprime con el diccionario actual
+            batch.append(content)
+            if len(batch) == batch_size:
+                recompressed += SessionContent.objects.bulk_update(batch, ['body'])
+                batch = []
+        recompressed += SessionContent.objects.bulk_update(batch, ['body'])
+
+        self.stdout.write(
+            f"Recompressed {recompressed} content(s) with dictionary {settings.FENIX_CONTENT_DICTIONARY_ID or 'none'}"
+        )
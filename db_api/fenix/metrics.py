@@ -0,0 +1,198 @@
+"""
+Métricas por request: queries SQL, tiempo en la base de datos, en S3 y serializando.
+
+RequestMetricsMiddleware abre un RequestProfile por request; las queries se
+cuentan con un execute_wrapper que se instala en cada conexión nueva, y S3 y la
+serialización se miden con `timed(...)`. Los agregados por endpoint se exponen
+en formato de texto de Prometheus (`GET /fenix/metrics`).
+"""
+import logging
+import re
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+from django.conf import settings
+from django.db.backends.signals import connection_created
+
+from .db.instrumentation import db_stats
+
+logger = logging.getLogger('fenix.metrics')
+
+# Listas de placeholders de largo variable (IN (%s, %s, ...)) cuentan como la misma query
+_PLACEHOLDER_LIST_RE = re.compile(r'%s(?:\s*,\s*%s)+')
+
+
+def query_shape(sql: str) -> str:
+    """SQL parametrizado con las listas de placeholders colapsadas"""
+    return _PLACEHOLDER_LIST_RE.sub('%s, ...', sql)
+
+
+class RequestProfile:
+    """Lo que cuesta una request: queries (por forma) y segundos por componente"""
+
+    def __init__(self):
+        self.queries = 0
+        self.shapes: Counter = Counter()
+        self.seconds: dict = defaultdict(float)
+
+    def repeated_shapes(self, threshold: int) -> list[tuple[str, int]]:
+        return [(shape, count) for shape, count in self.shapes.most_common() if count >= threshold]
+
+
+_profile: ContextVar[Optional[RequestProfile]] = ContextVar('fenix_request_profile', default=None)
+
+
+@contextmanager
+def profiling():
+    """Abre un RequestProfile para el bloque (lo usa el middleware)"""
+    profile = RequestProfile()
+    token = _profile.set(profile)
+    try:
+        yield profile
+    finally:
+        _profile.reset(token)
+
+
+@contextmanager
+def timed(component: str):
+    """Suma el tiempo del bloque a `component` ('s3', 'serialization'...) de la request en curso"""
+    profile = _profile.get()
+    if profile is None:
+        yield
+        return
+
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        profile.seconds[component] += time.perf_counter() - started
+
+
+def _record_query(execute, sql, params, many, context):
+    profile = _profile.get()
+    if profile is None:
+        return execute(sql, params, many, context)
+
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        profile.seconds['db'] += time.perf_counter() - started
+        profile.queries += 1
+        profile.shapes[query_shape(sql)] += 1
+
+
+def install_query_recorder(sender=None, connection=None, **kwargs):
+    """Receiver de connection_created: mide las queries de cada conexión (una sola vez por wrapper)"""
+    if _record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_record_query)
+
+
+connection_created.connect(install_query_recorder, dispatch_uid='fenix_query_recorder')
+
+
+class EndpointMetrics:
+    """Agregados por endpoint, thread-safe y por proceso"""
+
+    COMPONENTS = ('db', 's3', 'serialization')
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self._requests: Counter = Counter()
+            self._queries: Counter = Counter()
+            self._seconds: dict = defaultdict(float)
+            self._over_budget: Counter = Counter()
+            self._repeated: Counter = Counter()
+
+    def observe(self, endpoint: str, duration: float, profile: RequestProfile,
+                over_budget: bool, repeated: bool) -> None:
+        with self._lock:
+            self._requests[endpoint] += 1
+            self._queries[endpoint] += profile.queries
+            self._seconds[(endpoint, 'total')] += duration
+            for component in self.COMPONENTS:
+                self._seconds[(endpoint, component)] += profile.seconds.get(component, 0.0)
+            self._over_budget[endpoint] += over_budget
+            self._repeated[endpoint] += repeated
+
+    def render_prometheus(self) -> str:
+        """Exposición en formato de texto de Prometheus (0.0.4)"""
+        with self._lock:
+            endpoints = sorted(self._requests)
+            lines = [
+                '# HELP fenix_requests_total Requests atendidas por endpoint.',
+                '# TYPE fenix_requests_total counter',
+                *(f'fenix_requests_total{_labels(e)} {self._requests[e]}' for e in endpoints),
+                '# HELP fenix_db_queries_total Queries SQL por endpoint.',
+                '# TYPE fenix_db_queries_total counter',
+                *(f'fenix_db_queries_total{_labels(e)} {self._queries[e]}' for e in endpoints),
+                '# HELP fenix_request_seconds_total Segundos por endpoint y componente (total, db, s3, serialization).',
+                '# TYPE fenix_request_seconds_total counter',
+                *(
+                    f'fenix_request_seconds_total{_labels(e, component=c)} {self._seconds[(e, c)]:.6f}'
+                    for e in endpoints for c in ('total', *self.COMPONENTS)
+                ),
+                '# HELP fenix_query_budget_exceeded_total Requests que superaron FENIX_QUERY_BUDGET.',
+                '# TYPE fenix_query_budget_exceeded_total counter',
+                *(f'fenix_query_budget_exceeded_total{_labels(e)} {self._over_budget[e]}' for e in endpoints),
+                '# HELP fenix_repeated_queries_total Requests que repitieron una misma query FENIX_QUERY_REPEAT_THRESHOLD veces (N+1).',
+                '# TYPE fenix_repeated_queries_total counter',
+                *(f'fenix_repeated_queries_total{_labels(e)} {self._repeated[e]}' for e in endpoints),
+            ]
+
+        connections = db_stats.snapshot()
+        lines += [
+            '# HELP fenix_db_connections_open Conexiones abiertas en este proceso.',
+            '# TYPE fenix_db_connections_open gauge',
+            f'fenix_db_connections_open {connections["open"]}',
+            '# HELP fenix_db_connections_opened_total Conexiones abiertas desde el arranque.',
+            '# TYPE fenix_db_connections_opened_total counter',
+            f'fenix_db_connections_opened_total {connections["opened"]}',
+            '# HELP fenix_db_connect_errors_total Fallos al abrir una conexión.',
+            '# TYPE fenix_db_connect_errors_total counter',
+            f'fenix_db_connect_errors_total {connections["connect_errors"]}',
+        ]
+        return '\n'.join(lines) + '\n'
+
+
+def _labels(endpoint: str, **extra) -> str:
+    labels = {'endpoint': endpoint, **extra}
+    body = ','.join(f'{key}="{_escape(value)}"' for key, value in labels.items())
+    return '{' + body + '}'
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+endpoint_metrics = EndpointMetrics()
+
+
+def endpoint_name(request) -> str:
+    """'GET fenix/sessions/<session_id>': método + patrón de la URL (nunca la URL con IDs)"""
+    match = getattr(request, 'resolver_match', None)
+    route = match.route if match is not None else 'unmatched'
+    return f"{request.method} {route}"
+
+
+def finish_request(request, profile: RequestProfile, duration: float) -> None:
+    """Registra la request en los agregados y avisa si gastó demasiadas queries"""
+    endpoint = endpoint_name(request)
+    budget = settings.FENIX_QUERY_BUDGET
+    repeated = profile.repeated_shapes(settings.FENIX_QUERY_REPEAT_THRESHOLD)
+    over_budget = profile.queries > budget
+
+    if over_budget:
+        logger.warning("%s ran %d queries (budget %d)", endpoint, profile.queries, budget)
+    for shape, count in repeated:
+        logger.warning("%s repeated a query %d times (possible N+1): %s", endpoint, count, shape)
+
+    endpoint_metrics.observe(endpoint, duration, profile, over_budget, bool(repeated))
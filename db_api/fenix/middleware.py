@@ -0,0 +1,198 @@
+"""
+Middlewares de fenix.
+
+ReplicaRoutingMiddleware: los GET de la API leen de la réplica, salvo que el
+mismo usuario haya escrito hace menos de FENIX_REPLICA_STICKY_SECONDS: entonces
+leen de la primaria para ver sus propios cambios aunque la réplica vaya con
+retraso (read-your-writes).
+
+RequestMetricsMiddleware: queries, tiempo de DB, S3 y serialización por endpoint
+(ver metrics.py).
+
+RequestDecompressionMiddleware: descomprime los cuerpos con Content-Encoding
+gzip o zstd antes de que Ninja los parsee.
+"""
+import gzip
+import io
+import time
+import zlib
+
+import zstandard
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.http import JsonResponse
+
+from .metrics import finish_request, profiling
+from .routers import reads_from, replica_alias
+from .services.cache_service import FenixCache
+
+API_PREFIX = '/fenix/'
+SAFE_METHODS = ('GET', 'HEAD')
+
+# Usuarios que escribieron hace poco -> sus lecturas van a la primaria
+recent_writers = FenixCache(
+    namespace='sticky',
+    ttl=settings.FENIX_REPLICA_STICKY_SECONDS,
+    maxsize=settings.FENIX_REPLICA_STICKY_MAXSIZE,
+    backend_alias=settings.FENIX_REPLICA_STICKY_CACHE_BACKEND,
+)
+
+
+def _writer(request) -> str:
+    # Solo decide de qué base se lee: un handle falso como mucho manda lecturas a la primaria
+    return request.headers.get('X-GitHub-Handle', '')
+
+
+def _is_api_read(request) -> bool:
+    return request.method in SAFE_METHODS and request.path.startswith(API_PREFIX)
+
+
+def _is_api_write(request, response) -> bool:
+    return (
+        request.method not in SAFE_METHODS
+        and request.path.startswith(API_PREFIX)
+        and response.status_code < 400
+    )
+
+
+class ReplicaRoutingMiddleware:
+    """Abre `reads_from(réplica)` en los GET de la API y marca a quien escribe como sticky"""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        replica = replica_alias()
+        if replica is None:
+            return self.get_response(request)
+
+        writer = _writer(request)
+        alias = replica if _is_api_read(request) and not recent_writers.get(writer) else None
+        with reads_from(alias):
+            response = self.get_response(request)
+
+        if writer and _is_api_write(request, response):
+            recent_writers.set(writer, True)
+        return response
+
+    async def __acall__(self, request):
+        replica = replica_alias()
+        if replica is None:
+            return await self.get_response(request)
+
+        writer = _writer(request)
+        alias = replica if _is_api_read(request) and not await recent_writers.aget(writer) else None
+        with reads_from(alias):
+            response = await self.get_response(request)
+
+        if writer and _is_api_write(request, response):
+            await recent_writers.aset(writer, True)
+        return response
+
+
+class RequestMetricsMiddleware:
+    """Perfila cada request y la suma a las métricas de su endpoint"""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        started = time.perf_counter()
+        with profiling() as profile:
+            response = self.get_response(request)
+        finish_request(request, profile, time.perf_counter() - started)
+        return response
+
+    async def __acall__(self, request):
+        started = time.perf_counter()
+        with profiling() as profile:
+            response = await self.get_response(request)
+        finish_request(request, profile, time.perf_counter() - started)
+        return response
+
+
+class RequestBodyError(Exception):
+    def __init__(self, status: int, detail: str):
+        super().__init__(detail)
+        self.status = status
+        self.detail = detail
+
+
+def _decoding_reader(encoding: str, raw: bytes):
+    if encoding in ('gzip', 'x-gzip'):
+        return gzip.GzipFile(fileobj=io.BytesIO(raw))
+    if encoding == 'zstd':
+        return zstandard.ZstdDecompressor().stream_reader(io.BytesIO(raw))
+    raise RequestBodyError(415, f"Unsupported Content-Encoding: {encoding}")
+
+
+def decode_request_body(request) -> None:
+    """
+    Sustituye el cuerpo comprimido de la request por el descomprimido.
+
+    El tamaño descomprimido se limita a DATA_UPLOAD_MAX_MEMORY_SIZE, igual que
+    un cuerpo sin comprimir, para que un cuerpo pequeño no pueda expandirse sin límite.
+
+    Raises:
+        RequestBodyError: Encoding no soportado (415), datos inválidos (400) o demasiado grande (413)
+    """
+    encoding = request.META['HTTP_CONTENT_ENCODING'].strip().lower()
+    if encoding == 'identity':
+        return
+
+    limit = settings.DATA_UPLOAD_MAX_MEMORY_SIZE
+    reader = _decoding_reader(encoding, request.body)
+    try:
+        body = reader.read() if limit is None else reader.read(limit + 1)
+    except (OSError, EOFError, zlib.error, zstandard.ZstdError):
+        raise RequestBodyError(400, f"Invalid {encoding} request body")
+    if limit is not None and len(body) > limit:
+        raise RequestBodyError(413, "Request body exceeds DATA_UPLOAD_MAX_MEMORY_SIZE once decompressed")
+
+    request._body = body
+    request._stream = io.BytesIO(body)
+    request.META['CONTENT_LENGTH'] = str(len(body))
+    del request.META['HTTP_CONTENT_ENCODING']
+
+
+class RequestDecompressionMiddleware:
+    """Descomprime cuerpos con Content-Encoding: gzip/zstd (el MCP comprime los exports grandes)"""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def _decode(self, request):
+        if 'HTTP_CONTENT_ENCODING' not in request.META:
+            return None
+        try:
+            decode_request_body(request)
+        except RequestBodyError as e:
+            return JsonResponse({"detail": e.detail}, status=e.status)
+        return None
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        return self._decode(request) or self.get_response(request)
+
+    async def __acall__(self, request):
+        return self._decode(request) or await self.get_response(request)
@@ -0,0 +1,37 @@
+# Generated by Django 5.0.14 on 2026-10-17 10:00
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fenix', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SessionContent',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('body', models.TextField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'db_table': 'fenix_session_contents',
+            },
+        ),
+        migrations.AddField(
+            model_name='session',
+            name='content',
+            field=models.OneToOneField(null=True, on_delete=django.db.models.deletion.PROTECT, related_name='session', to='fenix.sessioncontent'),
+        ),
+        # Nullable para que la migración sea reversible
+        migrations.AlterField(
+            model_name='session',
+            name='session_data',
+            field=models.TextField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,64 @@
+# Generated by Django 5.0.14 on 2026-10-17 10:00
+
+import uuid
+from django.db import migrations
+
+BATCH_SIZE = 200
+
+
+def move_session_data_to_content(apps, schema_editor):
+    """Copia session_data de cada sesión a una fila nueva de SessionContent"""
+    Session = apps.get_model('fenix', 'Session')
+    SessionContent = apps.get_model('fenix', 'SessionContent')
+    db_alias = schema_editor.connection.alias
+
+    sessions = Session.objects.using(db_alias).filter(content__isnull=True).only('id', 'session_data')
+
+    batch = []
+    for session in sessions.iterator(chunk_size=BATCH_SIZE):
+        batch.append(session)
+        if len(batch) >= BATCH_SIZE:
+            _copy_batch(Session, SessionContent, batch, db_alias)
+            batch = []
+    if batch:
+        _copy_batch(Session, SessionContent, batch, db_alias)
+
+
+def _copy_batch(Session, SessionContent, sessions, db_alias):
+    contents = []
+    for session in sessions:
+        content = SessionContent(id=uuid.uuid4(), body=session.session_data or '')
+        session.content_id = content.id
+        contents.append(content)
+
+    SessionContent.objects.using(db_alias).bulk_create(contents)
+    Session.objects.using(db_alias).bulk_update(sessions, ['content'])
+
+
+def move_content_to_session_data(apps, schema_editor):
+    """Reverso: devuelve el cuerpo a session_data"""
+    Session = apps.get_model('fenix', 'Session')
+    db_alias = schema_editor.connection.alias
+
+    sessions = Session.objects.using(db_alias).filter(content__isnull=False).select_related('content')
+
+    batch = []
+    for session in sessions.iterator(chunk_size=BATCH_SIZE):
+        session.session_data = session.content.body
+        batch.append(session)
+        if len(batch) >= BATCH_SIZE:
+            Session.objects.using(db_alias).bulk_update(batch, ['session_data'])
+            batch = []
+    if batch:
+        Session.objects.using(db_alias).bulk_update(batch, ['session_data'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fenix', '0002_sessioncontent'),
+    ]
+
+    operations = [
+        migrations.RunPython(move_session_data_to_content, move_content_to_session_data),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.0.14 on 2026-10-17 10:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fenix', '0003_move_session_data_to_content'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='session',
+            name='session_data',
+        ),
+        migrations.AlterField(
+            model_name='session',
+            name='content',
+            field=models.OneToOneField(on_delete=django.db.models.deletion.PROTECT, related_name='session', to='fenix.sessioncontent'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.0.14 on 2026-10-17 11:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fenix', '0004_remove_session_session_data'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='sessioncontent',
+            name='report_url',
+            field=models.URLField(blank=True, max_length=1000, null=True),
+        ),
+        # Nullable hasta que 0006 calcule los hashes
+        migrations.AddField(
+            model_name='sessioncontent',
+            name='sha256',
+            field=models.CharField(max_length=64, null=True, unique=True),
+        ),
+        migrations.AlterField(
+            model_name='session',
+            name='content',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='sessions', to='fenix.sessioncontent'),
+        ),
+    ]
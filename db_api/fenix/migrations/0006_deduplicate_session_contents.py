@@ -0,0 +1,65 @@
+# Generated by Django 5.0.14 on 2026-10-17 11:00
+
+import hashlib
+import uuid
+from django.db import migrations
+
+BATCH_SIZE = 200
+
+
+def _normalize(html_content):
+    # Copia de content_service.normalize_session_data: las migraciones no deben importar código vivo
+    return html_content.replace('\r\n', '\n').replace('\r', '\n').strip()
+
+
+def deduplicate_contents(apps, schema_editor):
+    """Calcula el hash de cada contenido y une los duplicados en un solo blob"""
+    Session = apps.get_model('fenix', 'Session')
+    SessionContent = apps.get_model('fenix', 'SessionContent')
+    db_alias = schema_editor.connection.alias
+
+    canonical = {}
+    duplicates = {}
+
+    contents = SessionContent.objects.using(db_alias).filter(sha256__isnull=True).order_by('created_at')
+    for content in contents.iterator(chunk_size=BATCH_SIZE):
+        body = _normalize(content.body)
+        sha256 = hashlib.sha256(body.encode('utf-8')).hexdigest()
+
+        if sha256 in canonical:
+            duplicates[content.id] = canonical[sha256]
+            continue
+
+        canonical[sha256] = content.id
+        SessionContent.objects.using(db_alias).filter(id=content.id).update(sha256=sha256, body=body)
+
+    for duplicate_id, canonical_id in duplicates.items():
+        Session.objects.using(db_alias).filter(content_id=duplicate_id).update(content_id=canonical_id)
+    SessionContent.objects.using(db_alias).filter(id__in=list(duplicates)).delete()
+
+
+def split_shared_contents(apps, schema_editor):
+    """Reverso: cada sesión vuelve a tener su propia fila de contenido"""
+    Session = apps.get_model('fenix', 'Session')
+    SessionContent = apps.get_model('fenix', 'SessionContent')
+    db_alias = schema_editor.connection.alias
+
+    seen = set()
+    for session in Session.objects.using(db_alias).select_related('content').order_by('created_at').iterator(chunk_size=BATCH_SIZE):
+        if session.content_id not in seen:
+            seen.add(session.content_id)
+            continue
+
+        copy = SessionContent.objects.using(db_alias).create(id=uuid.uuid4(), body=session.content.body)
+        Session.objects.using(db_alias).filter(id=session.id).update(content_id=copy.id)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fenix', '0005_sessioncontent_sha256'),
+    ]
+
+    operations = [
+        migrations.RunPython(deduplicate_contents, split_shared_contents),
+    ]
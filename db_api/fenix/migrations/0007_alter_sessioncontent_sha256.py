@@ -0,0 +1,18 @@
+# Generated by Django 5.0.14 on 2026-10-17 11:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fenix', '0006_deduplicate_session_contents'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='sessioncontent',
+            name='sha256',
+            field=models.CharField(max_length=64, unique=True),
+        ),
+    ]
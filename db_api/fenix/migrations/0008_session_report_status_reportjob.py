@@ -0,0 +1,39 @@
+# Generated by Django 5.0.14 on 2026-10-17 12:00
+
+import django.db.models.deletion
+import django.utils.timezone
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fenix', '0007_alter_sessioncontent_sha256'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='session',
+            name='report_status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('ready', 'Ready'), ('failed', 'Failed')], default='pending', max_length=20),
+        ),
+        migrations.CreateModel(
+            name='ReportJob',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('done', 'Done'), ('failed', 'Failed')], default='pending', max_length=20)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('next_attempt_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('last_error', models.TextField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('content', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='report_job', to='fenix.sessioncontent')),
+            ],
+            options={
+                'db_table': 'fenix_report_jobs',
+                'ordering': ['next_attempt_at'],
+                'indexes': [models.Index(fields=['status', 'next_attempt_at'], name='fenix_repor_status_4bbd4a_idx')],
+            },
+        ),
+    ]
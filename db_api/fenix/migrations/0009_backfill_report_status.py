@@ -0,0 +1,35 @@
+# Generated by Django 5.0.14 on 2026-10-17 12:00
+
+from django.db import migrations
+
+
+def backfill_report_status(apps, schema_editor):
+    """Sesiones con reporte quedan 'ready'; las demás se encolan para que el worker las suba"""
+    Session = apps.get_model('fenix', 'Session')
+    SessionContent = apps.get_model('fenix', 'SessionContent')
+    ReportJob = apps.get_model('fenix', 'ReportJob')
+    db_alias = schema_editor.connection.alias
+
+    Session.objects.using(db_alias).filter(report_url__isnull=False).update(report_status='ready')
+
+    missing = SessionContent.objects.using(db_alias).filter(
+        report_url__isnull=True,
+        sessions__report_url__isnull=True,
+    ).distinct().values_list('id', flat=True)
+
+    ReportJob.objects.using(db_alias).bulk_create(
+        [ReportJob(content_id=content_id) for content_id in missing.iterator()],
+        batch_size=500,
+        ignore_conflicts=True,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fenix', '0008_session_report_status_reportjob'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_report_status, migrations.RunPython.noop),
+    ]
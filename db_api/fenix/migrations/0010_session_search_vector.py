@@ -0,0 +1,24 @@
+# Generated by Django 5.0.14 on 2026-10-17 13:00
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fenix', '0009_backfill_report_status'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='session',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='session',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='fenix_sessions_search_gin'),
+        ),
+    ]
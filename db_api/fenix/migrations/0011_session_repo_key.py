@@ -0,0 +1,78 @@
+# Generated by Django 5.0.14 on 2026-10-17 14:00
+
+import re
+from urllib.parse import urlsplit
+
+from django.db import migrations, models
+
+BATCH_SIZE = 500
+
+_SCP_RE = re.compile(r'^(?:[^@/\s]+@)?(?P<host>[^:/\s]+):(?!//)(?P<path>.+)$')
+
+
+def _normalize(repo):
+    # Copia de fenix.repos.normalize_repo_key: las migraciones no deben importar código vivo
+    if not repo:
+        return None
+
+    value = re.sub(r'\s*\((?:fetch|push)\)\s*$', '', repo.strip())
+    value = value.split()[-1] if value.split() else ''
+
+    if '://' in value:
+        parts = urlsplit(value)
+        host, path = parts.hostname or '', parts.path
+    elif match := _SCP_RE.match(value):
+        host, path = match.group('host'), match.group('path')
+    else:
+        host, path = '', value
+
+    path = path.strip('/')
+    if path.endswith('.git'):
+        path = path[:-4]
+
+    segments = [s for s in path.split('/') if s]
+    if not host and len(segments) > 2 and '.' in segments[0]:
+        host, segments = segments[0], segments[1:]
+
+    if not segments:
+        return None
+
+    host = host.lower()
+    if host.startswith('www.'):
+        host = host[4:]
+
+    key = '/'.join(segments).lower()
+    if host and host != 'github.com':
+        key = f'{host}/{key}'
+    return key
+
+
+def backfill_repo_key(apps, schema_editor):
+    """Calcula repo_key para las sesiones existentes, agrupando por valor distinto de repo"""
+    Session = apps.get_model('fenix', 'Session')
+    db_alias = schema_editor.connection.alias
+
+    repos = Session.objects.using(db_alias).filter(repo__isnull=False).values_list('repo', flat=True).distinct()
+    for repo in repos.iterator(chunk_size=BATCH_SIZE):
+        Session.objects.using(db_alias).filter(repo=repo).update(repo_key=_normalize(repo))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fenix', '0010_session_search_vector'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='session',
+            name='repo_key',
+            field=models.CharField(blank=True, editable=False, max_length=255, null=True),
+        ),
+        # Backfill antes de crear el índice, para no mantenerlo fila a fila
+        migrations.RunPython(backfill_repo_key, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='session',
+            index=models.Index(fields=['repo_key', '-created_at'], name='fenix_sessi_repo_ke_c3c695_idx'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.0.14 on 2026-10-17 15:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fenix', '0011_session_repo_key'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SessionVisibility',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('created_at', models.DateTimeField()),
+                ('repo_key', models.CharField(blank=True, max_length=255, null=True)),
+                ('session', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='visibility', to='fenix.session')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='visible_sessions', to='fenix.user')),
+            ],
+            options={
+                'db_table': 'fenix_session_visibility',
+                'indexes': [models.Index(fields=['user', '-created_at', '-session'], name='fenix_sessi_user_id_061a31_idx'), models.Index(fields=['user', 'repo_key', '-created_at', '-session'], name='fenix_sessi_user_id_34fd51_idx'), models.Index(fields=['session'], name='fenix_sessi_session_d218e4_idx')],
+                'unique_together': {('user', 'session')},
+            },
+        ),
+    ]
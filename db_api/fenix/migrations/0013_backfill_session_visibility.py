@@ -0,0 +1,41 @@
+# Generated by Django 5.0.14 on 2026-10-17 15:00
+
+from itertools import islice
+
+from django.db import migrations
+
+BATCH_SIZE = 1000
+
+
+def backfill_session_visibility(apps, schema_editor):
+    """Una fila por (miembro, sesión compartida con su equipo), sin duplicados entre equipos"""
+    TeamUser = apps.get_model('fenix', 'TeamUser')
+    SessionVisibility = apps.get_model('fenix', 'SessionVisibility')
+    db_alias = schema_editor.connection.alias
+
+    pairs = TeamUser.objects.using(db_alias).filter(team__team_sessions__isnull=False).values_list(
+        'user_id',
+        'team__team_sessions__session_id',
+        'team__team_sessions__session__created_at',
+        'team__team_sessions__session__repo_key',
+    ).distinct().iterator(chunk_size=BATCH_SIZE)
+
+    while batch := list(islice(pairs, BATCH_SIZE)):
+        SessionVisibility.objects.using(db_alias).bulk_create(
+            [
+                SessionVisibility(user_id=user_id, session_id=session_id, created_at=created_at, repo_key=repo_key)
+                for user_id, session_id, created_at, repo_key in batch
+            ],
+            ignore_conflicts=True,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fenix', '0012_sessionvisibility'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_session_visibility, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.0.14 on 2026-10-17 16:00
+
+import django.db.models.deletion
+import django.utils.timezone
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fenix', '0013_backfill_session_visibility'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ActivityEntry',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('verb', models.CharField(choices=[('session_shared', 'Session shared'), ('session_updated', 'Session updated'), ('member_added', 'Member added')], max_length=30)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('actor', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='fenix.user')),
+                ('member', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='fenix.user')),
+                ('recipient', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='activity', to='fenix.user')),
+                ('session', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='fenix.session')),
+                ('team', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='fenix.team')),
+            ],
+            options={
+                'db_table': 'fenix_activity',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['recipient', '-created_at', '-id'], name='fenix_activ_recipie_aa5eb3_idx'), models.Index(fields=['created_at'], name='fenix_activ_created_a83f9f_idx')],
+            },
+        ),
+    ]
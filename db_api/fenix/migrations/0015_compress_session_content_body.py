@@ -0,0 +1,85 @@
+# Generated by Django 5.0.14 on 2026-10-17 18:00
+
+import zstandard
+from django.conf import settings
+from django.db import migrations, models
+
+import fenix.fields
+
+BATCH_SIZE = 200
+
+
+def compress_bodies(apps, schema_editor):
+    """Copia cada body a la columna comprimida (sin diccionario: todavía no hay ninguno entrenado)"""
+    SessionContent = apps.get_model('fenix', 'SessionContent')
+    db_alias = schema_editor.connection.alias
+    compressor = zstandard.ZstdCompressor(level=settings.FENIX_CONTENT_ZSTD_LEVEL)
+
+    contents = SessionContent.objects.using(db_alias).filter(compressed_body__isnull=True).only('id', 'body')
+    batch = []
+    for content in contents.iterator(chunk_size=BATCH_SIZE):
+        # bytes: CompressedTextField los guarda tal cual
+        content.compressed_body = compressor.compress(content.body.encode('utf-8'))
+        batch.append(content)
+        if len(batch) == BATCH_SIZE:
+            SessionContent.objects.using(db_alias).bulk_update(batch, ['compressed_body'])
+            batch = []
+    SessionContent.objects.using(db_alias).bulk_update(batch, ['compressed_body'])
+
+
+def decompress_bodies(apps, schema_editor):
+    """Reverso: vuelve a llenar la columna de texto"""
+    SessionContent = apps.get_model('fenix', 'SessionContent')
+    db_alias = schema_editor.connection.alias
+
+    contents = SessionContent.objects.using(db_alias).only('id', 'compressed_body')
+    batch = []
+    for content in contents.iterator(chunk_size=BATCH_SIZE):
+        content.body = content.compressed_body
+        batch.append(content)
+        if len(batch) == BATCH_SIZE:
+            SessionContent.objects.using(db_alias).bulk_update(batch, ['body'])
+            batch = []
+    SessionContent.objects.using(db_alias).bulk_update(batch, ['body'])
+
+
+def store_uncompressed(apps, schema_editor):
+    # El valor ya viene comprimido: que PostgreSQL no intente comprimirlo otra vez (pglz) al hacer TOAST
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute('ALTER TABLE fenix_session_contents ALTER COLUMN body SET STORAGE EXTERNAL')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fenix', '0014_activityentry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='sessioncontent',
+            name='compressed_body',
+            field=fenix.fields.CompressedTextField(null=True),
+        ),
+        migrations.AlterField(
+            model_name='sessioncontent',
+            name='body',
+            field=models.TextField(null=True),
+        ),
+        migrations.RunPython(compress_bodies, decompress_bodies),
+        migrations.RemoveField(
+            model_name='sessioncontent',
+            name='body',
+        ),
+        migrations.RenameField(
+            model_name='sessioncontent',
+            old_name='compressed_body',
+            new_name='body',
+        ),
+        migrations.AlterField(
+            model_name='sessioncontent',
+            name='body',
+            field=fenix.fields.CompressedTextField(),
+        ),
+        migrations.RunPython(store_uncompressed, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.14 on 2026-10-17 20:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fenix', '0015_compress_session_content_body'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reportjob',
+            name='staged_key',
+            field=models.CharField(blank=True, max_length=255, null=True),
+        ),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 5.0.14 on 2026-10-17 22:00
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def copy_vectors(apps, schema_editor):
+    """Copia los vectores ya calculados (fuera de Postgres siempre son NULL: no hay nada que copiar)"""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        'INSERT INTO fenix_session_search (session_id, vector) '
+        'SELECT id, search_vector FROM fenix_sessions WHERE search_vector IS NOT NULL'
+    )
+
+
+def restore_vectors(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        'UPDATE fenix_sessions SET search_vector = s.vector '
+        'FROM fenix_session_search s WHERE s.session_id = fenix_sessions.id'
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fenix', '0016_reportjob_staged_key'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SessionSearch',
+            fields=[
+                ('session', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='search', serialize=False, to='fenix.session')),
+                ('vector', django.contrib.postgres.search.SearchVectorField(null=True)),
+            ],
+            options={
+                'db_table': 'fenix_session_search',
+                'indexes': [django.contrib.postgres.indexes.GinIndex(fields=['vector'], name='fenix_session_search_gin')],
+            },
+        ),
+        migrations.RunPython(copy_vectors, restore_vectors),
+        migrations.RemoveIndex(
+            model_name='session',
+            name='fenix_sessions_search_gin',
+        ),
+        migrations.RemoveField(
+            model_name='session',
+            name='search_vector',
+        ),
+    ]
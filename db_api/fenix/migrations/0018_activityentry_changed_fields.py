@@ -0,0 +1,18 @@
+# Generated by Django 5.0.14 on 2026-10-17 23:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fenix', '0017_sessionsearch'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='activityentry',
+            name='changed_fields',
+            field=models.JSONField(blank=True, default=list),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.0.14 on 2026-10-17 23:30
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fenix', '0018_activityentry_changed_fields'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='session',
+            name='fenix_sessi_repo_ke_c3c695_idx',
+        ),
+    ]
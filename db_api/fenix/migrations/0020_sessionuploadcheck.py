@@ -0,0 +1,33 @@
+# Generated by Django 5.0.14 on 2026-10-18 00:00
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fenix', '0019_remove_session_repo_key_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SessionUploadCheck',
+            fields=[
+                ('session', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='upload_check', serialize=False, to='fenix.session')),
+                ('s3_key', models.CharField(max_length=255)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('failed', 'Failed')], default='pending', max_length=20)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('next_attempt_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('last_error', models.TextField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'fenix_session_upload_checks',
+                'ordering': ['next_attempt_at'],
+                'indexes': [models.Index(fields=['status', 'next_attempt_at'], name='fenix_sessi_status_b51f65_idx')],
+            },
+        ),
+    ]
@@ -1,7 +1,13 @@
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
+from django.utils import timezone
 
 import uuid
 
+from .fields import CompressedTextField
+from .repos import normalize_repo_key
+
 
 class User(models.Model):
     """Usuarios del sistema"""
@@ -38,24 +44,66 @@ class Team(models.Model):
         return self.name
 
 
+class SessionContent(models.Model):
+    """
+    Cuerpo HTML de sesiones, separado de la metadata para mantener las filas de Session pequeñas.
+    Direccionado por contenido: cada HTML distinto se guarda una sola vez.
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    sha256 = models.CharField(max_length=64, unique=True)
+    # Comprimido con zstd en la base de datos; en Python es str
+    body = CompressedTextField()
+
+    # S3 URL del blob (blobs/<sha256>.html), None hasta que se sube
+    report_url = models.URLField(max_length=1000, null=True, blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'fenix_session_contents'
+
+    def __str__(self):
+        return f"Content {self.sha256[:12]}"
+
+
+class SessionQuerySet(models.QuerySet):
+    def for_listing(self):
+        """Proyección ligera para listados: metadata y owner, nunca el contenido"""
+        return self.select_related('owner')
+
+
 class Session(models.Model):
     """Sesiones de asistentes de IA"""
+    REPORT_STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('ready', 'Ready'),
+        ('failed', 'Failed'),
+    ]
+
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     title = models.CharField(max_length=500, db_index=True)
     description = models.TextField(null=True, blank=True)
-    session_data = models.TextField()
+    # El cuerpo vive en SessionContent (compartido entre sesiones idénticas); solo get_session lo lee
+    content = models.ForeignKey(SessionContent, on_delete=models.PROTECT, related_name='sessions')
     assistant_type = models.CharField(max_length=50, default='claude-code')
     repo = models.CharField(max_length=100, null=True, blank=True)
+    # Forma canónica de repo ('owner/repo'), calculada al guardar. Se copia a
+    # SessionVisibility, que es donde se consulta (y se indexa) por repo
+    repo_key = models.CharField(max_length=255, null=True, blank=True, editable=False)
     metadata = models.JSONField(default=dict, blank=True)
     owner = models.ForeignKey(User, on_delete=models.CASCADE, related_name='sessions')
     is_public = models.BooleanField(default=False)
 
     # S3 Report URL (always .html files)
     report_url = models.URLField(max_length=1000, null=True, blank=True)
+    # Estado de la subida en segundo plano (ver ReportJob)
+    report_status = models.CharField(max_length=20, choices=REPORT_STATUS_CHOICES, default='pending')
 
     created_at = models.DateTimeField(auto_now_add=True, db_index=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = SessionQuerySet.as_manager()
+
     class Meta:
         db_table = 'fenix_sessions'
         ordering = ['-created_at']
@@ -65,7 +113,32 @@ class Session(models.Model):
         ]
 
     def __str__(self):
-        return f"{self.title} by @{self.owner.github_handle}"
+        return f"{self.title} by @{self.owner_id}"
+
+    def save(self, *args, **kwargs):
+        self.repo_key = normalize_repo_key(self.repo)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'repo' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'repo_key'}
+        super().save(*args, **kwargs)
+
+
+class SessionSearch(models.Model):
+    """
+    Vector de búsqueda full-text de una sesión: título, descripción y texto del cuerpo (ver search_service).
+    Vive fuera de fenix_sessions para que los listados y lecturas de metadata no lo carguen.
+    """
+    session = models.OneToOneField(Session, on_delete=models.CASCADE, primary_key=True, related_name='search')
+    vector = SearchVectorField(null=True)
+
+    class Meta:
+        db_table = 'fenix_session_search'
+        indexes = [
+            GinIndex(fields=['vector'], name='fenix_session_search_gin'),
+        ]
+
+    def __str__(self):
+        return f"Search vector of {self.session_id}"
 
 
 class TeamUser(models.Model):
@@ -92,7 +165,7 @@ class TeamUser(models.Model):
         ]
 
     def __str__(self):
-        return f"@{self.user.github_handle} in {self.team.name} ({self.role})"
+        return f"@{self.user_id} in {self.team.name} ({self.role})"
 
 
 class TeamSession(models.Model):
@@ -113,3 +186,125 @@ class TeamSession(models.Model):
 
     def __str__(self):
         return f"{self.session.title} shared with {self.team.name}"
+
+
+class SessionVisibility(models.Model):
+    """
+    Índice desnormalizado: una fila por (usuario, sesión) visible a través de sus equipos.
+    Copia created_at y repo_key de la sesión para que feeds y by-repo sean un solo rango de índice.
+    Se mantiene incrementalmente al compartir/descompartir y al cambiar membresías (ver visibility_service).
+    """
+    id = models.BigAutoField(primary_key=True)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='visible_sessions')
+    session = models.ForeignKey(Session, on_delete=models.CASCADE, related_name='visibility')
+    created_at = models.DateTimeField()
+    repo_key = models.CharField(max_length=255, null=True, blank=True)
+
+    class Meta:
+        db_table = 'fenix_session_visibility'
+        unique_together = [['user', 'session']]
+        indexes = [
+            models.Index(fields=['user', '-created_at', '-session']),
+            models.Index(fields=['user', 'repo_key', '-created_at', '-session']),
+            models.Index(fields=['session']),
+        ]
+
+    def __str__(self):
+        return f"{self.session_id} visible to @{self.user_id}"
+
+
+class ActivityEntry(models.Model):
+    """
+    Feed de actividad por usuario, escrito en fan-out al compartir, añadir miembros o
+    actualizar sesiones compartidas (ver activity_service). Leer el feed es un rango
+    del índice (recipient, created_at) sin joins con equipos.
+    """
+    VERB_CHOICES = [
+        ('session_shared', 'Session shared'),
+        ('session_updated', 'Session updated'),
+        ('member_added', 'Member added'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    recipient = models.ForeignKey(User, on_delete=models.CASCADE, related_name='activity')
+    verb = models.CharField(max_length=30, choices=VERB_CHOICES)
+    actor = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    team = models.ForeignKey(Team, on_delete=models.CASCADE, null=True, blank=True, related_name='+')
+    session = models.ForeignKey(Session, on_delete=models.CASCADE, null=True, blank=True, related_name='+')
+    member = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True, related_name='+')
+    # session_updated: campos de la sesión que cambiaron (nombres de la API, p.ej. ['title', 'session_data'])
+    changed_fields = models.JSONField(default=list, blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        db_table = 'fenix_activity'
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['recipient', '-created_at', '-id']),
+            models.Index(fields=['created_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.verb} for @{self.recipient_id}"
+
+
+class ReportJob(models.Model):
+    """Outbox de subidas de reportes a S3, procesado por `manage.py process_report_jobs`"""
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    content = models.OneToOneField(SessionContent, on_delete=models.CASCADE, related_name='report_job')
+    # Subida directa aún sin ingerir: el HTML está en esta key de S3 y el body del contenido vacío
+    staged_key = models.CharField(max_length=255, null=True, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'fenix_report_jobs'
+        ordering = ['next_attempt_at']
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at']),
+        ]
+
+    def __str__(self):
+        return f"Report job {self.content_id} ({self.status}, {self.attempts} attempts)"
+
+
+class SessionUploadCheck(models.Model):
+    """
+    Subida directa de una sesión que reutiliza un contenido que ya existía en sesiones de otros.
+
+    El sha256 no demuestra tener el contenido: hasta que el worker descarga la
+    subida y comprueba el hash, la sesión no ve el body, ni el informe, ni se indexa.
+    """
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('failed', 'Failed'),
+    ]
+
+    session = models.OneToOneField(Session, on_delete=models.CASCADE, primary_key=True, related_name='upload_check')
+    s3_key = models.CharField(max_length=255)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'fenix_session_upload_checks'
+        ordering = ['next_attempt_at']
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at']),
+        ]
+
+    def __str__(self):
+        return f"Upload check of {self.session_id} ({self.status}, {self.attempts} attempts)"
@@ -0,0 +1,103 @@
+"""
+Paginación por cursor (keyset) sobre (created_at, id)
+"""
+import base64
+import json
+import uuid
+from datetime import datetime
+from typing import Optional
+
+from django.db.models import Q, QuerySet
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+class InvalidCursor(ValueError):
+    """El cursor recibido no es válido"""
+
+
+def encode_cursor(created_at: datetime, pk) -> str:
+    """
+    Codifica la posición (created_at, id) de la última fila en un cursor opaco.
+
+    Args:
+        created_at: Fecha de creación de la última fila devuelta
+        pk: ID de la última fila devuelta
+
+    Returns:
+        String base64 url-safe
+    """
+    raw = json.dumps({"t": created_at.isoformat(), "id": str(pk)}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, uuid.UUID]:
+    """
+    Decodifica un cursor generado por encode_cursor.
+
+    Valida también los valores (fecha ISO e id UUID): un cursor bien formado
+    pero con un id que no es UUID haría fallar el filtro con un 500.
+
+    Raises:
+        InvalidCursor: Si el cursor está mal formado
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        return datetime.fromisoformat(data["t"]), uuid.UUID(data["id"])
+    except (ValueError, KeyError, TypeError, AttributeError) as e:
+        raise InvalidCursor("Invalid cursor") from e
+
+
+def clamp_limit(limit: Optional[int]) -> int:
+    """Limita el tamaño de página a [1, MAX_PAGE_SIZE]"""
+    if not limit:
+        return DEFAULT_PAGE_SIZE
+    return max(1, min(limit, MAX_PAGE_SIZE))
+
+
+async def apaginate(
+    queryset: QuerySet,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = None,
+    created_field: str = "created_at",
+    id_field: str = "id",
+) -> tuple[list, Optional[str]]:
+    """
+    Devuelve una página del queryset ordenada por (created_at, id) descendente.
+    Para handlers async: lee las filas con el ORM async de Django.
+
+    Args:
+        queryset: Queryset ya filtrado
+        cursor: Cursor de la página anterior (o None para la primera)
+        limit: Tamaño de página
+        created_field: Campo de fecha usado como clave principal del keyset
+        id_field: Campo usado como desempate
+
+    Returns:
+        Tupla (filas, next_cursor). next_cursor es None en la última página.
+
+    Raises:
+        InvalidCursor: Si el cursor está mal formado
+    """
+    limit = clamp_limit(limit)
+
+    if cursor:
+        created_at, pk = decode_cursor(cursor)
+        queryset = queryset.filter(
+            Q(**{f"{created_field}__lt": created_at}) |
+            Q(**{created_field: created_at, f"{id_field}__lt": pk})
+        )
+
+    # Una fila extra para saber si hay página siguiente sin hacer un COUNT
+    page = queryset.order_by(f"-{created_field}", f"-{id_field}")[:limit + 1]
+    rows = [row async for row in page]
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(getattr(last, created_field), getattr(last, id_field))
+
+    return rows, next_cursor
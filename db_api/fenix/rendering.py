@@ -0,0 +1,72 @@
+"""
+Serialización JSON rápida (orjson) para las respuestas de la API.
+
+ORJSONRenderer reemplaza al renderer JSON de Ninja para todas las respuestas.
+Los listados y lecturas grandes, que arman sus dicts desde filas del ORM ya
+conocidas, devuelven trusted_response: se serializan directo, sin pasar otra
+vez por la validación de Pydantic del schema de respuesta (el schema sigue
+documentando el contrato en OpenAPI; los tests comprueban que coincide).
+"""
+from typing import Any
+
+import orjson
+from django.http import HttpResponse
+from ninja.renderers import BaseRenderer
+from ninja.responses import NinjaJSONEncoder
+
+from .metrics import timed
+
+# UUID, datetime y dataclasses son nativos en orjson; los datetime UTC salen con "Z"
+ORJSON_OPTIONS = orjson.OPT_UTC_Z
+
+_fallback_encoder = NinjaJSONEncoder()
+
+
+def _default(obj: Any) -> Any:
+    # Tipos que orjson no conoce (Decimal, modelos Pydantic, lazy strings...)
+    return _fallback_encoder.default(obj)
+
+
+def dumps(data: Any) -> bytes:
+    """Serializa a JSON (bytes) con orjson"""
+    with timed('serialization'):
+        return orjson.dumps(data, default=_default, option=ORJSON_OPTIONS)
+
+
+class ORJSONRenderer(BaseRenderer):
+    """Renderer de Ninja basado en orjson"""
+    media_type = "application/json"
+
+    def render(self, request, data: Any, *, response_status: int) -> bytes:
+        return dumps(data)
+
+
+def trusted_response(data: Any, status: int = 200) -> HttpResponse:
+    """
+    Respuesta JSON que no se vuelve a validar contra el schema de respuesta.
+
+    Solo para dicts construidos desde filas del ORM con exactamente las
+    claves y tipos del schema declarado en el endpoint.
+
+    Args:
+        data: Cuerpo ya conforme al schema
+        status: Código HTTP
+
+    Returns:
+        HttpResponse con el JSON serializado por orjson
+    """
+    return HttpResponse(dumps(data), content_type="application/json", status=status)
+
+
+class UserDicts(dict):
+    """User -> dict de UserOut, construido una sola vez por usuario dentro de una respuesta"""
+
+    def __missing__(self, user):
+        value = self[user] = {
+            "github_handle": user.github_handle,
+            "email": user.email,
+            "display_name": user.display_name,
+            "is_active": user.is_active,
+            "created_at": user.created_at
+        }
+        return value
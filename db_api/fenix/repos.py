@@ -0,0 +1,63 @@
+"""
+Clave canónica de repositorio para Session.repo
+"""
+import re
+from typing import Optional
+from urllib.parse import urlsplit
+
+DEFAULT_HOST = 'github.com'
+
+# git@github.com:owner/repo.git (sintaxis scp de SSH)
+_SCP_RE = re.compile(r'^(?:[^@/\s]+@)?(?P<host>[^:/\s]+):(?!//)(?P<path>.+)$')
+
+
+def normalize_repo_key(repo: Optional[str]) -> Optional[str]:
+    """
+    Convierte un origen de git (HTTPS, SSH, scp, con o sin .git) o un 'owner/repo'
+    en una clave canónica, para que todas las formas del mismo repo coincidan.
+
+    Los repos de GitHub quedan como 'owner/repo'; los de otros hosts conservan
+    el host delante ('gitlab.com/group/repo') para no mezclar repos distintos.
+
+    Args:
+        repo: Repositorio tal como lo envía el cliente
+
+    Returns:
+        Clave en minúsculas, o None si no hay repo
+    """
+    if not repo:
+        return None
+
+    value = repo.strip()
+    # `git remote -v` añade "(fetch)"/"(push)" y puede traer el nombre del remote delante
+    value = re.sub(r'\s*\((?:fetch|push)\)\s*$', '', value)
+    value = value.split()[-1] if value.split() else ''
+
+    if '://' in value:
+        parts = urlsplit(value)
+        host, path = parts.hostname or '', parts.path
+    elif match := _SCP_RE.match(value):
+        host, path = match.group('host'), match.group('path')
+    else:
+        host, path = '', value
+
+    path = path.strip('/')
+    if path.endswith('.git'):
+        path = path[:-4]
+
+    segments = [s for s in path.split('/') if s]
+    # 'github.com/owner/repo' sin esquema
+    if not host and len(segments) > 2 and '.' in segments[0]:
+        host, segments = segments[0], segments[1:]
+
+    if not segments:
+        return None
+
+    host = host.lower()
+    if host.startswith('www.'):
+        host = host[4:]
+
+    key = '/'.join(segments).lower()
+    if host and host != DEFAULT_HOST:
+        key = f'{host}/{key}'
+    return key
@@ -0,0 +1,54 @@
+"""
+Router de base de datos con réplica de lectura opcional.
+
+Las escrituras van siempre a la primaria. Las lecturas van a la réplica solo
+dentro de `reads_from(alias)`, que abre ReplicaRoutingMiddleware para los GET
+de la API; fuera de ese contexto (POST/PATCH/DELETE, comandos, workers) todo
+se lee de la primaria.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+# Alias desde el que se leen las consultas del request en curso (None = primaria)
+_read_alias: ContextVar[Optional[str]] = ContextVar('fenix_read_alias', default=None)
+
+
+def replica_alias() -> Optional[str]:
+    """Alias de la réplica configurada, o None si no hay"""
+    alias = settings.FENIX_READ_REPLICA
+    if alias and alias in settings.DATABASES:
+        return alias
+    return None
+
+
+@contextmanager
+def reads_from(alias: Optional[str]):
+    """Dirige las lecturas del bloque a `alias` (None = primaria)"""
+    token = _read_alias.set(alias)
+    try:
+        yield
+    finally:
+        _read_alias.reset(token)
+
+
+class ReplicaRouter:
+    """Lecturas a la réplica cuando el request lo permite, escrituras siempre a la primaria"""
+
+    def db_for_read(self, model, **hints):
+        # Explícito: sin esto Django reusaría el alias de la instancia (p.ej. un User
+        # cacheado que se leyó de la réplica) para las relaciones que cargue después
+        return _read_alias.get() or DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Réplica y primaria tienen los mismos datos
+        allowed = {DEFAULT_DB_ALIAS, replica_alias()}
+        if obj1._state.db in allowed and obj2._state.db in allowed:
+            return True
+        return None
@@ -70,6 +70,11 @@ class TeamAddMemberIn(Schema):
     role: str = 'member'
 
 
+class TeamPageOut(Schema):
+    items: List[TeamOut]
+    next_cursor: Optional[str] = None
+
+
 # ============================================
 # SESSION SCHEMAS
 # ============================================
@@ -84,9 +89,37 @@ class SessionOut(Schema):
     owner: UserOut
     is_public: bool
     report_url: Optional[str] = None
+    report_status: str
     created_at: datetime
 
 
+class SessionFieldsOut(Schema):
+    """
+    SessionOut de los endpoints con sparse fieldsets (`fields=`): sin `fields` vienen
+    todas las claves de SessionOut; con `fields`, solo las pedidas (sin rellenar el resto).
+    """
+    id: Optional[UUID] = None
+    title: Optional[str] = None
+    description: Optional[str] = None
+    assistant_type: Optional[str] = None
+    repo: Optional[str] = None
+    metadata: Optional[dict] = None
+    owner: Optional[UserOut] = None
+    is_public: Optional[bool] = None
+    report_url: Optional[str] = None
+    report_status: Optional[str] = None
+    created_at: Optional[datetime] = None
+
+
+class SessionPageOut(Schema):
+    items: List[SessionFieldsOut]
+    next_cursor: Optional[str] = None
+
+
+class SessionSearchOut(Schema):
+    items: List[SessionFieldsOut]
+
+
 class SessionCreateIn(Schema):
     title: str
     description: Optional[str] = None
@@ -97,6 +130,30 @@ class SessionCreateIn(Schema):
     is_public: bool = False
 
 
+class SessionUploadIn(Schema):
+    sha256: str
+    size: int
+
+
+class SessionUploadOut(Schema):
+    upload_required: bool
+    key: Optional[str] = None
+    url: Optional[str] = None
+    headers: dict = {}
+    expires_in: Optional[int] = None
+
+
+class SessionFinalizeIn(Schema):
+    title: str
+    description: Optional[str] = None
+    sha256: str
+    key: Optional[str] = None
+    assistant_type: str = 'claude-code'
+    repo: Optional[str] = None
+    metadata: Optional[dict] = None
+    is_public: bool = False
+
+
 class SessionDetailOut(Schema):
     id: UUID
     title: str
@@ -108,10 +165,17 @@ class SessionDetailOut(Schema):
     owner: UserOut
     is_public: bool
     report_url: Optional[str] = None
+    report_status: str
     created_at: datetime
     updated_at: datetime
 
 
+class SessionDetailFieldsOut(SessionFieldsOut):
+    """SessionDetailOut de GET /sessions/{id}: con `fields`, solo las claves pedidas"""
+    session_data: Optional[str] = None
+    updated_at: Optional[datetime] = None
+
+
 class SessionUpdateIn(Schema):
     title: Optional[str] = None
     description: Optional[str] = None
@@ -138,10 +202,101 @@ class ShareSessionWithTeamOut(Schema):
 
 class TeamSessionOut(Schema):
     id: UUID
-    session: SessionOut
+    session: SessionFieldsOut
     shared_at: datetime
 
 
+class TeamSessionPageOut(Schema):
+    items: List[TeamSessionOut]
+    next_cursor: Optional[str] = None
+
+
+# ============================================
+# BATCH SCHEMAS
+# ============================================
+# Cada item del resultado lleva su propio status; la request solo falla entera
+# si el usuario no tiene permiso sobre el recurso común (equipo o sesión).
+
+class SessionBatchGetIn(Schema):
+    session_ids: List[UUID]
+
+
+class SessionBatchItemOut(Schema):
+    session_id: UUID
+    status: str  # ok | forbidden | not_found | upload_pending | upload_failed
+    session: Optional[SessionDetailOut] = None
+
+
+class SessionBatchGetOut(Schema):
+    results: List[SessionBatchItemOut]
+
+
+class ShareSessionsWithTeamIn(Schema):
+    session_ids: List[UUID]
+
+
+class ShareSessionWithTeamsIn(Schema):
+    team_ids: List[UUID]
+
+
+class ShareBatchItemOut(Schema):
+    team_id: UUID
+    session_id: UUID
+    status: str  # shared | already_shared | forbidden | not_found
+
+
+class ShareBatchOut(Schema):
+    shared: int
+    results: List[ShareBatchItemOut]
+
+
+class TeamAddMembersIn(Schema):
+    members: List[TeamAddMemberIn]
+
+
+class MemberBatchItemOut(Schema):
+    github_handle: str
+    status: str  # added | already_member | not_found
+    role: Optional[str] = None
+
+
+class MemberBatchOut(Schema):
+    added: int
+    results: List[MemberBatchItemOut]
+
+
+# ============================================
+# ACTIVITY FEED SCHEMAS
+# ============================================
+
+class ActivityTeamOut(Schema):
+    id: UUID
+    name: str
+
+
+class ActivitySessionOut(Schema):
+    id: UUID
+    title: str
+    repo: Optional[str] = None
+    report_url: Optional[str] = None
+
+
+class ActivityOut(Schema):
+    id: UUID
+    verb: str
+    actor: Optional[str] = None
+    team: Optional[ActivityTeamOut] = None
+    session: Optional[ActivitySessionOut] = None
+    member: Optional[str] = None
+    changed_fields: List[str] = []
+    created_at: datetime
+
+
+class ActivityPageOut(Schema):
+    items: List[ActivityOut]
+    next_cursor: Optional[str] = None
+
+
 # ============================================
 # ERROR SCHEMAS
 # ============================================
@@ -150,6 +305,11 @@ class ErrorOut(Schema):
     detail: str
 
 
+class UploadStateOut(ErrorOut):
+    """409: el contenido (subida directa) aún no está ingerido, o su ingesta falló"""
+    upload_status: str  # pending | failed
+
+
 class SuccessOut(Schema):
     success: bool
     message: str
@@ -0,0 +1,106 @@
+"""
+Caché de permisos por usuario: rol en cada equipo y sesiones visibles vía equipos.
+
+Convierte los chequeos de autorización (TeamUser...exists() y la visibilidad
+de get_session, leída de SessionVisibility) en búsquedas en memoria.
+Se invalida con signals al escribir TeamUser y TeamSession (ver signals.py).
+
+Igual que la caché de principals: los misses leen de la primaria y la
+invalidación espera al commit de la transacción que cambió los permisos.
+"""
+from dataclasses import dataclass, field
+from typing import Optional
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, transaction
+
+from ..models import TeamUser, SessionVisibility
+from .cache_service import FenixCache
+
+access_cache = FenixCache(
+    namespace='access',
+    ttl=settings.FENIX_ACCESS_CACHE_TTL,
+    maxsize=settings.FENIX_ACCESS_CACHE_MAXSIZE,
+    backend_alias=settings.FENIX_ACCESS_CACHE_BACKEND,
+)
+
+
+@dataclass(frozen=True)
+class UserAccess:
+    """Mapa de permisos de un usuario: team_id -> rol, y session_ids compartidas con sus equipos"""
+    roles: dict[str, str] = field(default_factory=dict)
+    session_ids: frozenset[str] = frozenset()
+
+    def role_in(self, team_id) -> Optional[str]:
+        return self.roles.get(str(team_id))
+
+    def is_member(self, team_id) -> bool:
+        return str(team_id) in self.roles
+
+    def is_team_admin(self, team_id) -> bool:
+        return self.role_in(team_id) in ('owner', 'admin')
+
+    def can_see_via_team(self, session_id) -> bool:
+        return str(session_id) in self.session_ids
+
+
+def _memberships(github_handle):
+    return TeamUser.objects.using(DEFAULT_DB_ALIAS).filter(user_id=github_handle).values_list('team_id', 'role')
+
+
+def _visible_session_ids(github_handle):
+    return (
+        SessionVisibility.objects.using(DEFAULT_DB_ALIAS)
+        .filter(user_id=github_handle)
+        .values_list('session_id', flat=True)
+    )
+
+
+def _build_access(memberships, session_ids) -> UserAccess:
+    return UserAccess(
+        roles={str(team_id): role for team_id, role in memberships},
+        session_ids=frozenset(str(session_id) for session_id in session_ids),
+    )
+
+
+def get_access(github_handle: str) -> UserAccess:
+    """Devuelve el mapa de permisos del usuario (2 queries en un miss, ninguna en un hit)"""
+    access = access_cache.get(github_handle)
+    if access is None:
+        memberships = list(_memberships(github_handle))
+        session_ids = list(_visible_session_ids(github_handle))
+        access = _build_access(memberships, session_ids)
+        access_cache.set(github_handle, access)
+    return access
+
+
+async def aget_access(github_handle: str) -> UserAccess:
+    """Versión async de get_access"""
+    access = await access_cache.aget(github_handle)
+    if access is None:
+        memberships = [m async for m in _memberships(github_handle)]
+        session_ids = [s async for s in _visible_session_ids(github_handle)]
+        access = _build_access(memberships, session_ids)
+        await access_cache.aset(github_handle, access)
+    return access
+
+
+def invalidate_access(github_handle: str) -> None:
+    """
+    Invalida el mapa de un usuario (cambió una de sus membresías).
+    Dentro de una transacción se invalida al confirmarla; fuera, en el momento.
+    """
+    transaction.on_commit(lambda: access_cache.delete(github_handle))
+
+
+def invalidate_team_access(team_id) -> None:
+    """Invalida el mapa de todos los miembros de un equipo (cambiaron sus sesiones compartidas)"""
+    # Los miembros se leen ya, dentro de la transacción: en un borrado en cascada
+    # del equipo sus TeamUser no existen después del commit
+    github_handles = list(TeamUser.objects.filter(team_id=team_id).values_list('user_id', flat=True))
+
+    def delete():
+        for github_handle in github_handles:
+            access_cache.delete(github_handle)
+
+    transaction.on_commit(delete)
@@ -0,0 +1,72 @@
+"""
+Feed de actividad por usuario (fan-out on write).
+
+Cada evento se copia a una fila por destinatario en el momento de la escritura,
+para que leer "qué hay de nuevo en todos mis equipos" sea un solo rango de índice.
+"""
+from datetime import timedelta
+from itertools import islice
+
+from django.utils import timezone
+
+from ..models import ActivityEntry, Session, SessionVisibility, Team, TeamUser, User
+
+BATCH_SIZE = 1000
+
+
+def _fan_out(recipient_ids, events: list[dict]) -> int:
+    """Crea una entrada por (destinatario, evento); devuelve cuántas"""
+    created_at = timezone.now()
+    rows = ((recipient_id, event) for recipient_id in recipient_ids for event in events)
+    total = 0
+    while batch := list(islice(rows, BATCH_SIZE)):
+        ActivityEntry.objects.bulk_create(
+            [ActivityEntry(recipient_id=recipient_id, created_at=created_at, **event) for recipient_id, event in batch]
+        )
+        total += len(batch)
+    return total
+
+
+def _team_members(team_ids, exclude: User):
+    return TeamUser.objects.filter(team_id__in=team_ids).exclude(user=exclude).values_list('user_id', flat=True)
+
+
+def record_sessions_shared(team: Team, sessions: list[Session], actor: User) -> int:
+    """Las sesiones se compartieron con el equipo: avisa a los demás miembros"""
+    events = [dict(verb='session_shared', actor=actor, team=team, session=session) for session in sessions]
+    return _fan_out(list(_team_members([team.id], actor)), events)
+
+
+def record_session_shared(team: Team, session: Session, actor: User) -> int:
+    """La sesión se compartió con el equipo: avisa a los demás miembros"""
+    return record_sessions_shared(team, [session], actor)
+
+
+def record_members_added(team: Team, members: list[User], actor: User) -> int:
+    """Nuevos miembros: avisa al resto del equipo y a los propios miembros"""
+    events = [dict(verb='member_added', actor=actor, team=team, member=member) for member in members]
+    return _fan_out(list(_team_members([team.id], actor)), events)
+
+
+def record_member_added(team: Team, member: User, actor: User) -> int:
+    """Nuevo miembro: avisa al resto del equipo y al propio miembro"""
+    return record_members_added(team, [member], actor)
+
+
+def record_session_updated(session: Session, actor: User, changed_fields: list[str]) -> int:
+    """Sesión compartida actualizada: avisa a quien la ve a través de algún equipo, con los campos que cambiaron"""
+    recipients = SessionVisibility.objects.filter(session=session).exclude(user=actor).values_list('user_id', flat=True)
+    event = dict(verb='session_updated', actor=actor, session=session, changed_fields=changed_fields)
+    return _fan_out(list(recipients), [event])
+
+
+def prune_activity(days: int) -> int:
+    """
+    Borra las entradas más antiguas que `days` días.
+
+    Returns:
+        Número de entradas borradas
+    """
+    cutoff = timezone.now() - timedelta(days=days)
+    deleted, _ = ActivityEntry.objects.filter(created_at__lt=cutoff).delete()
+    return deleted
@@ -0,0 +1,110 @@
+"""
+Cachés en memoria de fenix (usuarios autenticados, membresías...).
+
+Por defecto cada proceso tiene su propia LRU con TTL. Si se configura un alias
+de CACHES (p.ej. Redis), la caché pasa a ser compartida entre procesos y la
+invalidación explícita se ve en todos ellos.
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Optional
+
+from django.core.cache import caches
+
+
+class LocalTTLCache:
+    """LRU thread-safe con expiración por entrada"""
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+
+            expires_at, value = item
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return None
+
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any) -> None:
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+
+class FenixCache:
+    """
+    Caché con namespace: LRU local por proceso, o un backend de Django si se indica el alias.
+
+    Args:
+        namespace: Prefijo de las keys
+        ttl: Segundos de vida de cada entrada
+        maxsize: Máximo de entradas (solo LRU local)
+        backend_alias: Alias de settings.CACHES para compartir la caché entre procesos
+    """
+
+    def __init__(self, namespace: str, ttl: float, maxsize: int, backend_alias: Optional[str] = None):
+        self.namespace = namespace
+        self.ttl = ttl
+        self.backend_alias = backend_alias
+        self._local = LocalTTLCache(maxsize=maxsize, ttl=ttl) if not backend_alias else None
+
+    @property
+    def _backend(self):
+        return caches[self.backend_alias]
+
+    def _key(self, key: str) -> str:
+        return f"fenix:{self.namespace}:{key}"
+
+    def get(self, key: str) -> Optional[Any]:
+        if self._local is not None:
+            return self._local.get(key)
+        return self._backend.get(self._key(key))
+
+    def set(self, key: str, value: Any) -> None:
+        if self._local is not None:
+            self._local.set(key, value)
+        else:
+            self._backend.set(self._key(key), value, timeout=self.ttl)
+
+    def delete(self, key: str) -> None:
+        if self._local is not None:
+            self._local.delete(key)
+        else:
+            self._backend.delete(self._key(key))
+
+    async def aget(self, key: str) -> Optional[Any]:
+        if self._local is not None:
+            return self._local.get(key)
+        return await self._backend.aget(self._key(key))
+
+    async def aset(self, key: str, value: Any) -> None:
+        if self._local is not None:
+            self._local.set(key, value)
+        else:
+            await self._backend.aset(self._key(key), value, timeout=self.ttl)
+
+    def clear(self) -> None:
+        """Vacía la LRU local (las keys de un backend compartido expiran por TTL)"""
+        if self._local is not None:
+            self._local.clear()
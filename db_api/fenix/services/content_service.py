@@ -0,0 +1,71 @@
+"""
+Almacenamiento direccionado por contenido de los cuerpos HTML de las sesiones
+"""
+import hashlib
+from typing import Optional
+
+from django.db.models import ProtectedError
+
+from ..models import SessionContent
+
+
+def normalize_session_data(html_content: str) -> str:
+    """
+    Normaliza el HTML antes de calcular el hash, para que exports
+    equivalentes (finales de línea, espacios al borde) compartan blob.
+
+    Args:
+        html_content: HTML tal como lo envía el agente
+
+    Returns:
+        HTML normalizado
+    """
+    return html_content.replace('\r\n', '\n').replace('\r', '\n').strip()
+
+
+def content_sha256(html_content: str) -> str:
+    """SHA-256 hexadecimal del HTML ya normalizado"""
+    return hashlib.sha256(html_content.encode('utf-8')).hexdigest()
+
+
+def get_or_create_content(html_content: str) -> tuple[SessionContent, bool]:
+    """
+    Devuelve el blob con este contenido, creándolo solo si no existe.
+
+    Args:
+        html_content: HTML de la sesión
+
+    Returns:
+        Tupla (SessionContent, created)
+    """
+    body = normalize_session_data(html_content)
+    content, created = SessionContent.objects.get_or_create(
+        sha256=content_sha256(body),
+        defaults={'body': body}
+    )
+
+    if not created and body and not content.body:
+        # Blob de una subida directa que el worker aún no ingirió: el contenido ya lo tenemos aquí
+        content.body = body
+        SessionContent.objects.filter(id=content.id).update(body=body)
+
+    return content, created
+
+
+def release_content(content_id: Optional[str]) -> bool:
+    """
+    Elimina un blob si ninguna sesión lo referencia ya.
+
+    Returns:
+        True si se eliminó
+    """
+    if content_id is None:
+        return False
+
+    try:
+        deleted, _ = SessionContent.objects.filter(id=content_id, sessions__isnull=True).delete()
+    except ProtectedError:
+        # Otra sesión empezó a referenciarlo entre el filtro y el borrado
+        return False
+
+    return deleted > 0
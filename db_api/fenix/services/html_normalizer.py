@@ -0,0 +1,377 @@
+"""
+Normalizador de HTML en streaming (sin árbol DOM).
+
+PrettyPrinter produce la misma salida que `BeautifulSoup(html, 'html.parser').prettify()`
+y Minifier la versión compacta que se guarda en S3; ambos en una sola pasada
+sobre los tokens de `html.parser`, así que la memoria no crece con el tamaño del
+documento más allá de la propia salida.
+
+No importa Django: se ejecuta también en los procesos del pool de formateo.
+"""
+import gzip
+import re
+from html import unescape
+from html.entities import html5
+from html.parser import HTMLParser
+from typing import Callable, Iterable
+
+# Tags sin contenido; se escriben como <br/> (HTMLTreeBuilder.empty_element_tags de bs4)
+VOID_ELEMENTS = frozenset({
+    'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'keygen', 'link', 'menuitem', 'meta',
+    'param', 'source', 'track', 'wbr', 'basefont', 'bgsound', 'command', 'frame', 'image', 'isindex',
+    'nextid', 'spacer',
+})
+
+# Su contenido se copia tal cual, sin indentar ni recortar
+PRESERVE_WHITESPACE = frozenset({'pre', 'textarea'})
+
+# Su texto no se escapa
+CDATA_CONTAINING = frozenset({'script', 'style'})
+
+# Atributos con lista de valores separados por espacios (se normalizan a un espacio)
+MULTI_VALUED_ATTRIBUTES = {
+    '*': frozenset({'class', 'accesskey', 'dropzone'}),
+    'a': frozenset({'rel', 'rev'}),
+    'link': frozenset({'rel', 'rev'}),
+    'td': frozenset({'headers'}),
+    'th': frozenset({'headers'}),
+    'form': frozenset({'accept-charset'}),
+    'object': frozenset({'archive'}),
+    'area': frozenset({'rel'}),
+    'icon': frozenset({'sizes'}),
+    'iframe': frozenset({'sandbox'}),
+    'output': frozenset({'for'}),
+}
+
+INDENT = ' '
+CHUNK_SIZE = 64 * 1024
+
+_NONWHITESPACE_RE = re.compile(r'\S+')
+# Solo espacios ASCII: \s también casaría con &nbsp; (U+00A0), que sí se ve
+_WHITESPACE_RUN_RE = re.compile(r'[ \t\n\r\f]+')
+_ESCAPES = str.maketrans({'&': '&amp;', '<': '&lt;', '>': '&gt;'})
+
+
+def _escape(value: str) -> str:
+    return value.translate(_ESCAPES)
+
+
+def _quote(value: str) -> str:
+    if '"' in value:
+        if "'" in value:
+            return '"' + value.replace('"', '&quot;') + '"'
+        return "'" + value + "'"
+    return '"' + value + '"'
+
+
+def _format_attributes(tag: str, attrs: list) -> str:
+    values = {}
+    for name, value in attrs:
+        # Atributo repetido: gana el último
+        values[name] = '' if value is None else value
+
+    multi_valued = MULTI_VALUED_ATTRIBUTES['*'] | MULTI_VALUED_ATTRIBUTES.get(tag, frozenset())
+    parts = []
+    for name in sorted(values):
+        value = values[name]
+        if name in multi_valued:
+            value = ' '.join(_NONWHITESPACE_RE.findall(value))
+        parts.append(f"{name}={_quote(_escape(value))}")
+    return ''.join(' ' + part for part in parts)
+
+
+class PrettyPrinter(HTMLParser):
+    """
+    Tokenizer que escribe el HTML indentado a medida que lo recibe.
+
+    Args:
+        write: Función que recibe cada trozo de salida (p.ej. list.append)
+    """
+
+    def __init__(self, write: Callable[[str], None]):
+        super().__init__(convert_charrefs=False)
+        self._write = write
+        self._stack: list[str] = []
+        self._text: list[str] = []
+        # Profundidad de la pila en la que se abrió el <pre>/<textarea> que desactiva el indentado
+        self._literal_depth = None
+        # Tags vacíos ya cerrados con <br>: un </br> o <br/> posterior se "consume" (como bs4)
+        self._closed_voids: list[str] = []
+        # Tag vacío que quedó abierto: se escribe como <br/> si se cierra sin contenido
+        self._deferred = None
+
+    # --- salida ---
+
+    def _emit(self, piece: str, level: int, before: bool = True, after: bool = True) -> None:
+        if self._literal_depth is not None:
+            self._write(piece)
+            return
+        self._write((INDENT * level if before else '') + piece + ('\n' if after else ''))
+
+    def _emit_string(self, piece: str) -> None:
+        self._materialize()
+        if self._literal_depth is None:
+            piece = piece.strip()
+            if not piece:
+                return
+        self._emit(piece, len(self._stack))
+
+    def _materialize(self) -> None:
+        # El tag vacío abierto recibe contenido: pasa a escribirse como <br>...</br>
+        if self._deferred is not None:
+            piece, level = self._deferred
+            self._deferred = None
+            self._emit(piece, level)
+
+    def _flush_text(self) -> None:
+        if not self._text:
+            return
+        self._materialize()
+        text = ''.join(self._text)
+        self._text.clear()
+        if not (self._stack and self._stack[-1] in CDATA_CONTAINING):
+            text = _escape(text)
+        self._emit_string(text)
+
+    def _open(self, tag: str, attrs: list) -> None:
+        self._materialize()
+        piece = f"<{tag}{_format_attributes(tag, attrs)}>"
+        level = len(self._stack)
+        self._stack.append(tag)
+        if self._literal_depth is None and tag in PRESERVE_WHITESPACE:
+            self._emit(piece, level, after=False)
+            self._literal_depth = len(self._stack)
+        else:
+            self._emit(piece, level)
+
+    def _pop(self) -> str:
+        name = self._stack.pop()
+        if self._deferred is not None:
+            piece, level = self._deferred
+            self._deferred = None
+            self._emit(piece[:-1] + '/>', level)
+            return name
+
+        piece = f"</{name}>"
+        if self._literal_depth is not None and len(self._stack) + 1 == self._literal_depth:
+            self._literal_depth = None
+            self._emit(piece, len(self._stack), before=False)
+        else:
+            self._emit(piece, len(self._stack))
+        return name
+
+    def _close_to(self, tag: str) -> None:
+        # Cierra todo lo abierto hasta el último <tag>; un cierre sin apertura se ignora
+        if tag in self._stack:
+            while self._pop() != tag:
+                pass
+
+    # --- eventos de html.parser ---
+
+    def _empty_element(self, tag: str, attrs: list) -> None:
+        self._materialize()
+        self._emit(f"<{tag}{_format_attributes(tag, attrs)}/>", len(self._stack))
+
+    def handle_starttag(self, tag, attrs):
+        self._flush_text()
+        if tag in VOID_ELEMENTS:
+            self._empty_element(tag, attrs)
+            self._closed_voids.append(tag)
+        else:
+            self._open(tag, attrs)
+
+    def handle_startendtag(self, tag, attrs):
+        self._flush_text()
+        if tag not in VOID_ELEMENTS:
+            self._open(tag, attrs)
+            self._close_to(tag)
+        elif tag in self._closed_voids:
+            # bs4 toma el /> como el cierre pendiente de un <br> anterior y deja este abierto
+            self._closed_voids.remove(tag)
+            self._materialize()
+            self._deferred = (f"<{tag}{_format_attributes(tag, attrs)}>", len(self._stack))
+            self._stack.append(tag)
+        else:
+            self._empty_element(tag, attrs)
+
+    def handle_endtag(self, tag):
+        if tag in self._closed_voids:
+            self._closed_voids.remove(tag)
+            return
+        self._flush_text()
+        self._close_to(tag)
+
+    def handle_data(self, data):
+        self._text.append(data)
+
+    def handle_entityref(self, name):
+        self._text.append(html5.get(name + ';') or html5.get(name) or f"&{name}")
+
+    def handle_charref(self, name):
+        self._text.append(unescape(f"&#{name};"))
+
+    def handle_comment(self, data):
+        self._flush_text()
+        self._emit_string(f"<!--{data}-->")
+
+    def handle_decl(self, decl):
+        self._flush_text()
+        # Como Doctype.SUFFIX de bs4: el salto de línea se conserva dentro de <pre>
+        self._emit_string(f"<!DOCTYPE {decl[len('DOCTYPE '):]}>\n")
+
+    def unknown_decl(self, data):
+        self._flush_text()
+        if data.upper().startswith('CDATA['):
+            self._emit_string(f"<![CDATA[{data[len('CDATA['):]}]]>")
+        else:
+            self._emit_string(f"<?{data}?>")
+
+    def handle_pi(self, data):
+        self._flush_text()
+        self._emit_string(f"<?{data}>")
+
+    def close(self):
+        super().close()
+        self._flush_text()
+        while self._stack:
+            self._pop()
+
+
+class Minifier(HTMLParser):
+    """
+    Tokenizer que escribe el HTML sin espacios ni comentarios sobrantes.
+
+    Los tags de apertura se copian tal cual; el texto colapsa cada racha de
+    espacios en uno (salvo dentro de <pre>, <textarea>, <script> y <style>) y
+    los comentarios desaparecen, menos los condicionales (<!--[if IE]>...).
+
+    Args:
+        write: Función que recibe cada trozo de salida (p.ej. list.append)
+    """
+
+    def __init__(self, write: Callable[[str], None]):
+        super().__init__(convert_charrefs=True)
+        self._write = write
+        self._text: list[str] = []
+        # <pre>/<textarea>/<script>/<style> abiertos: su texto no se toca
+        self._literal: list[str] = []
+
+    def _flush_text(self) -> None:
+        if not self._text:
+            return
+        text = ''.join(self._text)
+        self._text.clear()
+        if not self._literal:
+            text = _WHITESPACE_RUN_RE.sub(' ', text)
+        if not (self._literal and self._literal[-1] in CDATA_CONTAINING):
+            # convert_charrefs ya resolvió las entidades: se vuelven a escapar lo justo
+            text = _escape(text)
+        self._write(text)
+
+    def handle_starttag(self, tag, attrs):
+        self._flush_text()
+        self._write(self.get_starttag_text())
+        if tag in PRESERVE_WHITESPACE or tag in CDATA_CONTAINING:
+            self._literal.append(tag)
+
+    def handle_startendtag(self, tag, attrs):
+        self._flush_text()
+        self._write(self.get_starttag_text())
+
+    def handle_endtag(self, tag):
+        self._flush_text()
+        if self._literal and self._literal[-1] == tag:
+            self._literal.pop()
+        self._write(f"</{tag}>")
+
+    def handle_data(self, data):
+        self._text.append(data)
+
+    def handle_comment(self, data):
+        # Un comentario eliminado no corta el texto: sus espacios a ambos lados se colapsan juntos
+        if data.startswith('['):
+            self._flush_text()
+            self._write(f"<!--{data}-->")
+
+    def handle_decl(self, decl):
+        self._flush_text()
+        self._write(f"<!{decl}>")
+
+    def unknown_decl(self, data):
+        self._flush_text()
+        self._write(f"<![{data}]>")
+
+    def handle_pi(self, data):
+        self._flush_text()
+        self._write(f"<?{data}>")
+
+    def close(self):
+        super().close()
+        self._flush_text()
+
+
+def _iter_parsed(parser_class, chunks: Iterable[str]) -> Iterable[str]:
+    out: list[str] = []
+    parser = parser_class(out.append)
+    for chunk in chunks:
+        parser.feed(chunk)
+        yield ''.join(out)
+        out.clear()
+    parser.close()
+    yield ''.join(out)
+
+
+def _chunks(html_content: str) -> Iterable[str]:
+    return (html_content[i:i + CHUNK_SIZE] for i in range(0, len(html_content), CHUNK_SIZE))
+
+
+def iter_pretty(chunks: Iterable[str]) -> Iterable[str]:
+    """Indenta un documento que llega por trozos; devuelve la salida también por trozos"""
+    return _iter_parsed(PrettyPrinter, chunks)
+
+
+def normalize_html(html_content: str) -> str:
+    """
+    Formatea HTML (minificado o no) con un tag por línea y un espacio por nivel.
+
+    Args:
+        html_content: Documento HTML
+
+    Returns:
+        El mismo resultado que BeautifulSoup(...).prettify() con html.parser
+    """
+    return ''.join(iter_pretty(_chunks(html_content)))
+
+
+def iter_minified(chunks: Iterable[str]) -> Iterable[str]:
+    """Minifica un documento que llega por trozos; devuelve la salida también por trozos"""
+    return _iter_parsed(Minifier, chunks)
+
+
+def minify_html(html_content: str) -> str:
+    """
+    Quita del HTML los espacios y comentarios que no cambian cómo se ve.
+
+    Args:
+        html_content: Documento HTML
+
+    Returns:
+        El documento minificado
+    """
+    return ''.join(iter_minified(_chunks(html_content)))
+
+
+def encode_report(html_content: str, compresslevel: int = 9) -> bytes:
+    """
+    Cuerpo del informe tal como se guarda en S3: HTML minificado y comprimido con gzip.
+
+    mtime=0 hace que el mismo contenido dé siempre los mismos bytes.
+
+    Args:
+        html_content: Documento HTML
+        compresslevel: Nivel de gzip (1-9)
+
+    Returns:
+        Bytes para subir con Content-Encoding: gzip
+    """
+    return gzip.compress(minify_html(html_content).encode('utf-8'), compresslevel=compresslevel, mtime=0)
@@ -0,0 +1,59 @@
+"""
+Caché de usuarios autenticados para get_user_from_request.
+
+Evita un SELECT por request para resolver un usuario que casi nunca cambia.
+Se invalida explícitamente al guardar o borrar un User (ver signals.py).
+
+Los misses leen de la primaria y la invalidación espera al commit: si no, un
+request concurrente podría volver a cachear el estado anterior (de antes del
+commit, o de una réplica con retraso) durante todo el TTL.
+"""
+import copy
+from typing import Optional
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, transaction
+
+from ..models import User
+from .cache_service import FenixCache
+
+principal_cache = FenixCache(
+    namespace='principal',
+    ttl=settings.FENIX_PRINCIPAL_CACHE_TTL,
+    maxsize=settings.FENIX_PRINCIPAL_CACHE_MAXSIZE,
+    backend_alias=settings.FENIX_PRINCIPAL_CACHE_BACKEND,
+)
+
+
+def get_principal(github_handle: str) -> Optional[User]:
+    """
+    Devuelve el User del handle, desde la caché o la base de datos.
+
+    Returns:
+        User, o None si no existe (los usuarios inexistentes no se cachean)
+    """
+    user = principal_cache.get(github_handle)
+    if user is None:
+        user = User.objects.using(DEFAULT_DB_ALIAS).filter(github_handle=github_handle).first()
+        if user is not None:
+            principal_cache.set(github_handle, user)
+    # Copia: la instancia cacheada se comparte entre requests y threads
+    return copy.copy(user)
+
+
+async def aget_principal(github_handle: str) -> Optional[User]:
+    """Versión async de get_principal"""
+    user = await principal_cache.aget(github_handle)
+    if user is None:
+        user = await User.objects.using(DEFAULT_DB_ALIAS).filter(github_handle=github_handle).afirst()
+        if user is not None:
+            await principal_cache.aset(github_handle, user)
+    return copy.copy(user)
+
+
+def invalidate_principal(github_handle: str) -> None:
+    """
+    Elimina el usuario de la caché (llamar tras cualquier cambio del User).
+    Dentro de una transacción se elimina al confirmarla; fuera, en el momento.
+    """
+    transaction.on_commit(lambda: principal_cache.delete(github_handle))
@@ -0,0 +1,289 @@
+"""
+Cola (outbox en base de datos) de subidas de reportes a S3.
+
+create_session/update_session solo encolan; el worker
+`python manage.py process_report_jobs` sube los blobs con reintentos y backoff.
+Los jobs de subidas directas (staged_key) primero ingieren el HTML desde S3, y las
+sesiones que reutilizan un contenido de otros esperan a que se verifique su subida
+(SessionUploadCheck). Las sesiones sin verificar no reciben el informe.
+"""
+from datetime import timedelta
+from typing import List, Optional
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from ..models import ReportJob, Session, SessionContent, SessionUploadCheck
+from .s3_service import s3_service
+from .search_service import update_search_vector
+from .upload_service import UploadError, ingest_upload, read_verified_upload, store_uploaded_body
+
+MAX_ATTEMPTS = 8
+BACKOFF_BASE_SECONDS = 5
+BACKOFF_MAX_SECONDS = 60 * 30
+# Tiempo que un job reclamado queda reservado para su worker
+LEASE_SECONDS = 60 * 10
+
+
+def backoff_delay(attempts: int) -> timedelta:
+    """Backoff exponencial: 5s, 10s, 20s... con tope de 30 minutos"""
+    return timedelta(seconds=min(BACKOFF_BASE_SECONDS * 2 ** (attempts - 1), BACKOFF_MAX_SECONDS))
+
+
+def enqueue_report_upload(content: SessionContent) -> ReportJob:
+    """
+    Encola la subida del blob. Debe llamarse dentro de la transacción que crea la sesión.
+
+    Si el job ya existía (terminado o fallido) se reactiva: la subida es idempotente
+    (un HEAD evita volver a subir) y así las sesiones nuevas que comparten el blob
+    también quedan marcadas como listas.
+    """
+    job, created = ReportJob.objects.select_for_update().get_or_create(content=content)
+
+    if not created and job.status != 'pending':
+        job.status = 'pending'
+        job.attempts = 0
+        job.next_attempt_at = timezone.now()
+        job.last_error = None
+        job.save(update_fields=['status', 'attempts', 'next_attempt_at', 'last_error', 'updated_at'])
+
+    return job
+
+
+def _claim_due_jobs(count: int) -> List[ReportJob]:
+    """
+    Reclama hasta `count` jobs vencidos en una transacción corta.
+
+    No se quedan bloqueados mientras se procesan: se les corre next_attempt_at
+    LEASE_SECONDS hacia delante, así que otro worker no los toma (salvo que este
+    muera y venza el lease) y las peticiones que encolan el mismo contenido no esperan.
+    """
+    with transaction.atomic():
+        jobs = list(
+            ReportJob.objects
+            .select_for_update(skip_locked=True)
+            .select_related('content')
+            .filter(status='pending', next_attempt_at__lte=timezone.now())
+            .order_by('next_attempt_at')[:count]
+        )
+        if jobs:
+            ReportJob.objects.filter(id__in=[job.id for job in jobs]).update(
+                attempts=F('attempts') + 1, next_attempt_at=timezone.now() + timedelta(seconds=LEASE_SECONDS)
+            )
+    for job in jobs:
+        job.attempts += 1
+    return jobs
+
+
+def _ingest(job: ReportJob) -> Optional[str]:
+    """Ingiere la subida directa del job; devuelve el error si falla"""
+    try:
+        ingest_upload(job)
+    except UploadError as e:
+        # Reintentar no cambia lo que se subió
+        job.attempts = MAX_ATTEMPTS
+        return str(e)
+    except Exception as e:
+        return f"{type(e).__name__}: {e}"
+    return None
+
+
+def _verified_sessions(content: SessionContent):
+    return Session.objects.filter(content=content, upload_check__isnull=True)
+
+
+@transaction.atomic
+def _finish_job(job: ReportJob, claimed_key: Optional[str], report_url: Optional[str], error: Optional[str]) -> None:
+    """Guarda el resultado de un job en su propia transacción corta"""
+    content = job.content
+
+    # Primero el lock del job: si una petición lo está encolando, se espera a que
+    # confirme y así el UPDATE de abajo también marca su sesión nueva
+    current_key = ReportJob.objects.select_for_update().values_list('staged_key', flat=True).get(id=job.id)
+    if current_key != claimed_key:
+        # Un finalize reemplazó la subida mientras se procesaba: se vuelve a intentar con la nueva
+        ReportJob.objects.filter(id=job.id).update(next_attempt_at=timezone.now(), attempts=job.attempts - 1)
+        return
+
+    if report_url:
+        job.status = 'done'
+        job.last_error = None
+        SessionContent.objects.filter(id=content.id).update(report_url=report_url)
+        _verified_sessions(content).update(report_url=report_url, report_status='ready')
+    elif job.attempts >= MAX_ATTEMPTS:
+        job.status = 'failed'
+        job.last_error = error
+        _verified_sessions(content).update(report_status='failed')
+    else:
+        job.last_error = error
+        job.next_attempt_at = timezone.now() + backoff_delay(job.attempts)
+
+    job.save(update_fields=['staged_key', 'status', 'attempts', 'next_attempt_at', 'last_error', 'updated_at'])
+
+
+def _run_jobs(jobs: List[ReportJob]) -> None:
+    """
+    Procesa un lote de jobs ya reclamados, sin ninguna transacción abierta.
+
+    Los blobs del lote se suben con una sola llamada a upload_content_blobs, que
+    minifica en paralelo en el pool de procesos los que son grandes.
+    """
+    claimed_keys = {job.id: job.staged_key for job in jobs}
+    errors = {}
+    for job in jobs:
+        if job.staged_key:
+            error = _ingest(job)
+            if error:
+                errors[job.id] = error
+
+    ready = [job for job in jobs if job.id not in errors]
+    try:
+        urls = s3_service.upload_content_blobs({job.content.sha256: job.content.body for job in ready})
+    except Exception as e:
+        urls = {}
+        for job in ready:
+            errors[job.id] = f"{type(e).__name__}: {e}"
+
+    for job in jobs:
+        report_url = urls.get(job.content.sha256) if job.id not in errors else None
+        error = errors.get(job.id) or (None if report_url else "S3 upload failed")
+        _finish_job(job, claimed_keys[job.id], report_url, error)
+
+
+def _claim_upload_checks(count: int) -> List[SessionUploadCheck]:
+    """Reclama hasta `count` verificaciones vencidas con el mismo lease que los jobs"""
+    with transaction.atomic():
+        checks = list(
+            SessionUploadCheck.objects
+            .select_for_update(skip_locked=True, of=('self',))
+            .select_related('session__content')
+            .filter(status='pending', next_attempt_at__lte=timezone.now())
+            .order_by('next_attempt_at')[:count]
+        )
+        if checks:
+            SessionUploadCheck.objects.filter(session_id__in=[check.session_id for check in checks]).update(
+                attempts=F('attempts') + 1, next_attempt_at=timezone.now() + timedelta(seconds=LEASE_SECONDS)
+            )
+    for check in checks:
+        check.attempts += 1
+    return checks
+
+
+def _run_upload_check(check: SessionUploadCheck) -> None:
+    """Descarga la subida de la sesión (sin transacción abierta) y comprueba su hash"""
+    try:
+        body = read_verified_upload(check.s3_key, check.session.content.sha256)
+        error = None
+    except UploadError as e:
+        # Reintentar no cambia lo que se subió
+        body = None
+        error = str(e)
+        check.attempts = MAX_ATTEMPTS
+    except Exception as e:
+        body = None
+        error = f"{type(e).__name__}: {e}"
+
+    _finish_upload_check(check, body, error)
+
+
+@transaction.atomic
+def _finish_upload_check(check: SessionUploadCheck, body: Optional[str], error: Optional[str]) -> None:
+    """
+    Guarda el resultado de una verificación en su propia transacción corta.
+
+    Si la subida es buena la sesión pasa a ser una más del contenido (body, índice
+    e informe). Si el contenido aún no tenía body (su subida original no se ingirió
+    o falló) se rellena con esta, que ya está verificada.
+    """
+    if not SessionUploadCheck.objects.select_for_update().filter(
+        session_id=check.session_id, s3_key=check.s3_key
+    ).exists():
+        # La sesión se borró o cambió de contenido mientras tanto
+        return
+
+    session = check.session
+
+    if body is not None:
+        job = ReportJob.objects.select_for_update().filter(content_id=session.content_id).first()
+        content = SessionContent.objects.only('id', 'sha256', 'report_url', 'body').get(id=session.content_id)
+
+        if not content.body and (job is None or job.status != 'failed'):
+            # La subida original aún se está ingiriendo: se espera a ver cómo termina
+            SessionUploadCheck.objects.filter(session_id=session.id).update(
+                attempts=check.attempts - 1, next_attempt_at=timezone.now() + backoff_delay(1)
+            )
+            return
+
+        SessionUploadCheck.objects.filter(session_id=session.id).delete()
+
+        if not content.body:
+            # La subida original no coincidía con su hash: quien la hizo no demostró tener
+            # el contenido y sus sesiones no lo ven al rellenarlo con esta, que sí está verificada
+            others = _verified_sessions(content).exclude(owner_id=session.owner_id).values_list('id', flat=True)
+            SessionUploadCheck.objects.bulk_create([
+                SessionUploadCheck(session_id=session_id, s3_key=job.staged_key, status='failed', last_error=job.last_error)
+                for session_id in others
+            ])
+            store_uploaded_body(content, body)
+
+            previous_key = job.staged_key
+            transaction.on_commit(lambda: s3_service.delete_upload(previous_key))
+            ReportJob.objects.filter(id=job.id).update(staged_key=None)
+        else:
+            update_search_vector(session, content.body)
+
+        Session.objects.filter(id=session.id).update(
+            report_url=content.report_url, report_status='ready' if content.report_url else 'pending'
+        )
+        if not content.report_url:
+            enqueue_report_upload(content)
+    elif check.attempts >= MAX_ATTEMPTS:
+        SessionUploadCheck.objects.filter(session_id=session.id).update(
+            status='failed', attempts=check.attempts, last_error=error
+        )
+        Session.objects.filter(id=session.id).update(report_status='failed')
+    else:
+        SessionUploadCheck.objects.filter(session_id=session.id).update(
+            last_error=error, next_attempt_at=timezone.now() + backoff_delay(check.attempts)
+        )
+        return
+
+    transaction.on_commit(lambda: s3_service.delete_upload(check.s3_key))
+
+
+def process_due_jobs(limit: int = 20) -> int:
+    """
+    Procesa hasta `limit` jobs pendientes cuyo próximo intento ya venció.
+
+    Los jobs se reclaman (SELECT ... FOR UPDATE SKIP LOCKED y lease) en lotes del
+    tamaño del pool de minificado (FENIX_HTML_FORMAT_WORKERS), así que varios
+    workers pueden correr en paralelo. Las llamadas a S3 y el minificado se hacen
+    sin transacción abierta; el resultado de cada job se guarda en la suya.
+
+    Antes procesa las verificaciones pendientes de subidas directas (SessionUploadCheck).
+
+    Returns:
+        Número de jobs y verificaciones procesados (con éxito o no)
+    """
+    processed = 0
+    batch_size = max(settings.FENIX_HTML_FORMAT_WORKERS, 1)
+
+    # Primero las verificaciones: las que salen bien pueden encolar su informe
+    while processed < limit:
+        checks = _claim_upload_checks(min(batch_size, limit - processed))
+        if not checks:
+            break
+        for check in checks:
+            _run_upload_check(check)
+        processed += len(checks)
+
+    while processed < limit:
+        jobs = _claim_due_jobs(min(batch_size, limit - processed))
+        if not jobs:
+            break
+        _run_jobs(jobs)
+        processed += len(jobs)
+
+    return processed
@@ -1,16 +1,91 @@
 """
 S3 Service para subir informes de sesiones en formato .html
 """
+import asyncio
 import boto3
+from asgiref.sync import sync_to_async
 from botocore.exceptions import ClientError
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
 from datetime import datetime
-from typing import Optional
+from typing import Dict, List, Optional
+import gzip
+import math
+import multiprocessing
 import os
+import time
 from dotenv import load_dotenv
-from bs4 import BeautifulSoup
+from django.conf import settings
+
+from ..metrics import timed
+from .html_normalizer import encode_report, normalize_html
 
 load_dotenv()
 
+# Content-Type firmado en las URLs de subida directa: el cliente tiene que mandar el mismo
+UPLOAD_CONTENT_TYPE = 'text/html; charset=utf-8'
+
+_format_pool: Optional[ProcessPoolExecutor] = None
+
+
+def format_pool() -> ProcessPoolExecutor:
+    """
+    Pool de procesos para minificar HTML grande sin retener el GIL del proceso que sube.
+
+    Se crea la primera vez que se usa, con 'spawn': los hijos no heredan
+    conexiones a la base de datos ni threads del padre.
+    """
+    global _format_pool
+    if _format_pool is None:
+        _format_pool = ProcessPoolExecutor(
+            max_workers=settings.FENIX_HTML_FORMAT_WORKERS,
+            mp_context=multiprocessing.get_context('spawn'),
+        )
+    return _format_pool
+
+
+def _discard_format_pool(kill: bool = False) -> None:
+    """
+    Descarta el pool; el próximo informe crea uno nuevo.
+
+    Con kill=True además mata los hijos: shutdown() no interrumpe un minificado
+    que ya superó el timeout, y ese proceso seguiría ocupando CPU y memoria.
+    """
+    global _format_pool
+    pool, _format_pool = _format_pool, None
+    if pool is None:
+        return
+    # shutdown() deja _processes a None: hay que tomarlos antes
+    processes = list((pool._processes or {}).values()) if kill else []
+    pool.shutdown(wait=False, cancel_futures=True)
+    for process in processes:
+        process.kill()
+
+
+async def apretty_html(html_content: str) -> str:
+    """
+    Indenta el HTML de un informe (`?pretty=true`) fuera del thread de la petición.
+
+    Los documentos grandes se indentan en el pool de procesos y los pequeños en
+    un thread aparte. Por encima de FENIX_REPORT_PRETTY_MAX_CHARS, o si el pool
+    falla o no termina a tiempo, se devuelve el HTML tal como está guardado.
+    """
+    if len(html_content) > settings.FENIX_REPORT_PRETTY_MAX_CHARS:
+        return html_content
+
+    if settings.FENIX_HTML_FORMAT_WORKERS <= 0 or len(html_content) < settings.FENIX_HTML_FORMAT_POOL_MIN_CHARS:
+        return await sync_to_async(normalize_html, thread_sensitive=False)(html_content)
+
+    try:
+        future = format_pool().submit(normalize_html, html_content)
+        return await asyncio.wait_for(asyncio.wrap_future(future), timeout=settings.FENIX_HTML_FORMAT_TIMEOUT)
+    except (BrokenProcessPool, asyncio.TimeoutError) as e:
+        _discard_format_pool(kill=True)
+        print(f"Warning: Could not format HTML: {type(e).__name__}: {e}")
+    except Exception as e:
+        print(f"Warning: Could not format HTML: {e}")
+    return html_content
+
 
 class S3Service:
     """Servicio para manejar subidas de archivos a S3"""
@@ -24,77 +99,184 @@ class S3Service:
         )
         self.bucket_name = os.getenv('S3_BUCKET_NAME')
 
-    def _format_html(self, html_content: str) -> str:
+    def _encode_report(self, html_content: str) -> bytes:
+        """Minifica el HTML y lo comprime con gzip para guardarlo en S3"""
+        return self._encode_reports([html_content])[0]
+
+    def _encode_reports(self, documents: List[str]) -> List[bytes]:
         """
-        Formatea HTML minificado a HTML bien indentado y estructurado.
+        Minifica y comprime con gzip varios informes a la vez.
+
+        Los documentos grandes se mandan todos juntos al pool de procesos, así
+        que se procesan en paralelo; los pequeños no compensan el envío entre
+        procesos y se procesan aquí mientras tanto. Si el pool se rompe o no
+        termina a tiempo se matan sus hijos y esos informes se suben sin minificar.
 
         Args:
-            html_content: HTML en una sola línea o minificado
+            documents: HTML de los informes (indentados o minificados)
 
         Returns:
-            HTML formateado con indentación correcta
+            Cuerpos comprimidos, en el mismo orden, para subir con Content-Encoding: gzip
         """
+        level = settings.FENIX_REPORT_GZIP_LEVEL
+        workers = settings.FENIX_HTML_FORMAT_WORKERS
+        bodies: List[Optional[bytes]] = [None] * len(documents)
+
+        futures = {}
+        if workers > 0:
+            pending = [i for i, html in enumerate(documents) if len(html) >= settings.FENIX_HTML_FORMAT_POOL_MIN_CHARS]
+            try:
+                pool = format_pool()
+                for i in pending:
+                    futures[i] = pool.submit(encode_report, documents[i], level)
+            except BrokenProcessPool as e:
+                _discard_format_pool(kill=True)
+                print(f"Warning: Could not minify HTML: {e}")
+        # Cada tanda de `workers` documentos tiene FENIX_HTML_FORMAT_TIMEOUT segundos
+        deadline = time.monotonic() + settings.FENIX_HTML_FORMAT_TIMEOUT * math.ceil(len(futures) / max(workers, 1))
+
+        for i, html in enumerate(documents):
+            if i in futures:
+                continue
+            try:
+                bodies[i] = encode_report(html, level)
+            except Exception as e:
+                print(f"Warning: Could not minify HTML: {e}")
+
+        for i, future in futures.items():
+            try:
+                bodies[i] = future.result(timeout=max(deadline - time.monotonic(), 0))
+            except (BrokenProcessPool, FutureTimeoutError) as e:
+                # Un hijo murió (OOM...) o sigue atascado: el próximo informe crea un pool nuevo
+                _discard_format_pool(kill=True)
+                print(f"Warning: Could not minify HTML: {type(e).__name__}: {e}")
+            except Exception as e:
+                print(f"Warning: Could not minify HTML: {e}")
+
+        # Si falla el minificado, subir el original (comprimido igualmente)
+        return [
+            body if body is not None else gzip.compress(html.encode('utf-8'), compresslevel=level, mtime=0)
+            for body, html in zip(bodies, documents)
+        ]
+
+    def _public_url(self, s3_key: str) -> str:
+        """URL pública PERMANENTE (el acceso se configura via Bucket Policy)"""
+        return f"https://{self.bucket_name}.s3.amazonaws.com/{s3_key}"
+
+    def _object_exists(self, s3_key: str) -> bool:
+        """HEAD del objeto: mucho más barato que volver a subirlo"""
         try:
-            soup = BeautifulSoup(html_content, 'html.parser')
-            formatted_html = soup.prettify()
-            return formatted_html
-        except Exception as e:
-            print(f"Warning: Could not format HTML: {e}")
-            # Si falla el formateo, devolver el original
-            return html_content
-
-    def upload_session_report(
-        self,
-        session_id: str,
-        content: str,
-        github_handle: str
-    ) -> Optional[str]:
+            with timed('s3'):
+                self.s3_client.head_object(Bucket=self.bucket_name, Key=s3_key)
+            return True
+        except ClientError:
+            return False
+
+    def upload_content_blob(self, sha256: str, content: str) -> Optional[str]:
         """
-        Sube un informe de sesión a S3 en formato .html
+        Sube el HTML de una sesión a S3 direccionado por su hash.
+
+        El mismo contenido siempre va a la misma key (blobs/<sha256>.html),
+        así que si el objeto ya existe no se vuelve a subir.
 
         Args:
-            session_id: UUID de la sesión
+            sha256: Hash del contenido normalizado
             content: Contenido HTML del informe (puede estar minificado)
-            github_handle: Handle de GitHub del owner
 
         Returns:
             URL pública del archivo en S3, o None si falla
         """
-        # Generar nombre del archivo con timestamp
-        timestamp = datetime.utcnow().strftime('%Y%m%d_%H%M%S')
-        file_name = f"{session_id}_{timestamp}.html"
+        return self.upload_content_blobs({sha256: content})[sha256]
+
+    def upload_content_blobs(self, contents: Dict[str, str]) -> Dict[str, Optional[str]]:
+        """
+        Sube varios blobs de una vez: los que faltan en S3 se minifican en paralelo.
+
+        Args:
+            contents: HTML de cada informe por su sha256
+
+        Returns:
+            URL pública de cada sha256, o None si su subida falló
+        """
+        urls: Dict[str, Optional[str]] = {}
+        missing = []
+        for sha256 in contents:
+            s3_key = f"blobs/{sha256}.html"
+            if self._object_exists(s3_key):
+                urls[sha256] = self._public_url(s3_key)
+            else:
+                missing.append(sha256)
+
+        # Minificar y comprimir antes de subir
+        bodies = self._encode_reports([contents[sha256] for sha256 in missing])
+
+        for sha256, body in zip(missing, bodies):
+            s3_key = f"blobs/{sha256}.html"
+            try:
+                # Subir archivo a S3
+                # El acceso público se configura via Bucket Policy (no ACL)
+                # La key depende del contenido: el objeto nunca cambia y se puede cachear sin límite
+                with timed('s3'):
+                    self.s3_client.put_object(
+                        Bucket=self.bucket_name,
+                        Key=s3_key,
+                        Body=body,
+                        ContentType='text/html; charset=utf-8',
+                        ContentEncoding='gzip',
+                        ContentDisposition='inline',
+                        CacheControl='public, max-age=31536000, immutable',
+                        Metadata={
+                            'sha256': sha256,
+                            'uploaded_at': datetime.utcnow().strftime('%Y%m%d_%H%M%S')
+                        }
+                    )
+                urls[sha256] = self._public_url(s3_key)
+
+            except ClientError as e:
+                print(f"Error uploading to S3: {e}")
+                urls[sha256] = None
+
+        return urls
+
+    def presign_upload(self, s3_key: str) -> str:
+        """
+        URL prefirmada para que el cliente suba el HTML directamente al bucket (PUT).
 
-        # Path en S3: reports/{github_handle}/{session_id}_{timestamp}.html
-        s3_key = f"reports/{github_handle}/{file_name}"
+        Args:
+            s3_key: Key de staging (uploads/<github_handle>/<uuid>.html)
 
+        Returns:
+            URL válida FENIX_DIRECT_UPLOAD_EXPIRES segundos
+        """
+        return self.s3_client.generate_presigned_url(
+            'put_object',
+            Params={'Bucket': self.bucket_name, 'Key': s3_key, 'ContentType': UPLOAD_CONTENT_TYPE},
+            ExpiresIn=settings.FENIX_DIRECT_UPLOAD_EXPIRES,
+        )
+
+    def object_size(self, s3_key: str) -> Optional[int]:
+        """Tamaño en bytes de un objeto, o None si no existe"""
         try:
-            # Formatear HTML antes de subir
-            formatted_content = self._format_html(content)
-
-            # Subir archivo a S3
-            # El acceso público se configura via Bucket Policy (no ACL)
-            self.s3_client.put_object(
-                Bucket=self.bucket_name,
-                Key=s3_key,
-                Body=formatted_content.encode('utf-8'),
-                ContentType='text/html; charset=utf-8',
-                ContentDisposition='inline',
-                Metadata={
-                    'session_id': session_id,
-                    'owner': github_handle,
-                    'uploaded_at': timestamp
-                }
-            )
-
-            # Generar URL pública PERMANENTE
-            # Este link funciona indefinidamente mientras el archivo exista
-            url = f"https://{self.bucket_name}.s3.amazonaws.com/{s3_key}"
-
-            return url
+            with timed('s3'):
+                return self.s3_client.head_object(Bucket=self.bucket_name, Key=s3_key)['ContentLength']
+        except ClientError:
+            return None
 
+    def read_upload(self, s3_key: str) -> str:
+        """Descarga un HTML subido directamente por el cliente"""
+        with timed('s3'):
+            response = self.s3_client.get_object(Bucket=self.bucket_name, Key=s3_key)
+            return response['Body'].read().decode('utf-8')
+
+    def delete_upload(self, s3_key: str) -> bool:
+        """Borra un objeto de staging ya ingerido (o descartado)"""
+        try:
+            with timed('s3'):
+                self.s3_client.delete_object(Bucket=self.bucket_name, Key=s3_key)
+            return True
         except ClientError as e:
-            print(f"Error uploading to S3: {e}")
-            return None
+            print(f"Error deleting from S3: {e}")
+            return False
 
     def delete_session_report(self, report_url: str) -> bool:
         """
@@ -111,10 +293,11 @@ class S3Service:
             # https://bucket.s3.amazonaws.com/reports/user/file.md -> reports/user/file.md
             s3_key = report_url.split('.com/')[-1]
 
-            self.s3_client.delete_object(
-                Bucket=self.bucket_name,
-                Key=s3_key
-            )
+            with timed('s3'):
+                self.s3_client.delete_object(
+                    Bucket=self.bucket_name,
+                    Key=s3_key
+                )
 
             return True
 
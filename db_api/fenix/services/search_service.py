@@ -0,0 +1,150 @@
+"""
+Búsqueda full-text de sesiones (Postgres tsvector + GIN).
+
+El vector se guarda en SessionSearch (una fila por sesión, fuera de
+fenix_sessions) y se recalcula al escribir: título (peso A), descripción (B) y
+texto extraído del HTML del cuerpo (C).
+"""
+from html.parser import HTMLParser
+
+from django.conf import settings
+from django.contrib.postgres.search import (
+    SearchQuery, SearchRank, SearchVector, SearchVectorCombinable, SearchVectorField
+)
+from django.db import connection
+from django.db.models import F, Func, Q, QuerySet, TextField, Value
+
+from ..models import Session, SessionSearch, SessionVisibility, User
+
+# tsvector admite hasta 1 MB; el texto del cuerpo se recorta antes
+MAX_BODY_TEXT_CHARS = 200_000
+
+
+class _TextExtractor(HTMLParser):
+    """Junta el texto visible del HTML, ignorando <script> y <style>"""
+
+    SKIPPED_TAGS = {'script', 'style'}
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts: list[str] = []
+        self.length = 0
+        self._skipping = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self.SKIPPED_TAGS:
+            self._skipping += 1
+
+    def handle_endtag(self, tag):
+        if tag in self.SKIPPED_TAGS and self._skipping:
+            self._skipping -= 1
+
+    def handle_data(self, data):
+        if self._skipping or self.length >= MAX_BODY_TEXT_CHARS:
+            return
+        text = data.strip()
+        if text:
+            self.parts.append(text)
+            self.length += len(text) + 1
+
+
+def extract_text(html_content: str) -> str:
+    """
+    Extrae el texto plano de un export HTML para indexarlo.
+
+    Args:
+        html_content: HTML de la sesión
+
+    Returns:
+        Texto visible, recortado a MAX_BODY_TEXT_CHARS
+    """
+    parser = _TextExtractor()
+    parser.feed(html_content)
+    parser.close()
+    return ' '.join(parser.parts)[:MAX_BODY_TEXT_CHARS]
+
+
+def search_enabled() -> bool:
+    """La búsqueda full-text solo existe en Postgres"""
+    return connection.vendor == 'postgresql'
+
+
+class _BodyLexemes(SearchVectorCombinable, Func):
+    """Solo las lexemas de peso C (texto del cuerpo) de un tsvector"""
+    function = 'ts_filter'
+    template = "%(function)s(%(expressions)s, '{c}')"
+    output_field = SearchVectorField()
+    config = None
+
+
+def _metadata_vector(session: Session):
+    config = settings.FENIX_SEARCH_CONFIG
+    return (
+        SearchVector(Value(session.title, output_field=TextField()), weight='A', config=config) +
+        SearchVector(Value(session.description or '', output_field=TextField()), weight='B', config=config)
+    )
+
+
+def update_search_vector(session: Session, body: str) -> None:
+    """
+    Recalcula el tsvector de una sesión a partir de su metadata y su cuerpo.
+    No hace nada fuera de Postgres.
+    """
+    if not search_enabled():
+        return
+
+    body_vector = SearchVector(
+        Value(extract_text(body), output_field=TextField()), weight='C', config=settings.FENIX_SEARCH_CONFIG
+    )
+    SessionSearch.objects.update_or_create(
+        session_id=session.id, defaults={'vector': _metadata_vector(session) + body_vector}
+    )
+
+
+def update_search_metadata(session: Session) -> bool:
+    """
+    Recalcula solo título y descripción del tsvector, conservando las lexemas del
+    cuerpo ya indexadas: no hace falta leer ni descomprimir el contenido.
+
+    Returns:
+        False si la sesión aún no tiene vector (hay que llamar a update_search_vector)
+    """
+    if not search_enabled():
+        return True
+
+    updated = SessionSearch.objects.filter(session_id=session.id).update(
+        vector=_metadata_vector(session) + _BodyLexemes('vector')
+    )
+    return bool(updated)
+
+
+def visible_sessions(user: User) -> QuerySet:
+    """Sesiones que el usuario puede abrir: mismas reglas que get_session"""
+    return Session.objects.filter(
+        Q(owner=user) |
+        Q(is_public=True) |
+        Q(id__in=SessionVisibility.objects.filter(user=user).values('session_id'))
+    )
+
+
+def search_visible_sessions(user: User, query: str) -> QuerySet:
+    """
+    Sesiones visibles para el usuario que coinciden con la búsqueda, ordenadas por relevancia.
+
+    En Postgres usa el tsvector (sintaxis websearch: "frase exacta", -excluir, OR).
+    En otros motores (desarrollo local) cae a un icontains sobre título y descripción.
+    """
+    sessions = visible_sessions(user).for_listing()
+
+    if not search_enabled():
+        return sessions.filter(
+            Q(title__icontains=query) | Q(description__icontains=query)
+        ).order_by('-created_at')
+
+    search_query = SearchQuery(query, search_type='websearch', config=settings.FENIX_SEARCH_CONFIG)
+    return (
+        sessions
+        .filter(search__vector=search_query)
+        .annotate(rank=SearchRank(F('search__vector'), search_query))
+        .order_by('-rank', '-created_at')
+    )
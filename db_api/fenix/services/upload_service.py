@@ -0,0 +1,172 @@
+"""
+Subidas directas a S3 de exports grandes, sin pasar el HTML por la API.
+
+1. POST /sessions/uploads: el cliente declara sha256 y tamaño y recibe una URL
+   prefirmada (o upload_required=False si ya tiene una sesión con ese contenido).
+2. El cliente sube el HTML normalizado con un PUT a esa URL.
+3. POST /sessions/uploads/finalize: crea la sesión con la key y el sha256. El
+   contenido queda vacío y el worker de informes lo descarga, verifica el hash
+   y rellena el body antes de generar el informe. Si el contenido ya existía en
+   sesiones de otros, el worker verifica la subida de esta sesión antes de
+   dejarle verlo (SessionUploadCheck).
+"""
+import re
+import uuid
+from typing import Optional
+
+from django.conf import settings
+from django.db import transaction
+
+from ..models import ReportJob, Session, SessionContent
+from .content_service import content_sha256, normalize_session_data
+from .s3_service import s3_service
+from .search_service import update_search_vector
+
+UPLOAD_PREFIX = 'uploads'
+
+_SHA256_RE = re.compile(r'^[0-9a-f]{64}$')
+
+
+class UploadError(Exception):
+    """Subida inválida: se devuelve como 400"""
+
+
+def validate_sha256(sha256: str) -> None:
+    if not _SHA256_RE.match(sha256):
+        raise UploadError("sha256 must be 64 lowercase hex characters")
+
+
+def validate_size(size: int) -> None:
+    if size < 0 or size > settings.FENIX_DIRECT_UPLOAD_MAX_BYTES:
+        raise UploadError(f"size must be between 0 and {settings.FENIX_DIRECT_UPLOAD_MAX_BYTES} bytes")
+
+
+def upload_key(github_handle: str) -> str:
+    """Key de staging nueva; incluye al usuario para que nadie finalice la subida de otro"""
+    return f"{UPLOAD_PREFIX}/{github_handle}/{uuid.uuid4()}.html"
+
+
+def needs_upload(sha256: str, github_handle: str) -> bool:
+    """
+    False si el usuario ya tiene una sesión con este contenido ingerido (basta con finalizar sin key).
+
+    Que exista en sesiones de otros no cuenta: el sha256 es público (va en la URL del
+    informe) y no demuestra tener el contenido, ni se debe poder averiguar si existe.
+    """
+    return not Session.objects.filter(
+        owner_id=github_handle, content__sha256=sha256, content__report_job__staged_key__isnull=True,
+        upload_check__isnull=True
+    ).exists()
+
+
+def check_uploaded_object(github_handle: str, s3_key: str) -> None:
+    """
+    Verifica que la key es del usuario y que el objeto está subido y no excede el límite.
+
+    El hash no se puede comprobar sin descargarlo: lo verifica el worker al ingerirlo.
+
+    Raises:
+        UploadError: Key ajena, objeto inexistente o demasiado grande
+    """
+    if not s3_key.startswith(f"{UPLOAD_PREFIX}/{github_handle}/"):
+        raise UploadError("Upload key does not belong to this user")
+
+    size = s3_service.object_size(s3_key)
+    if size is None:
+        raise UploadError("Uploaded object not found; PUT it to the presigned URL first")
+    if size > settings.FENIX_DIRECT_UPLOAD_MAX_BYTES:
+        s3_service.delete_upload(s3_key)
+        raise UploadError(f"Uploaded object exceeds {settings.FENIX_DIRECT_UPLOAD_MAX_BYTES} bytes")
+
+
+def read_verified_upload(s3_key: str, sha256: str) -> str:
+    """
+    Descarga una subida directa y comprueba que es el contenido declarado.
+
+    Returns:
+        HTML normalizado
+
+    Raises:
+        UploadError: El objeto no coincide con el sha256
+    """
+    body = normalize_session_data(s3_service.read_upload(s3_key))
+    if content_sha256(body) != sha256:
+        raise UploadError("Uploaded object does not match its declared sha256")
+    return body
+
+
+def stage_upload(
+    sha256: str, s3_key: Optional[str], github_handle: str
+) -> tuple[SessionContent, bool, Optional[str]]:
+    """
+    Blob para una subida directa. Debe llamarse dentro de una transacción.
+
+    Si el contenido no existe se crea vacío y su ReportJob apunta a la key. Si ya
+    existe, solo se reutiliza sin más cuando el usuario ya tiene una sesión con él;
+    si no, hace falta la key y su hash lo comprueba el worker (SessionUploadCheck)
+    antes de que la sesión vea el contenido. Aquí no se descarga nada.
+
+    Returns:
+        Tupla (SessionContent, staged, check_key): staged=True si el body llegará con
+        el worker; check_key es la subida que hay que verificar para esta sesión, o None
+
+    Raises:
+        UploadError: Falta la key
+    """
+    content, created = SessionContent.objects.get_or_create(sha256=sha256, defaults={'body': ''})
+    job = ReportJob.objects.select_for_update().filter(content=content).first()
+
+    if created:
+        if not s3_key:
+            raise UploadError("Content not uploaded yet: request an upload URL first")
+        # attach_session_report encola el job después
+        ReportJob.objects.update_or_create(content=content, defaults={'staged_key': s3_key})
+        return content, True, None
+
+    staged = job is not None and job.staged_key is not None
+
+    if not Session.objects.filter(owner_id=github_handle, content=content, upload_check__isnull=True).exists():
+        # Mismo error que si no existiera: no se revela si otro usuario lo tiene
+        if not s3_key:
+            raise UploadError("Content not uploaded yet: request an upload URL first")
+        return content, staged, s3_key
+
+    if staged and s3_key and job.status == 'failed':
+        # La subida anterior fallida se reemplaza por esta
+        previous_key = job.staged_key
+        transaction.on_commit(lambda: s3_service.delete_upload(previous_key))
+        ReportJob.objects.filter(id=job.id).update(staged_key=s3_key)
+    elif s3_key:
+        # El contenido ya está (o llegará con otra subida): esta key sobra
+        transaction.on_commit(lambda: s3_service.delete_upload(s3_key))
+
+    return content, staged, None
+
+
+def store_uploaded_body(content: SessionContent, body: str) -> None:
+    """Guarda el body ya verificado de un contenido vacío e indexa sus sesiones verificadas"""
+    content.body = body
+    with transaction.atomic():
+        SessionContent.objects.filter(id=content.id).update(body=body)
+        sessions = Session.objects.filter(content=content, upload_check__isnull=True)
+        for session in sessions.only('id', 'title', 'description'):
+            update_search_vector(session, body)
+
+
+def ingest_upload(job: ReportJob) -> None:
+    """
+    Descarga el HTML de una subida directa, verifica su hash y lo guarda como body.
+
+    Si mientras tanto alguien creó la sesión con el mismo contenido por la vía
+    normal, el body ya está y solo se borra el objeto de staging.
+
+    Raises:
+        UploadError: El objeto subido no coincide con el sha256 declarado
+    """
+    content = job.content
+    if not content.body:
+        # La descarga va fuera de la transacción; solo las escrituras van dentro
+        store_uploaded_body(content, read_verified_upload(job.staged_key, content.sha256))
+
+    s3_service.delete_upload(job.staged_key)
+    job.staged_key = None
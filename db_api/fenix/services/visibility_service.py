@@ -0,0 +1,137 @@
+"""
+Mantenimiento incremental de SessionVisibility (sesiones visibles por usuario vía equipos).
+
+Cada escritura de TeamSession o TeamUser añade las filas nuevas y, al quitar
+un acceso, borra solo las que ya no tienen otro camino (otro equipo que
+comparta la sesión con el usuario). Los signals de signals.py llaman a estas funciones;
+las escrituras con bulk_create (sin signals) llaman a las variantes por lotes.
+
+Las altas de un mismo equipo se serializan con un lock sobre su fila de Team: sin él,
+compartir una sesión y añadir un miembro a la vez (cada una sin ver la fila aún sin
+confirmar de la otra) no crearía la fila de visibilidad de ese par.
+"""
+from itertools import islice
+from typing import Optional
+
+from django.db import transaction
+from django.db.models import QuerySet
+
+from ..models import Session, SessionVisibility, Team, TeamSession, TeamUser
+
+BATCH_SIZE = 1000
+
+
+def _create_rows(rows) -> None:
+    """Inserta (user_id, session_id, created_at, repo_key) por lotes; las filas ya existentes se ignoran"""
+    rows = iter(rows)
+    while batch := list(islice(rows, BATCH_SIZE)):
+        SessionVisibility.objects.bulk_create(
+            [
+                SessionVisibility(user_id=user_id, session_id=session_id, created_at=created_at, repo_key=repo_key)
+                for user_id, session_id, created_at, repo_key in batch
+            ],
+            ignore_conflicts=True,
+        )
+
+
+def _lock_teams(team_ids) -> None:
+    """
+    Lock de las filas de los equipos hasta el final de la transacción.
+
+    Se toma después de insertar TeamUser/TeamSession y antes de leer la otra tabla:
+    quien llega segundo espera al commit del primero y ya ve su fila. FOR NO KEY
+    UPDATE no choca con el FOR KEY SHARE que toman esos INSERT por la FK.
+    """
+    list(Team.objects.select_for_update(no_key=True).filter(id__in=team_ids).order_by('id').values_list('id', flat=True))
+
+
+@transaction.atomic
+def grant_team_sessions(team_id, session_ids) -> None:
+    """Las sesiones se compartieron con el equipo: todos sus miembros pasan a verlas"""
+    _lock_teams([team_id])
+    sessions = list(Session.objects.filter(id__in=session_ids).values_list('id', 'created_at', 'repo_key'))
+    members = list(TeamUser.objects.filter(team_id=team_id).values_list('user_id', flat=True))
+    _create_rows((user_id, *session) for session in sessions for user_id in members)
+
+
+def grant_team_session(team_id, session_id) -> None:
+    """La sesión se compartió con el equipo: todos sus miembros pasan a verla"""
+    grant_team_sessions(team_id, [session_id])
+
+
+@transaction.atomic
+def grant_session_to_teams(session_id, team_ids) -> None:
+    """La sesión se compartió con varios equipos: la ven los miembros de todos ellos"""
+    _lock_teams(team_ids)
+    session = Session.objects.only('created_at', 'repo_key').get(id=session_id)
+    members = TeamUser.objects.filter(team_id__in=team_ids).values_list('user_id', flat=True).distinct()
+    _create_rows((user_id, session_id, session.created_at, session.repo_key) for user_id in members)
+
+
+@transaction.atomic
+def grant_members(team_id, user_ids) -> None:
+    """Los usuarios entraron al equipo: pasan a ver todas las sesiones compartidas con él"""
+    _lock_teams([team_id])
+    sessions = list(TeamSession.objects.filter(team_id=team_id).values_list(
+        'session_id', 'session__created_at', 'session__repo_key'
+    ))
+    _create_rows((user_id, *session) for user_id in user_ids for session in sessions)
+
+
+def grant_member(team_id, user_id) -> None:
+    """El usuario entró al equipo: pasa a ver todas las sesiones compartidas con él"""
+    grant_members(team_id, [user_id])
+
+
+def revoke_team_session(session_id) -> None:
+    """La sesión dejó de compartirse con un equipo: se quitan los usuarios que ya no la ven por ningún otro"""
+    still_visible = TeamUser.objects.filter(team__team_sessions__session_id=session_id).values('user_id')
+    SessionVisibility.objects.filter(session_id=session_id).exclude(user_id__in=still_visible).delete()
+
+
+def revoke_member(user_id) -> None:
+    """El usuario salió de un equipo: se quitan las sesiones que ya no ve por ningún otro"""
+    still_visible = TeamSession.objects.filter(team__team_users__user_id=user_id).values('session_id')
+    SessionVisibility.objects.filter(user_id=user_id).exclude(session_id__in=still_visible).delete()
+
+
+def sync_session(session: Session) -> None:
+    """Propaga a las filas de visibilidad los campos copiados de la sesión (repo_key)"""
+    SessionVisibility.objects.filter(session_id=session.id).exclude(
+        repo_key=session.repo_key
+    ).update(repo_key=session.repo_key)
+
+
+def visible_via_teams(user_id, repo_key: Optional[str] = None) -> QuerySet:
+    """
+    Filas de visibilidad del usuario, opcionalmente de un repo.
+
+    Args:
+        user_id: github_handle del usuario
+        repo_key: Clave canónica de repo (ver fenix.repos)
+
+    Returns:
+        QuerySet de SessionVisibility, paginable por (created_at, session_id)
+    """
+    rows = SessionVisibility.objects.filter(user_id=user_id)
+    if repo_key is not None:
+        rows = rows.filter(repo_key=repo_key)
+    return rows
+
+
+def rebuild_visibility() -> int:
+    """
+    Reconstruye la tabla completa desde TeamSession × TeamUser (reparación o backfill).
+
+    Returns:
+        Número de filas creadas
+    """
+    SessionVisibility.objects.all().delete()
+    pairs = TeamUser.objects.filter(team__team_sessions__isnull=False).values_list(
+        'user_id',
+        'team__team_sessions__session_id',
+        'team__team_sessions__session__created_at',
+        'team__team_sessions__session__repo_key',
+    ).distinct()
+    _create_rows(pairs.iterator(chunk_size=BATCH_SIZE))
+    return SessionVisibility.objects.count()
@@ -0,0 +1,71 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import User, Session, TeamUser, TeamSession
+from .services.content_service import release_content
+from .services.principal_cache import invalidate_principal
+from .services.access_cache import invalidate_access, invalidate_team_access
+from .services import visibility_service
+
+
+@receiver(post_delete, sender=Session)
+def delete_session_content(sender, instance, **kwargs):
+    """Elimina el contenido de la sesión borrada si ya no lo usa otra (también en borrados en cascada)"""
+    release_content(instance.content_id)
+
+
+@receiver(post_save, sender=Session)
+def sync_session_visibility(sender, instance, created, **kwargs):
+    """Un cambio de repo se copia a las filas de SessionVisibility de la sesión"""
+    if not created:
+        visibility_service.sync_session(instance)
+
+
+# Los receivers de SessionVisibility se registran antes que los de invalidación:
+# al reconstruir el mapa de permisos la tabla ya debe estar al día
+
+@receiver(post_save, sender=TeamUser)
+def grant_member_visibility(sender, instance, created, **kwargs):
+    """Nuevo miembro: ve las sesiones ya compartidas con el equipo"""
+    if created:
+        visibility_service.grant_member(instance.team_id, instance.user_id)
+
+
+@receiver(post_delete, sender=TeamUser)
+def revoke_member_visibility(sender, instance, **kwargs):
+    """Baja de un miembro: deja de ver lo que solo veía por ese equipo"""
+    visibility_service.revoke_member(instance.user_id)
+
+
+@receiver(post_save, sender=TeamSession)
+def grant_team_session_visibility(sender, instance, created, **kwargs):
+    """Sesión compartida: la ven todos los miembros del equipo"""
+    if created:
+        visibility_service.grant_team_session(instance.team_id, instance.session_id)
+
+
+@receiver(post_delete, sender=TeamSession)
+def revoke_team_session_visibility(sender, instance, **kwargs):
+    """Sesión descompartida: la dejan de ver quienes no la ven por otro equipo"""
+    visibility_service.revoke_team_session(instance.session_id)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_user_principal(sender, instance, **kwargs):
+    """Cualquier cambio de un User invalida su entrada en la caché de principals (al hacer commit)"""
+    invalidate_principal(instance.github_handle)
+
+
+@receiver(post_save, sender=TeamUser)
+@receiver(post_delete, sender=TeamUser)
+def invalidate_member_access(sender, instance, **kwargs):
+    """Alta, baja o cambio de rol: el mapa de permisos del miembro queda obsoleto"""
+    invalidate_access(instance.user_id)
+
+
+@receiver(post_save, sender=TeamSession)
+@receiver(post_delete, sender=TeamSession)
+def invalidate_team_members_access(sender, instance, **kwargs):
+    """Compartir o dejar de compartir cambia las sesiones visibles de todo el equipo"""
+    invalidate_team_access(instance.team_id)
@@ -1,3 +1,1390 @@
-from django.test import TestCase
+import base64
+import gzip
+import io
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from unittest import mock
 
-# Create your tests here.
+import boto3
+import requests
+import zstandard
+from bs4 import BeautifulSoup
+from botocore.exceptions import ClientError
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+from django.db import OperationalError, connection, transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from .models import (
+    User, Team, Session, SessionContent, SessionVisibility, TeamUser, TeamSession, ReportJob, ActivityEntry
+)
+from .schemas import (
+    SessionDetailFieldsOut, SessionDetailOut, SessionOut, SessionPageOut, TeamOut, TeamPageOut, TeamSessionOut,
+    TeamSessionPageOut, UserOut
+)
+from .compression import dictionary_path, load_configured_dictionary, save_dictionary, train_dictionary
+from .services.content_service import content_sha256, get_or_create_content
+from .services.html_normalizer import iter_pretty, minify_html, normalize_html
+from .services.s3_service import _discard_format_pool, format_pool, s3_service
+from .services.report_jobs import enqueue_report_upload, process_due_jobs
+from .services.s3_service import UPLOAD_CONTENT_TYPE
+from .services.principal_cache import principal_cache
+from .services.access_cache import access_cache
+from .services.visibility_service import rebuild_visibility
+from .db.instrumentation import db_stats
+from .db.sqlite3.base import DatabaseWrapper as InstrumentedSQLite
+from .metrics import RequestProfile, endpoint_metrics, finish_request, query_shape
+from .middleware import recent_writers
+from .routers import ReplicaRouter, reads_from
+
+try:
+    from moto import mock_aws
+except ImportError:  # requirements-dev.txt
+    mock_aws = None
+
+API_KEY = 'test-mcp-key'
+
+
+class FenixTestCase(TestCase):
+    """Base para tests de la API: autentica como un usuario vía headers MCP"""
+
+    def setUp(self):
+        patcher = mock.patch('fenix.api.MCP_API_KEY', API_KEY)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(principal_cache.clear)
+        self.addCleanup(access_cache.clear)
+
+        self.user = User.objects.create(github_handle='ana')
+
+    def headers(self, github_handle=None):
+        return {
+            'HTTP_X_MCP_API_KEY': API_KEY,
+            'HTTP_X_GITHUB_HANDLE': github_handle or self.user.github_handle,
+        }
+
+    def create_session(self, title, session_data, **kwargs):
+        content, _ = get_or_create_content(session_data)
+        return Session.objects.create(title=title, content=content, owner=self.user, **kwargs)
+
+
+class PaginationTests(FenixTestCase):
+    """Paginación por cursor: páginas sin huecos ni repetidos, también con created_at empatados"""
+
+    def setUp(self):
+        super().setUp()
+        self.sessions = [self.create_session(f'session {i}', f'<p>{i}</p>') for i in range(5)]
+
+    def page(self, cursor=None, limit=2):
+        params = {'limit': limit}
+        if cursor:
+            params['cursor'] = cursor
+        resp = self.client.get('/fenix/sessions', params, **self.headers())
+        self.assertEqual(resp.status_code, 200, resp.content)
+        data = resp.json()
+        return [item['id'] for item in data['items']], data['next_cursor']
+
+    def walk(self, limit=2):
+        seen, cursor = [], None
+        while True:
+            ids, cursor = self.page(cursor, limit)
+            seen += ids
+            if not cursor:
+                return seen
+
+    def test_first_next_and_last_page(self):
+        expected = [str(s.id) for s in sorted(self.sessions, key=lambda s: (s.created_at, s.id), reverse=True)]
+
+        first, cursor = self.page()
+        self.assertEqual(first, expected[:2])
+        self.assertTrue(cursor)
+
+        second, cursor = self.page(cursor)
+        self.assertEqual(second, expected[2:4])
+
+        last, cursor = self.page(cursor)
+        self.assertEqual(last, expected[4:])
+        self.assertIsNone(cursor)
+
+        # Una página exacta no deja un cursor a una página vacía
+        ids, cursor = self.page(limit=5)
+        self.assertEqual(len(ids), 5)
+        self.assertIsNone(cursor)
+
+    def test_ties_on_created_at(self):
+        Session.objects.update(created_at=timezone.now())
+
+        seen = self.walk()
+
+        self.assertEqual(len(seen), 5)
+        self.assertEqual(set(seen), {str(s.id) for s in self.sessions})
+        self.assertEqual(seen, sorted(seen, reverse=True))
+
+    def test_invalid_cursor(self):
+        def cursor(data):
+            return base64.urlsafe_b64encode(json.dumps(data).encode()).decode().rstrip('=')
+
+        for bad in (
+            'zz',
+            'not base64!',
+            cursor(['2025-01-01T00:00:00+00:00', 'x']),
+            cursor({'t': '2025-01-01T00:00:00+00:00'}),
+            cursor({'t': 'yesterday', 'id': str(self.sessions[0].id)}),
+            cursor({'t': '2025-01-01T00:00:00+00:00', 'id': 'not-a-uuid'}),
+            cursor({'t': '2025-01-01T00:00:00+00:00', 'id': 42}),
+        ):
+            resp = self.client.get('/fenix/sessions', {'cursor': bad}, **self.headers())
+            self.assertEqual(resp.status_code, 400, bad)
+            self.assertEqual(resp.json(), {'detail': 'Invalid cursor'})
+
+
+class ListingProjectionTests(FenixTestCase):
+    """Los listados nunca deben leer el cuerpo HTML de las sesiones"""
+
+    def setUp(self):
+        super().setUp()
+        self.team = Team.objects.create(name='core', owner=self.user)
+        TeamUser.objects.create(team=self.team, user=self.user, role='owner')
+
+        for i in range(3):
+            session = self.create_session(
+                f'session {i}',
+                '<html>' + 'x' * 1000 + '</html>',
+                repo='org/project',
+            )
+            TeamSession.objects.create(team=self.team, session=session)
+
+    def assertNoSessionData(self, path, params=None):
+        with CaptureQueriesContext(connection) as ctx:
+            resp = self.client.get(path, params or {}, **self.headers())
+
+        self.assertEqual(resp.status_code, 200, resp.content)
+        self.assertTrue(resp.json()['items'])
+        for query in ctx.captured_queries:
+            self.assertNotIn('session_data', query['sql'])
+            self.assertNotIn(SessionContent._meta.db_table, query['sql'])
+            self.assertNotIn('search', query['sql'])
+
+    def test_list_sessions(self):
+        self.assertNoSessionData('/fenix/sessions')
+
+    def test_list_sessions_by_repo(self):
+        self.assertNoSessionData('/fenix/sessions/by-repo', {'repo': 'org/project'})
+
+    def test_list_team_sessions(self):
+        self.assertNoSessionData(f'/fenix/teams/{self.team.id}/sessions')
+
+
+class S3TestCase(FenixTestCase):
+    """Base con el cliente de S3 mockeado; ningún objeto existe de antemano"""
+
+    def setUp(self):
+        super().setUp()
+        patcher = mock.patch('fenix.services.s3_service.s3_service.s3_client')
+        self.s3_client = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.s3_client.head_object.side_effect = ClientError({'Error': {'Code': '404'}}, 'HeadObject')
+
+    def export(self, session_data):
+        resp = self.client.post(
+            '/fenix/sessions',
+            json.dumps({'title': 'export', 'session_data': session_data}),
+            content_type='application/json',
+            **self.headers()
+        )
+        self.assertEqual(resp.status_code, 201, resp.content)
+        return resp.json()
+
+
+class ContentDedupTests(S3TestCase):
+    """Exports repetidos comparten blob y no se vuelven a subir a S3"""
+
+    def test_repeat_export_reuses_blob(self):
+        first = self.export('<html><body>hola</body></html>\n')
+        self.assertEqual(first['report_status'], 'pending')
+        process_due_jobs()
+
+        second = self.export('<html><body>hola</body></html>\r\n')
+        self.assertEqual(second['report_status'], 'ready')
+        process_due_jobs()
+
+        self.assertEqual(SessionContent.objects.count(), 1)
+        self.assertEqual(self.s3_client.put_object.call_count, 1)
+        self.assertIn('/blobs/', second['report_url'])
+        self.assertEqual(Session.objects.get(id=first['id']).report_url, second['report_url'])
+
+    def test_blob_deleted_with_last_session(self):
+        first = self.export('<p>compartido</p>')
+        second = self.export('<p>compartido</p>')
+
+        self.client.delete(f"/fenix/sessions/{first['id']}", **self.headers())
+        self.assertEqual(SessionContent.objects.count(), 1)
+
+        self.client.delete(f"/fenix/sessions/{second['id']}", **self.headers())
+        self.assertEqual(SessionContent.objects.count(), 0)
+
+
+class ReportJobTests(S3TestCase):
+    """El worker reintenta las subidas fallidas con backoff"""
+
+    def test_failed_upload_is_retried(self):
+        self.s3_client.put_object.side_effect = ClientError({'Error': {'Code': '500'}}, 'PutObject')
+        session = self.export('<p>reintento</p>')
+
+        self.assertEqual(process_due_jobs(), 1)
+        job = ReportJob.objects.get()
+        self.assertEqual((job.status, job.attempts), ('pending', 1))
+        self.assertGreater(job.next_attempt_at, timezone.now())
+
+        # Aún no vence el backoff
+        self.assertEqual(process_due_jobs(), 0)
+
+        self.s3_client.put_object.side_effect = None
+        ReportJob.objects.update(next_attempt_at=timezone.now())
+        self.assertEqual(process_due_jobs(), 1)
+
+        self.assertEqual(ReportJob.objects.get().status, 'done')
+        self.assertEqual(Session.objects.get(id=session['id']).report_status, 'ready')
+
+    @override_settings(FENIX_HTML_FORMAT_WORKERS=2, FENIX_HTML_FORMAT_POOL_MIN_CHARS=0)
+    def test_batch_is_minified_in_parallel(self):
+        for i in range(3):
+            self.export(f'<p>lote {i}</p>')
+
+        events = []
+        pool = mock.Mock()
+
+        def submit(fn, html, level):
+            events.append('submit')
+            future = mock.Mock()
+            future.result.side_effect = lambda timeout: events.append('result') or fn(html, level)
+            return future
+
+        pool.submit.side_effect = submit
+        with mock.patch('fenix.services.s3_service.format_pool', return_value=pool):
+            self.assertEqual(process_due_jobs(), 3)
+
+        # Dos lotes (uno por cada FENIX_HTML_FORMAT_WORKERS): todo el lote se envía antes de esperar
+        self.assertEqual(events, ['submit', 'submit', 'result', 'result', 'submit', 'result'])
+        self.assertEqual(set(ReportJob.objects.values_list('status', flat=True)), {'done'})
+        self.assertEqual(self.s3_client.put_object.call_count, 3)
+
+
+@unittest.skipUnless(connection.vendor == 'postgresql', "Row locks require PostgreSQL")
+class ReportJobLeaseTests(TransactionTestCase):
+    """El worker no retiene locks mientras habla con S3"""
+
+    def test_enqueue_does_not_wait_for_running_job(self):
+        user = User.objects.create(github_handle='ana')
+        content, _ = get_or_create_content('<p>lease</p>')
+        with transaction.atomic():
+            enqueue_report_upload(content)
+
+        started, release = threading.Event(), threading.Event()
+
+        def blocked_upload(contents):
+            started.set()
+            release.wait(10)
+            return {sha256: f"https://bucket.s3.amazonaws.com/blobs/{sha256}.html" for sha256 in contents}
+
+        def worker():
+            try:
+                process_due_jobs()
+            finally:
+                connection.close()
+
+        with mock.patch.object(s3_service, 'upload_content_blobs', side_effect=blocked_upload):
+            thread = threading.Thread(target=worker)
+            thread.start()
+            try:
+                self.assertTrue(started.wait(10))
+                # Con el job bloqueado por el worker esto fallaría por lock_timeout
+                with transaction.atomic():
+                    with connection.cursor() as cursor:
+                        cursor.execute("SET LOCAL lock_timeout = '1s'")
+                    session = Session.objects.create(title='reusa el blob', content=content, owner=user)
+                    enqueue_report_upload(content)
+            finally:
+                release.set()
+                thread.join(10)
+
+        self.assertEqual(ReportJob.objects.get().status, 'done')
+        self.assertEqual(Session.objects.get(id=session.id).report_status, 'ready')
+
+
+class ValidateOrCreateUserTests(FenixTestCase):
+    """Validar un usuario sin cambios no escribe en la base de datos"""
+
+    def validate(self, payload):
+        return self.client.post(
+            '/fenix/auth/validate-or-create',
+            json.dumps(payload),
+            content_type='application/json',
+            **self.headers()
+        )
+
+    def test_unchanged_user_is_not_saved(self):
+        self.validate({'email': 'ana@example.com'})
+
+        with CaptureQueriesContext(connection) as ctx:
+            resp = self.validate({'email': 'ana@example.com'})
+
+        self.assertEqual(resp.status_code, 200)
+        self.assertFalse([q for q in ctx.captured_queries if q['sql'].startswith('UPDATE')])
+
+    def test_changed_fields_are_saved(self):
+        self.validate({'display_name': 'Ana'})
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.display_name, 'Ana')
+
+
+class PrincipalCacheTests(FenixTestCase):
+    """get_user_from_request no consulta la base de datos en un hit y se invalida al guardar"""
+
+    def test_cached_user_skips_query(self):
+        self.client.get('/fenix/users/me', **self.headers())
+
+        with CaptureQueriesContext(connection) as ctx:
+            resp = self.client.get('/fenix/users/me', **self.headers())
+
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(len(ctx.captured_queries), 0)
+
+    def test_user_update_invalidates(self):
+        self.client.get('/fenix/users/me', **self.headers())
+
+        self.user.display_name = 'Ana'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.save()
+
+        resp = self.client.get('/fenix/users/me', **self.headers())
+        self.assertEqual(resp.json()['display_name'], 'Ana')
+
+    def test_invalidation_waits_for_commit(self):
+        self.client.get('/fenix/users/me', **self.headers())
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.user.display_name = 'Ana'
+            self.user.save()
+            # Antes del commit la entrada sigue: nadie puede recachear el User sin confirmar
+            self.assertIsNotNone(principal_cache.get('ana'))
+
+        for callback in callbacks:
+            callback()
+        self.assertIsNone(principal_cache.get('ana'))
+
+
+class AccessCacheTests(FenixTestCase):
+    """Los chequeos de permisos salen del mapa cacheado y se invalidan al compartir o cambiar membresías"""
+
+    def setUp(self):
+        super().setUp()
+        self.bob = User.objects.create(github_handle='bob')
+        self.team = Team.objects.create(name='core', owner=self.user)
+        TeamUser.objects.create(team=self.team, user=self.user, role='owner')
+        TeamUser.objects.create(team=self.team, user=self.bob, role='member')
+        self.session = self.create_session('privada', '<p>hola</p>')
+
+    def get_session_as_bob(self):
+        return self.client.get(f'/fenix/sessions/{self.session.id}', **self.headers('bob'))
+
+    def test_share_and_unshare_invalidate(self):
+        self.assertEqual(self.get_session_as_bob().status_code, 403)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            share = TeamSession.objects.create(team=self.team, session=self.session)
+        self.assertEqual(self.get_session_as_bob().status_code, 200)
+
+        # Hit: no hay queries de TeamSession/TeamUser
+        with CaptureQueriesContext(connection) as ctx:
+            self.get_session_as_bob()
+        self.assertFalse([q for q in ctx.captured_queries if 'fenix_team' in q['sql']])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            share.delete()
+        self.assertEqual(self.get_session_as_bob().status_code, 403)
+
+    def test_member_removal_invalidates(self):
+        TeamSession.objects.create(team=self.team, session=self.session)
+        self.assertEqual(self.get_session_as_bob().status_code, 200)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            TeamUser.objects.filter(user=self.bob).get().delete()
+        self.assertEqual(self.get_session_as_bob().status_code, 403)
+
+    def test_invalidation_waits_for_commit(self):
+        self.assertEqual(self.get_session_as_bob().status_code, 403)
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            resp = self.client.post(
+                f'/fenix/teams/{self.team.id}/sessions/batch',
+                json.dumps({'session_ids': [str(self.session.id)]}),
+                content_type='application/json',
+                **self.headers()
+            )
+            self.assertEqual(resp.json()['shared'], 1)
+            # Hasta el commit sigue el mapa anterior: nadie cachea permisos sin confirmar
+            self.assertEqual(self.get_session_as_bob().status_code, 403)
+
+        for callback in callbacks:
+            callback()
+        self.assertEqual(self.get_session_as_bob().status_code, 200)
+
+
+@unittest.skipUnless(connection.vendor == 'postgresql', "Full-text search requires PostgreSQL")
+class SearchTests(FenixTestCase):
+    """/sessions/search respeta la visibilidad de get_session y ordena por relevancia"""
+
+    def setUp(self):
+        super().setUp()
+        self.bob = User.objects.create(github_handle='bob')
+
+    def export(self, github_handle, title, session_data, is_public=False):
+        with mock.patch('fenix.api.enqueue_report_upload'):
+            resp = self.client.post(
+                '/fenix/sessions',
+                json.dumps({'title': title, 'session_data': session_data, 'is_public': is_public}),
+                content_type='application/json',
+                **self.headers(github_handle)
+            )
+        self.assertEqual(resp.status_code, 201, resp.content)
+        return resp.json()['id']
+
+    def search(self, q):
+        resp = self.client.get('/fenix/sessions/search', {'q': q}, **self.headers())
+        self.assertEqual(resp.status_code, 200, resp.content)
+        return [item['id'] for item in resp.json()['items']]
+
+    def test_ranked_and_visible_only(self):
+        in_title = self.export('ana', 'Migración de pagos', '<p>otra cosa</p>')
+        in_body = self.export('ana', 'Refactor', '<html><body><p>pagos con stripe</p><script>pagos()</script></body></html>')
+        public = self.export('bob', 'Pagos públicos', '<p>x</p>', is_public=True)
+        self.export('bob', 'Pagos privados', '<p>pagos</p>')
+
+        results = self.search('pagos')
+
+        self.assertEqual(set(results), {in_title, in_body, public})
+        self.assertEqual(results[-1], in_body)
+
+    def test_metadata_update_keeps_body_without_reading_it(self):
+        session_id = self.export('ana', 'Refactor', '<p>pagos con stripe</p>')
+
+        with CaptureQueriesContext(connection) as ctx:
+            resp = self.client.patch(
+                f'/fenix/sessions/{session_id}', json.dumps({'title': 'Webhooks'}),
+                content_type='application/json', **self.headers()
+            )
+        self.assertEqual(resp.status_code, 200, resp.content)
+        self.assertFalse([q for q in ctx.captured_queries if SessionContent._meta.db_table in q['sql']])
+
+        self.assertEqual(self.search('webhooks'), [session_id])
+        self.assertEqual(self.search('stripe'), [session_id])
+        self.assertEqual(self.search('refactor'), [])
+
+
+class RepoKeyTests(FenixTestCase):
+    """by-repo encuentra la sesión sin importar la forma en que se envió el repo"""
+
+    def setUp(self):
+        super().setUp()
+        self.team = Team.objects.create(name='core', owner=self.user)
+        TeamUser.objects.create(team=self.team, user=self.user, role='owner')
+
+    def test_remote_url_matches_owner_repo(self):
+        ssh = self.create_session('ssh', '<p>1</p>', repo='git@github.com:Org/Project.git')
+        https = self.create_session('https', '<p>2</p>', repo='https://github.com/org/project')
+        self.create_session('otro', '<p>3</p>', repo='org/other')
+        for session in (ssh, https):
+            TeamSession.objects.create(team=self.team, session=session)
+        # Compartida dos veces: no debe aparecer duplicada
+        other_team = Team.objects.create(name='infra', owner=self.user)
+        TeamUser.objects.create(team=other_team, user=self.user, role='owner')
+        TeamSession.objects.create(team=other_team, session=ssh)
+
+        for repo in ('org/project', 'https://github.com/Org/Project.git'):
+            resp = self.client.get('/fenix/sessions/by-repo', {'repo': repo}, **self.headers())
+            self.assertEqual(resp.status_code, 200, resp.content)
+            self.assertEqual([item['id'] for item in resp.json()['items']], [str(https.id), str(ssh.id)])
+
+
+class SessionVisibilityTests(FenixTestCase):
+    """SessionVisibility sigue a TeamSession/TeamUser y coincide con una reconstrucción completa"""
+
+    def setUp(self):
+        super().setUp()
+        self.bob = User.objects.create(github_handle='bob')
+        self.core = Team.objects.create(name='core', owner=self.user)
+        self.infra = Team.objects.create(name='infra', owner=self.user)
+        for team in (self.core, self.infra):
+            TeamUser.objects.create(team=team, user=self.user, role='owner')
+        self.session = self.create_session('compartida', '<p>hola</p>', repo='org/project')
+
+    def visible_to(self, github_handle):
+        return set(SessionVisibility.objects.filter(user_id=github_handle).values_list('session_id', flat=True))
+
+    def assertMatchesRebuild(self):
+        incremental = set(SessionVisibility.objects.values_list('user_id', 'session_id'))
+        rebuild_visibility()
+        self.assertEqual(incremental, set(SessionVisibility.objects.values_list('user_id', 'session_id')))
+
+    def test_unshare_keeps_other_path(self):
+        TeamSession.objects.create(team=self.core, session=self.session)
+        TeamSession.objects.create(team=self.infra, session=self.session)
+
+        TeamSession.objects.filter(team=self.core).delete()
+        self.assertEqual(self.visible_to('ana'), {self.session.id})
+
+        TeamSession.objects.filter(team=self.infra).delete()
+        self.assertEqual(self.visible_to('ana'), set())
+        self.assertMatchesRebuild()
+
+    def test_membership_changes(self):
+        TeamSession.objects.create(team=self.core, session=self.session)
+        member = TeamUser.objects.create(team=self.core, user=self.bob, role='member')
+        self.assertEqual(self.visible_to('bob'), {self.session.id})
+        self.assertMatchesRebuild()
+
+        member.delete()
+        self.assertEqual(self.visible_to('bob'), set())
+
+        self.core.delete()
+        self.assertEqual(self.visible_to('ana'), set())
+        self.assertMatchesRebuild()
+
+    def test_repo_change_and_by_repo_query(self):
+        TeamSession.objects.create(team=self.core, session=self.session)
+        self.session.repo = 'git@github.com:org/renamed.git'
+        self.session.save()
+
+        with CaptureQueriesContext(connection) as ctx:
+            resp = self.client.get('/fenix/sessions/by-repo', {'repo': 'org/renamed'}, **self.headers())
+
+        self.assertEqual([item['id'] for item in resp.json()['items']], [str(self.session.id)])
+        self.assertFalse([q for q in ctx.captured_queries if 'fenix_team' in q['sql']])
+
+
+@unittest.skipUnless(connection.vendor == 'postgresql', "Row locks require PostgreSQL")
+class SessionVisibilityRaceTests(TransactionTestCase):
+    """Compartir una sesión y añadir un miembro a la vez al mismo equipo"""
+
+    def test_concurrent_share_and_member_add(self):
+        owner = User.objects.create(github_handle='ana')
+        member = User.objects.create(github_handle='bea')
+        team = Team.objects.create(name='core', owner=owner)
+        content, _ = get_or_create_content('<p>carrera</p>')
+        session = Session.objects.create(title='compartida', content=content, owner=owner)
+
+        shared = threading.Event()
+
+        def share():
+            try:
+                with transaction.atomic():
+                    TeamSession.objects.create(team=team, session=session)
+                    shared.set()
+                    # El alta del miembro corre mientras esta transacción sigue abierta
+                    time.sleep(0.5)
+            finally:
+                connection.close()
+
+        thread = threading.Thread(target=share)
+        thread.start()
+        try:
+            self.assertTrue(shared.wait(10))
+            with transaction.atomic():
+                TeamUser.objects.create(team=team, user=member, role='member')
+        finally:
+            thread.join(10)
+
+        self.assertTrue(SessionVisibility.objects.filter(user=member, session=session).exists())
+
+
+class ActivityFeedTests(FenixTestCase):
+    """El feed reúne la actividad de todos los equipos del usuario, sin la suya propia"""
+
+    def setUp(self):
+        super().setUp()
+        self.bob = User.objects.create(github_handle='bob')
+        self.teams = []
+        for name in ('core', 'infra'):
+            team = Team.objects.create(name=name, owner=self.user)
+            TeamUser.objects.create(team=team, user=self.user, role='owner')
+            self.teams.append(team)
+
+    def post(self, path, payload):
+        resp = self.client.post(path, json.dumps(payload), content_type='application/json', **self.headers())
+        self.assertEqual(resp.status_code, 201, resp.content)
+
+    def feed(self, github_handle, **params):
+        resp = self.client.get('/fenix/activity', params, **self.headers(github_handle))
+        self.assertEqual(resp.status_code, 200, resp.content)
+        return resp.json()
+
+    def test_fan_out_across_teams(self):
+        for team in self.teams:
+            self.post(f'/fenix/teams/{team.id}/members', {'github_handle': 'bob'})
+        since = timezone.now().isoformat()
+
+        session = self.create_session('compartida', '<p>hola</p>')
+        for team in self.teams:
+            self.post(f'/fenix/teams/{team.id}/sessions', {'session_id': str(session.id)})
+        self.client.patch(
+            f'/fenix/sessions/{session.id}', json.dumps({'title': 'renombrada'}),
+            content_type='application/json', **self.headers()
+        )
+
+        items = self.feed('bob')['items']
+        self.assertEqual([e['verb'] for e in items], ['session_updated'] + ['session_shared'] * 2 + ['member_added'] * 2)
+        self.assertEqual({e['team']['name'] for e in items if e['verb'] == 'session_shared'}, {'core', 'infra'})
+
+        recent = self.feed('bob', since=since, limit=2)
+        self.assertEqual(len(recent['items']), 2)
+        self.assertIsNotNone(recent['next_cursor'])
+
+        self.assertEqual(self.feed('ana')['items'], [])
+
+    def test_update_lists_changed_fields_and_skips_no_ops(self):
+        self.post(f'/fenix/teams/{self.teams[0].id}/members', {'github_handle': 'bob'})
+        session = self.create_session('compartida', '<p>hola</p>')
+        self.post(f'/fenix/teams/{self.teams[0].id}/sessions', {'session_id': str(session.id)})
+
+        def patch(payload):
+            resp = self.client.patch(
+                f'/fenix/sessions/{session.id}', json.dumps(payload),
+                content_type='application/json', **self.headers()
+            )
+            self.assertEqual(resp.status_code, 200, resp.content)
+
+        patch({})
+        patch({'title': 'compartida', 'session_data': '<p>hola</p>'})
+        self.assertNotIn('session_updated', [e['verb'] for e in self.feed('bob')['items']])
+
+        patch({'title': 'compartida', 'repo': 'org/project', 'session_data': '<p>chau</p>'})
+        latest = self.feed('bob')['items'][0]
+        self.assertEqual(latest['verb'], 'session_updated')
+        self.assertEqual(latest['changed_fields'], ['repo', 'session_data'])
+
+
+class BatchEndpointTests(FenixTestCase):
+    """Los endpoints batch devuelven un status por item y mantienen visibilidad y feed"""
+
+    def setUp(self):
+        super().setUp()
+        self.bob = User.objects.create(github_handle='bob')
+        self.team = Team.objects.create(name='core', owner=self.user)
+        TeamUser.objects.create(team=self.team, user=self.user, role='owner')
+
+    def post(self, path, payload, github_handle=None):
+        resp = self.client.post(path, json.dumps(payload), content_type='application/json', **self.headers(github_handle))
+        self.assertEqual(resp.status_code, 200, resp.content)
+        return resp.json()
+
+    def statuses(self, data, key):
+        return {str(r[key]): r['status'] for r in data['results']}
+
+    def test_share_many_and_get_many(self):
+        mine = [self.create_session(f's{i}', f'<p>{i}</p>') for i in range(3)]
+        TeamSession.objects.create(team=self.team, session=mine[0])
+        foreign = Session.objects.create(title='ajena', content=mine[0].content, owner=self.bob)
+        missing = '00000000-0000-0000-0000-000000000000'
+
+        added = self.post(f'/fenix/teams/{self.team.id}/members/batch', {
+            'members': [{'github_handle': 'bob'}, {'github_handle': 'ana'}, {'github_handle': 'nadie'}],
+        })
+        self.assertEqual(self.statuses(added, 'github_handle'), {'bob': 'added', 'ana': 'already_member', 'nadie': 'not_found'})
+
+        shared = self.post(f'/fenix/teams/{self.team.id}/sessions/batch', {
+            'session_ids': [str(s.id) for s in mine] + [str(foreign.id), missing],
+        })
+        self.assertEqual(shared['shared'], 2)
+        self.assertEqual(self.statuses(shared, 'session_id'), {
+            str(mine[0].id): 'already_shared', str(mine[1].id): 'shared', str(mine[2].id): 'shared',
+            str(foreign.id): 'forbidden', missing: 'not_found',
+        })
+        self.assertEqual(SessionVisibility.objects.filter(user=self.bob).count(), 3)
+        self.assertEqual(ActivityEntry.objects.filter(recipient=self.bob, verb='session_shared').count(), 2)
+
+        private = self.create_session('privada', '<p>privada</p>')
+        got = self.post('/fenix/sessions/batch-get', {'session_ids': [str(mine[1].id), str(private.id)]}, 'bob')
+        self.assertEqual(self.statuses(got, 'session_id'), {str(mine[1].id): 'ok', str(private.id): 'forbidden'})
+        self.assertEqual(got['results'][0]['session']['session_data'], '<p>1</p>')
+
+    def test_share_one_with_many_teams(self):
+        other = Team.objects.create(name='infra', owner=self.bob)
+        TeamUser.objects.create(team=other, user=self.bob, role='owner')
+        session = self.create_session('s', '<p>x</p>')
+
+        data = self.post(f'/fenix/sessions/{session.id}/teams', {'team_ids': [str(self.team.id), str(other.id)]})
+
+        self.assertEqual(self.statuses(data, 'team_id'), {str(self.team.id): 'shared', str(other.id): 'forbidden'})
+        self.assertEqual(TeamSession.objects.filter(session=session).count(), 1)
+
+    def test_invalid_member_batches_are_rejected(self):
+        path = f'/fenix/teams/{self.team.id}/members/batch'
+        for members in (
+            [{'github_handle': 'bob', 'role': 'owner'}],
+            [{'github_handle': 'bob', 'role': 'superuser'}],
+            [{'github_handle': 'bob', 'role': 'member'}, {'github_handle': 'bob', 'role': 'admin'}],
+        ):
+            resp = self.client.post(
+                path, json.dumps({'members': members}), content_type='application/json', **self.headers()
+            )
+            self.assertEqual(resp.status_code, 400, members)
+
+        resp = self.client.post(
+            f'/fenix/teams/{self.team.id}/members', json.dumps({'github_handle': 'bob', 'role': 'owner'}),
+            content_type='application/json', **self.headers()
+        )
+        self.assertEqual(resp.status_code, 400)
+        self.assertFalse(TeamUser.objects.filter(user=self.bob).exists())
+
+
+class TrustedResponseTests(FenixTestCase):
+    """Las respuestas que se saltan la validación siguen cumpliendo exactamente su schema"""
+
+    def setUp(self):
+        super().setUp()
+        self.team = Team.objects.create(name='core', owner=self.user)
+        TeamUser.objects.create(team=self.team, user=self.user, role='owner')
+        self.session = self.create_session('s', '<p>hola</p>', repo='org/project', metadata={'k': 1})
+        TeamSession.objects.create(team=self.team, session=self.session)
+
+    def assertConforms(self, resp, schema):
+        self.assertEqual(resp.status_code, 200, resp.content)
+        data = resp.json()
+        validated = schema.model_validate(data)
+        self.assertEqual(json.loads(validated.model_dump_json()).keys(), data.keys())
+        return data
+
+    def assertSameKeys(self, row, schema):
+        self.assertEqual(set(row), set(schema.model_fields))
+
+    def test_listings_conform(self):
+        get = lambda path, params=None: self.client.get(path, params or {}, **self.headers())
+
+        data = self.assertConforms(get('/fenix/sessions'), SessionPageOut)
+        self.assertSameKeys(data['items'][0], SessionOut)
+        self.assertSameKeys(data['items'][0]['owner'], UserOut)
+
+        self.assertConforms(get('/fenix/sessions/by-repo', {'repo': 'org/project'}), SessionPageOut)
+        data = self.assertConforms(get('/fenix/teams'), TeamPageOut)
+        self.assertSameKeys(data['items'][0], TeamOut)
+        data = self.assertConforms(get(f'/fenix/teams/{self.team.id}/sessions'), TeamSessionPageOut)
+        self.assertSameKeys(data['items'][0], TeamSessionOut)
+        data = self.assertConforms(get(f'/fenix/sessions/{self.session.id}'), SessionDetailOut)
+        self.assertSameKeys(data, SessionDetailOut)
+        self.assertTrue(data['created_at'].endswith('Z'))
+
+
+class SparseFieldsetTests(FenixTestCase):
+    """`fields=` recorta tanto las columnas del SELECT como las claves del JSON"""
+
+    def setUp(self):
+        super().setUp()
+        self.team = Team.objects.create(name='core', owner=self.user)
+        TeamUser.objects.create(team=self.team, user=self.user, role='owner')
+        self.session = self.create_session('s', '<p>hola</p>', repo='org/project', metadata={'k': 1})
+        TeamSession.objects.create(team=self.team, session=self.session)
+
+    def get(self, path, params):
+        with CaptureQueriesContext(connection) as ctx:
+            resp = self.client.get(path, params, **self.headers())
+        self.assertEqual(resp.status_code, 200, resp.content)
+        session_sql = [q['sql'] for q in ctx.captured_queries if 'fenix_sessions' in q['sql']]
+        return resp.json(), ' '.join(session_sql)
+
+    def test_listing_selects_only_requested_columns(self):
+        params = {'fields': 'id,title,repo'}
+        for path in ('/fenix/sessions', '/fenix/sessions/by-repo'):
+            data, sql = self.get(path, {**params, 'repo': 'org/project'})
+            self.assertEqual(list(data['items'][0]), ['id', 'title', 'repo'])
+            self.assertNotIn('metadata', sql)
+            self.assertNotIn('fenix_users', sql)
+
+        data, sql = self.get(f'/fenix/teams/{self.team.id}/sessions', {'fields': 'title,owner'})
+        self.assertEqual(list(data['items'][0]['session']), ['title', 'owner'])
+        self.assertEqual(data['items'][0]['session']['owner']['github_handle'], self.user.github_handle)
+        self.assertNotIn('metadata', sql)
+
+    def test_detail_skips_content_unless_requested(self):
+        with CaptureQueriesContext(connection) as ctx:
+            resp = self.client.get(f'/fenix/sessions/{self.session.id}', {'fields': 'title'}, **self.headers())
+        self.assertEqual(resp.json(), {'title': 's'})
+        self.assertFalse(any('fenix_session_contents' in q['sql'] for q in ctx.captured_queries))
+
+        resp = self.client.get(f'/fenix/sessions/{self.session.id}', {'fields': 'session_data'}, **self.headers())
+        self.assertEqual(resp.json(), {'session_data': '<p>hola</p>'})
+
+    def test_sparse_responses_match_schema_without_padding(self):
+        cases = (
+            ('/fenix/sessions', {'fields': 'id,title'}, SessionPageOut),
+            (f'/fenix/teams/{self.team.id}/sessions', {'fields': 'repo'}, TeamSessionPageOut),
+            (f'/fenix/sessions/{self.session.id}', {'fields': 'title,updated_at'}, SessionDetailFieldsOut),
+        )
+        for path, params, schema in cases:
+            data, _ = self.get(path, params)
+            validated = schema.model_validate(data)
+            self.assertEqual(json.loads(validated.model_dump_json(exclude_unset=True)), data)
+
+    def test_unknown_field_is_rejected(self):
+        resp = self.client.get('/fenix/sessions', {'fields': 'id,password'}, **self.headers())
+        self.assertEqual(resp.status_code, 400)
+        self.assertIn('password', resp.json()['detail'])
+
+
+def _has_test_replica():
+    replica = settings.DATABASES.get('replica')
+    return replica is not None and not replica.get('TEST', {}).get('MIRROR')
+
+
+class ReplicaRouterTests(TestCase):
+    """Las escrituras nunca van a la réplica, y las lecturas solo dentro de reads_from"""
+
+    def test_routing(self):
+        router = ReplicaRouter()
+        user = User(github_handle='ana')
+        user._state.db = 'replica'
+
+        self.assertEqual(router.db_for_read(User, instance=user), 'default')
+        with reads_from('replica'):
+            self.assertEqual(router.db_for_read(Session), 'replica')
+            self.assertEqual(router.db_for_write(Session, instance=user), 'default')
+        self.assertEqual(router.db_for_read(Session), 'default')
+
+
+@unittest.skipUnless(_has_test_replica(), "Requires a non-mirror 'replica' database alias")
+@override_settings(FENIX_READ_REPLICA='replica')
+class ReplicaReadTests(FenixTestCase):
+    """Los GET leen de la réplica salvo justo después de que el mismo usuario escriba"""
+    databases = '__all__'
+
+    def setUp(self):
+        super().setUp()
+        self.addCleanup(recent_writers.clear)
+        # La réplica "va con retraso": solo tiene al usuario, no sus sesiones
+        User.objects.using('replica').create(github_handle=self.user.github_handle)
+        self.create_session('antigua', '<p>hola</p>')
+
+    def list_titles(self):
+        resp = self.client.get('/fenix/sessions', **self.headers())
+        self.assertEqual(resp.status_code, 200, resp.content)
+        return {item['title'] for item in resp.json()['items']}
+
+    def test_read_your_writes(self):
+        self.assertEqual(self.list_titles(), set())
+
+        resp = self.client.post(
+            '/fenix/sessions', {'title': 'nueva', 'session_data': '<p>chau</p>'},
+            content_type='application/json', **self.headers()
+        )
+        self.assertEqual(resp.status_code, 201, resp.content)
+        self.assertEqual(self.list_titles(), {'antigua', 'nueva'})
+
+        # Pasada la ventana sticky vuelve a la réplica
+        recent_writers.clear()
+        self.assertEqual(self.list_titles(), set())
+
+
+class ConnectionMetricsTests(FenixTestCase):
+    """El backend instrumentado cuenta aperturas, cierres y fallos de conexión"""
+
+    def setUp(self):
+        super().setUp()
+        db_stats.reset()
+        self.addCleanup(db_stats.reset)
+
+    def wrapper(self, name):
+        settings_dict = {**connection.settings_dict, 'ENGINE': 'fenix.db.sqlite3', 'NAME': name, 'OPTIONS': {}}
+        return InstrumentedSQLite(settings_dict, alias='metrics')
+
+    def test_connect_and_close(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            db = self.wrapper(os.path.join(tmp, 'metrics.sqlite3'))
+            db.ensure_connection()
+            db.ensure_connection()
+            self.assertEqual((db_stats.opened, db_stats.open), (1, 1))
+
+            db.close()
+            snapshot = db_stats.snapshot()
+        self.assertEqual((snapshot['open'], snapshot['closed'], snapshot['max_open']), (0, 1, 1))
+
+    def test_connect_error(self):
+        with self.assertRaises(OperationalError):
+            self.wrapper('/nonexistent/dir/metrics.sqlite3').ensure_connection()
+        self.assertEqual(db_stats.connect_errors, 1)
+
+    @override_settings(FENIX_METRICS_TOKEN='metrics-token')
+    def test_endpoint(self):
+        resp = self.client.get('/fenix/metrics/db', HTTP_AUTHORIZATION='Bearer metrics-token')
+        self.assertEqual(resp.status_code, 200)
+        data = resp.json()
+        self.assertIn('default', data['databases'])
+        self.assertEqual(data['connections']['requests'], 1)
+
+
+@override_settings(FENIX_METRICS_TOKEN='metrics-token')
+class RequestMetricsTests(FenixTestCase):
+    """Queries y tiempos por endpoint, expuestos para Prometheus, con avisos de N+1"""
+
+    def setUp(self):
+        super().setUp()
+        endpoint_metrics.reset()
+        self.addCleanup(endpoint_metrics.reset)
+        self.create_session('s', '<p>hola</p>')
+
+    def metrics(self):
+        resp = self.client.get('/fenix/metrics', HTTP_AUTHORIZATION='Bearer metrics-token')
+        self.assertEqual(resp.status_code, 200)
+        self.assertTrue(resp['Content-Type'].startswith('text/plain; version=0.0.4'))
+        return resp.content.decode()
+
+    def test_counts_queries_per_endpoint(self):
+        self.client.get('/fenix/sessions', **self.headers())
+        self.client.get(f'/fenix/sessions/{Session.objects.get().id}', **self.headers())
+
+        text = self.metrics()
+        self.assertIn('fenix_requests_total{endpoint="GET fenix/sessions"} 1', text)
+        self.assertIn('fenix_requests_total{endpoint="GET fenix/sessions/<session_id>"} 1', text)
+        queries = [line for line in text.splitlines() if line.startswith('fenix_db_queries_total{endpoint="GET fenix/sessions"}')]
+        self.assertGreater(int(queries[0].split()[-1]), 0)
+        self.assertIn('component="serialization"', text)
+
+    @override_settings(FENIX_QUERY_BUDGET=1)
+    def test_budget_warning(self):
+        with self.assertLogs('fenix.metrics', 'WARNING') as logs:
+            self.client.get('/fenix/sessions', **self.headers())
+        self.assertIn('budget 1', logs.output[0])
+        self.assertIn('fenix_query_budget_exceeded_total{endpoint="GET fenix/sessions"} 1', self.metrics())
+
+    def test_metrics_token_only(self):
+        for credentials in (
+            self.headers(),
+            {'HTTP_AUTHORIZATION': 'Bearer wrong'},
+            {'HTTP_AUTHORIZATION': f'Bearer {API_KEY}'},
+        ):
+            for path in ('/fenix/metrics', '/fenix/metrics/db'):
+                self.assertEqual(self.client.get(path, **credentials).status_code, 401, (path, credentials))
+
+        with override_settings(FENIX_METRICS_TOKEN=None):
+            resp = self.client.get('/fenix/metrics', HTTP_AUTHORIZATION='Bearer None')
+            self.assertEqual(resp.status_code, 401)
+
+    def test_repeated_query_warning(self):
+        self.assertEqual(
+            query_shape('SELECT * FROM t WHERE id IN (%s, %s, %s)'), query_shape('SELECT * FROM t WHERE id IN (%s, %s)')
+        )
+
+        profile = RequestProfile()
+        profile.queries = 6
+        profile.shapes['SELECT * FROM fenix_users WHERE github_handle = %s'] = 6
+        request = self.client.get('/fenix/health').wsgi_request
+        with self.assertLogs('fenix.metrics', 'WARNING') as logs:
+            finish_request(request, profile, 0.01)
+        self.assertIn('possible N+1', logs.output[0])
+
+
+class HtmlNormalizerTests(TestCase):
+    """El normalizador en streaming da la misma salida que BeautifulSoup.prettify()"""
+
+    DOCUMENTS = [
+        '<!DOCTYPE html><html><head><meta charset="utf-8"><style>body { margin: 0 }</style></head>'
+        '<body><h1 class="title  main">Sesión &amp; notas</h1><p>Texto<br>con <b>negrita</b></p>'
+        '<pre><code>def f(a, b):\n    return a &lt; b</code></pre><!-- fin -->'
+        '<script>if (a < b && c) {}</script><img src="x.png" alt></body></html>',
+        '<div><p>sin cerrar<p>otro</div></span>resto<br/>final<textarea>  crudo  </textarea>',
+        '<a href="/?a=1&amp;b=2" title=\'dice "hola"\'>link</a>&nbsp;&#150;&foo;',
+    ]
+
+    def test_matches_prettify(self):
+        for document in self.DOCUMENTS:
+            expected = BeautifulSoup(document, 'html.parser').prettify()
+            self.assertEqual(normalize_html(document), expected)
+            # Troceado en cualquier punto da lo mismo
+            chunks = (document[i:i + 5] for i in range(0, len(document), 5))
+            self.assertEqual(''.join(iter_pretty(chunks)), expected)
+
+    def test_minify_keeps_literal_text(self):
+        document = (
+            '<html>\n  <body>\n    <!-- nota -->\n    <p class="a  b">Hola   &amp;\n mundo&nbsp;&nbsp;&lt;x&gt;</p>\n'
+            '<pre>\n  a  &lt; b\n</pre><script>if (a < b  && c) {}</script></body></html>\n'
+        )
+        self.assertEqual(
+            minify_html(document),
+            '<html> <body> <p class="a  b">Hola &amp; mundo\xa0\xa0&lt;x&gt;</p> '
+            '<pre>\n  a  &lt; b\n</pre><script>if (a < b  && c) {}</script></body></html> '
+        )
+
+    @override_settings(FENIX_HTML_FORMAT_WORKERS=1, FENIX_HTML_FORMAT_POOL_MIN_CHARS=0)
+    def test_encode_in_process_pool(self):
+        self.addCleanup(_discard_format_pool)
+        document = self.DOCUMENTS[0]
+        self.assertEqual(gzip.decompress(s3_service._encode_report(document)).decode(), minify_html(document))
+
+    @override_settings(FENIX_HTML_FORMAT_WORKERS=1, FENIX_HTML_FORMAT_POOL_MIN_CHARS=0)
+    def test_timeout_kills_pool(self):
+        document = self.DOCUMENTS[0]
+        pool = mock.Mock()
+        pool.submit.return_value.result.side_effect = FutureTimeoutError()
+
+        with mock.patch('fenix.services.s3_service.format_pool', return_value=pool), \
+                mock.patch('fenix.services.s3_service._discard_format_pool') as discard:
+            body = s3_service._encode_report(document)
+
+        discard.assert_called_once_with(kill=True)
+        # Se sube el original sin minificar
+        self.assertEqual(gzip.decompress(body).decode(), document)
+
+    @override_settings(FENIX_HTML_FORMAT_WORKERS=1)
+    def test_discard_kills_busy_workers(self):
+        self.addCleanup(_discard_format_pool)
+        format_pool().submit(time.sleep, 60)
+        processes = list(format_pool()._processes.values())
+
+        _discard_format_pool(kill=True)
+        for process in processes:
+            process.join(10)
+            self.assertFalse(process.is_alive())
+
+
+class CompressedReportTests(S3TestCase):
+    """Los informes se guardan minificados y con gzip; indentados solo al pedirlos"""
+
+    DOCUMENT = '<html>\n  <body>\n    <h1>Sesión</h1>\n  </body>\n</html>'
+
+    def test_upload_is_minified_and_gzipped(self):
+        self.export(self.DOCUMENT)
+        process_due_jobs()
+
+        kwargs = self.s3_client.put_object.call_args.kwargs
+        self.assertEqual(kwargs['ContentEncoding'], 'gzip')
+        self.assertEqual(kwargs['ContentType'], 'text/html; charset=utf-8')
+        self.assertEqual(gzip.decompress(kwargs['Body']).decode(), '<html> <body> <h1>Sesión</h1> </body> </html>')
+
+    def test_report_view(self):
+        session = self.export(self.DOCUMENT)
+
+        resp = self.client.get(f"/fenix/sessions/{session['id']}/report", **self.headers())
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp['Content-Type'], 'text/html; charset=utf-8')
+        self.assertEqual(resp.content.decode(), self.DOCUMENT)
+
+        resp = self.client.get(f"/fenix/sessions/{session['id']}/report", {'pretty': 'true'}, **self.headers())
+        self.assertEqual(resp.content.decode(), normalize_html(self.DOCUMENT))
+
+        with override_settings(FENIX_REPORT_PRETTY_MAX_CHARS=len(self.DOCUMENT) - 1):
+            resp = self.client.get(f"/fenix/sessions/{session['id']}/report", {'pretty': 'true'}, **self.headers())
+        self.assertEqual(resp.content.decode(), self.DOCUMENT)
+
+        User.objects.create(github_handle='bea')
+        resp = self.client.get(f"/fenix/sessions/{session['id']}/report", **self.headers('bea'))
+        self.assertEqual(resp.status_code, 403)
+
+
+    @override_settings(FENIX_HTML_FORMAT_WORKERS=1, FENIX_HTML_FORMAT_POOL_MIN_CHARS=0)
+    def test_pretty_report_in_process_pool(self):
+        self.addCleanup(_discard_format_pool)
+        session = self.export(self.DOCUMENT)
+
+        with mock.patch('fenix.services.s3_service.format_pool', wraps=format_pool) as pool:
+            resp = self.client.get(f"/fenix/sessions/{session['id']}/report", {'pretty': 'true'}, **self.headers())
+        pool.assert_called_once()
+        self.assertEqual(resp.content.decode(), normalize_html(self.DOCUMENT))
+
+
+class CompressedContentTests(FenixTestCase):
+    """SessionContent.body se guarda comprimido con zstd y se lee como texto"""
+
+    def document(self, i):
+        turns = ''.join(f'<div class="turn user"><p>Paso {j} de la sesión {i}</p><pre>make test</pre></div>' for j in range(i % 7 + 3))
+        return f'<html><head><style>.turn {{ margin: 0 }}</style></head><body>{turns}</body></html>'
+
+    def raw_body(self, content_id):
+        with connection.cursor() as cursor:
+            pk = SessionContent._meta.pk.get_db_prep_value(content_id, connection)
+            cursor.execute('SELECT body FROM fenix_session_contents WHERE id = %s', [pk])
+            return bytes(cursor.fetchone()[0])
+
+    def test_body_stored_compressed(self):
+        document = self.document(1) * 20
+        session = self.create_session('comprimida', document)
+
+        raw = self.raw_body(session.content_id)
+        self.assertTrue(raw.startswith(b'\x28\xb5\x2f\xfd'))  # magic de zstd
+        self.assertLess(len(raw), len(document) // 5)
+        self.assertEqual(SessionContent.objects.get(id=session.content_id).body, document)
+
+        resp = self.client.get(f'/fenix/sessions/{session.id}', **self.headers())
+        self.assertEqual(resp.json()['session_data'], document)
+
+    def test_trained_dictionary(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+
+        with override_settings(FENIX_CONTENT_DICTIONARY_DIR=directory):
+            dictionary = train_dictionary([self.document(i) for i in range(300)], 4096)
+            save_dictionary(dictionary)
+            session = self.create_session('sin diccionario', self.document(1000))
+            self.assertEqual(zstandard.get_frame_parameters(self.raw_body(session.content_id)).dict_id, 0)
+
+            with override_settings(FENIX_CONTENT_DICTIONARY_ID=dictionary.dict_id()):
+                call_command('train_content_dictionary', '--recompress', stdout=io.StringIO())
+
+            raw = self.raw_body(session.content_id)
+            self.assertEqual(zstandard.get_frame_parameters(raw).dict_id, dictionary.dict_id())
+            self.assertEqual(SessionContent.objects.get(id=session.content_id).body, self.document(1000))
+
+    def test_missing_dictionary_fails_at_startup(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+
+        with override_settings(FENIX_CONTENT_DICTIONARY_DIR=directory, FENIX_CONTENT_DICTIONARY_ID=123456):
+            with self.assertRaises(ImproperlyConfigured):
+                load_configured_dictionary()
+
+            # Un fichero con otro contenido tampoco vale
+            dictionary_path(123456).write_bytes(b'no es un diccionario')
+            with self.assertRaises(ImproperlyConfigured):
+                load_configured_dictionary()
+
+
+class CompressedTransferTests(FenixTestCase):
+    """Cuerpos de request con gzip/zstd y respuestas con gzip negociado"""
+
+    def post_session(self, body, encoding, **extra):
+        return self.client.post(
+            '/fenix/sessions', body, content_type='application/json',
+            HTTP_CONTENT_ENCODING=encoding, **self.headers(), **extra
+        )
+
+    def test_compressed_request_body(self):
+        document = '<html><body>' + '<p>turno</p>' * 500 + '</body></html>'
+        payload = json.dumps({'title': 'comprimida', 'session_data': document}).encode()
+
+        for encoding, compress in (('gzip', gzip.compress), ('zstd', zstandard.ZstdCompressor().compress)):
+            resp = self.post_session(compress(payload), encoding)
+            self.assertEqual(resp.status_code, 201, resp.content)
+            session = Session.objects.select_related('content').get(id=resp.json()['id'])
+            self.assertEqual(session.content.body, document)
+
+    def test_rejected_request_bodies(self):
+        payload = json.dumps({'title': 'x', 'session_data': 'a' * 5000}).encode()
+
+        self.assertEqual(self.post_session(payload, 'br').status_code, 415)
+        self.assertEqual(self.post_session(b'no es gzip', 'gzip').status_code, 400)
+        with override_settings(DATA_UPLOAD_MAX_MEMORY_SIZE=1000):
+            resp = self.post_session(gzip.compress(payload), 'gzip')
+        self.assertEqual(resp.status_code, 413)
+        self.assertFalse(Session.objects.exists())
+
+    def test_gzip_response(self):
+        for i in range(20):
+            self.create_session(f'Sesión {i}', '<p>x</p>', description='Refactor del módulo de pagos')
+
+        resp = self.client.get('/fenix/sessions', HTTP_ACCEPT_ENCODING='gzip', **self.headers())
+        self.assertEqual(resp['Content-Encoding'], 'gzip')
+        self.assertEqual(len(json.loads(gzip.decompress(resp.content))['items']), 20)
+
+        resp = self.client.get('/fenix/sessions', **self.headers())
+        self.assertFalse(resp.has_header('Content-Encoding'))
+
+
+@unittest.skipUnless(mock_aws, "Direct upload tests require moto (requirements-dev.txt)")
+class DirectUploadTests(FenixTestCase):
+    """Subida directa a S3 (moto): URL prefirmada, PUT, finalize e ingesta en el worker"""
+
+    BUCKET = 'fenix-test-reports'
+    DOCUMENT = '<html><body>' + '<p>export grande</p>' * 200 + '</body></html>'
+
+    def setUp(self):
+        super().setUp()
+        aws = mock_aws()
+        aws.start()
+        self.addCleanup(aws.stop)
+
+        self.s3 = boto3.client('s3', region_name='us-east-1', aws_access_key_id='test', aws_secret_access_key='test')
+        self.s3.create_bucket(Bucket=self.BUCKET)
+        for name, value in (('s3_client', self.s3), ('bucket_name', self.BUCKET)):
+            patcher = mock.patch.object(s3_service, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def request_upload(self, body, github_handle=None):
+        resp = self.client.post(
+            '/fenix/sessions/uploads',
+            json.dumps({'sha256': content_sha256(body), 'size': len(body.encode())}),
+            content_type='application/json',
+            **self.headers(github_handle)
+        )
+        self.assertEqual(resp.status_code, 200, resp.content)
+        return resp.json()
+
+    def upload(self, body, github_handle=None):
+        upload = self.request_upload(body, github_handle)
+        self.assertTrue(upload['upload_required'])
+        resp = requests.put(upload['url'], data=body.encode(), headers=upload['headers'])
+        self.assertEqual(resp.status_code, 200)
+        return upload['key']
+
+    def finalize(self, sha256, key=None, github_handle=None):
+        return self.client.post(
+            '/fenix/sessions/uploads/finalize',
+            json.dumps({'title': 'directa', 'sha256': sha256, 'key': key}),
+            content_type='application/json',
+            **self.headers(github_handle)
+        )
+
+    def test_upload_and_finalize(self):
+        key = self.upload(self.DOCUMENT)
+        self.assertEqual(self.request_upload(self.DOCUMENT)['headers'], {'Content-Type': UPLOAD_CONTENT_TYPE})
+
+        resp = self.finalize(content_sha256(self.DOCUMENT), key)
+        self.assertEqual(resp.status_code, 201, resp.content)
+        self.assertEqual(resp.json()['report_status'], 'pending')
+
+        process_due_jobs()
+
+        session = Session.objects.select_related('content').get(id=resp.json()['id'])
+        self.assertEqual(session.report_status, 'ready')
+        self.assertEqual(session.content.body, self.DOCUMENT)
+        self.assertIsNone(ReportJob.objects.get(content=session.content).staged_key)
+        # El objeto de staging se borra; el informe queda en blobs/
+        self.assertEqual(self.s3.list_objects_v2(Bucket=self.BUCKET, Prefix='uploads/')['KeyCount'], 0)
+        self.assertIsNotNone(s3_service.object_size(f"blobs/{session.content.sha256}.html"))
+
+        # Mismo contenido otra vez: no hace falta subirlo
+        self.assertFalse(self.request_upload(self.DOCUMENT)['upload_required'])
+        resp = self.finalize(content_sha256(self.DOCUMENT))
+        self.assertEqual(resp.status_code, 201, resp.content)
+        self.assertEqual(resp.json()['report_status'], 'ready')
+
+    def test_rejected_finalize(self):
+        sha256 = content_sha256(self.DOCUMENT)
+        User.objects.create(github_handle='bea')
+        key = self.upload(self.DOCUMENT, 'bea')
+
+        self.assertEqual(self.finalize(sha256, key).status_code, 400)  # key de otro usuario
+        self.assertEqual(self.finalize(sha256).status_code, 400)  # sin subir
+        self.assertEqual(self.finalize(sha256, f"uploads/{self.user.github_handle}/nada.html").status_code, 400)
+        self.assertEqual(self.finalize('no-es-un-hash', key, 'bea').status_code, 400)
+        self.assertFalse(Session.objects.exists())
+
+    def get_session(self, session_id, github_handle=None):
+        return self.client.get(f'/fenix/sessions/{session_id}', **self.headers(github_handle))
+
+    def process_jobs(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            process_due_jobs()
+
+    def test_existing_content_needs_proof_of_possession(self):
+        sha256 = content_sha256(self.DOCUMENT)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.finalize(sha256, self.upload(self.DOCUMENT))
+        self.process_jobs()
+
+        # Otro usuario que solo conoce el hash (p. ej. por la URL del informe)
+        User.objects.create(github_handle='bea')
+        self.assertTrue(self.request_upload(self.DOCUMENT, 'bea')['upload_required'])
+        resp = self.finalize(sha256, github_handle='bea')
+        self.assertEqual(resp.status_code, 400)
+        self.assertEqual(resp.json(), self.finalize(content_sha256('<p>nada</p>'), github_handle='bea').json())
+
+        # Con key el finalize no descarga nada: el hash lo comprueba el worker
+        junk_key = self.upload('<p>otra cosa</p>', 'bea')
+        with mock.patch.object(s3_service, 'read_upload', side_effect=AssertionError):
+            resp = self.finalize(sha256, junk_key, 'bea')
+        self.assertEqual(resp.status_code, 201, resp.content)
+        self.assertEqual((resp.json()['report_status'], resp.json()['report_url']), ('pending', None))
+        junk_id = resp.json()['id']
+        self.assertEqual(self.get_session(junk_id, 'bea').json()['upload_status'], 'pending')
+
+        self.process_jobs()
+        self.assertEqual(self.get_session(junk_id, 'bea').json()['upload_status'], 'failed')
+        self.assertEqual(Session.objects.get(id=junk_id).report_status, 'failed')
+
+        # Con el contenido de verdad sí
+        resp = self.finalize(sha256, self.upload(self.DOCUMENT, 'bea'), 'bea')
+        self.assertEqual(resp.status_code, 201, resp.content)
+        session_id = resp.json()['id']
+        self.assertEqual(self.get_session(session_id, 'bea').status_code, 409)
+
+        self.process_jobs()
+        self.assertEqual(self.get_session(session_id, 'bea').json()['session_data'], self.DOCUMENT)
+        self.assertEqual(Session.objects.get(id=session_id).report_status, 'ready')
+        self.assertEqual(self.get_session(junk_id, 'bea').status_code, 409)
+        self.assertEqual(SessionContent.objects.count(), 1)
+        self.assertFalse(self.request_upload(self.DOCUMENT, 'bea')['upload_required'])
+        self.assertEqual(self.s3.list_objects_v2(Bucket=self.BUCKET, Prefix='uploads/')['KeyCount'], 0)
+
+    def test_verified_upload_does_not_unlock_bogus_first_upload(self):
+        sha256 = content_sha256(self.DOCUMENT)
+        # Alguien declara el hash con otro contenido antes que el dueño real
+        bogus = self.finalize(sha256, self.upload('<p>otra cosa</p>')).json()['id']
+        self.process_jobs()
+        self.assertEqual(self.get_session(bogus).json()['upload_status'], 'failed')
+
+        User.objects.create(github_handle='bea')
+        session_id = self.finalize(sha256, self.upload(self.DOCUMENT, 'bea'), 'bea').json()['id']
+        self.process_jobs()
+
+        self.assertEqual(self.get_session(session_id, 'bea').json()['session_data'], self.DOCUMENT)
+        resp = self.get_session(bogus)
+        self.assertEqual((resp.status_code, resp.json()['upload_status']), (409, 'failed'))
+        self.assertIsNone(Session.objects.get(id=bogus).report_url)
+        self.assertEqual(self.s3.list_objects_v2(Bucket=self.BUCKET, Prefix='uploads/')['KeyCount'], 0)
+
+    def test_hash_mismatch_fails_report(self):
+        key = self.upload(self.DOCUMENT)
+        resp = self.finalize(content_sha256('<p>otra cosa</p>'), key)
+        self.assertEqual(resp.status_code, 201, resp.content)
+
+        process_due_jobs()
+
+        session = Session.objects.get(id=resp.json()['id'])
+        self.assertEqual(session.report_status, 'failed')
+        self.assertEqual(session.content.body, '')
+
+        resp = self.client.get(f'/fenix/sessions/{session.id}', **self.headers())
+        self.assertEqual(resp.status_code, 409)
+        self.assertEqual(resp.json()['upload_status'], 'failed')
+
+        # Volver a subirlo con el contenido correcto reemplaza la subida fallida
+        document = '<p>otra cosa</p>'
+        key = self.upload(document)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(self.finalize(content_sha256(document), key).status_code, 201)
+        process_due_jobs()
+
+        resp = self.client.get(f'/fenix/sessions/{session.id}', **self.headers())
+        self.assertEqual(resp.json()['session_data'], document)
+        self.assertEqual(self.s3.list_objects_v2(Bucket=self.BUCKET, Prefix='uploads/')['KeyCount'], 0)
+
+    def test_pending_upload_is_explicit(self):
+        key = self.upload(self.DOCUMENT)
+        session_id = self.finalize(content_sha256(self.DOCUMENT), key).json()['id']
+
+        resp = self.client.get(f'/fenix/sessions/{session_id}', **self.headers())
+        self.assertEqual(resp.status_code, 409)
+        self.assertEqual(resp.json()['upload_status'], 'pending')
+        self.assertEqual(self.client.get(f'/fenix/sessions/{session_id}/report', **self.headers()).status_code, 409)
+
+        # Sin session_data no hace falta el body
+        resp = self.client.get(f'/fenix/sessions/{session_id}', {'fields': 'title'}, **self.headers())
+        self.assertEqual(resp.json(), {'title': 'directa'})
+
+        resp = self.client.post(
+            '/fenix/sessions/batch-get', json.dumps({'session_ids': [session_id]}),
+            content_type='application/json', **self.headers()
+        )
+        self.assertEqual(resp.json()['results'], [{'session_id': session_id, 'status': 'upload_pending'}])
+
+        process_due_jobs()
+        resp = self.client.get(f'/fenix/sessions/{session_id}', **self.headers())
+        self.assertEqual(resp.json()['session_data'], self.DOCUMENT)
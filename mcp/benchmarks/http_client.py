@@ -0,0 +1,118 @@
+"""
+Benchmark: cliente HTTP compartido vs un httpx.AsyncClient nuevo por tool call.
+
+Levanta un stand-in local de db_api (uvicorn + Starlette) y mide la latencia
+de `tools.list_own_creations` en ambos modos.
+
+Uso (desde mcp/):
+    python -m benchmarks.http_client --calls 500
+"""
+import argparse
+import asyncio
+import os
+import socket
+import statistics
+import threading
+import time
+
+os.environ.setdefault("DAMELO_API_URL", "http://127.0.0.1:0")
+os.environ.setdefault("MCP_API_KEY", "bench")
+
+import httpx
+import uvicorn
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+import http_client
+import tools
+
+
+async def _sessions_page(request):
+    return JSONResponse({
+        "items": [
+            {
+                "id": f"00000000-0000-0000-0000-{i:012d}",
+                "title": f"Session {i}",
+                "repo": "org/project",
+                "report_url": f"https://bucket.s3.amazonaws.com/blobs/{i:064d}.html",
+                "is_public": False,
+                "created_at": "2026-10-17T00:00:00Z",
+            }
+            for i in range(20)
+        ],
+        "next_cursor": None,
+    })
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _start_stand_in(port: int) -> uvicorn.Server:
+    app = Starlette(routes=[Route("/fenix/sessions", _sessions_page)])
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server
+
+
+class _FreshClientPerCall:
+    """Reproduce el comportamiento anterior: un cliente (y un handshake) por llamada"""
+
+    def __init__(self):
+        self.clients: list[httpx.AsyncClient] = []
+
+    def get_client(self) -> httpx.AsyncClient:
+        client = httpx.AsyncClient(timeout=30)
+        self.clients.append(client)
+        return client
+
+    async def close(self):
+        for client in self.clients:
+            await client.aclose()
+
+
+async def _measure(calls: int) -> list[float]:
+    latencies = []
+    for _ in range(calls):
+        start = time.perf_counter()
+        await tools.list_own_creations("bench")
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+
+def _report(name: str, latencies: list[float]) -> None:
+    latencies = sorted(latencies)
+    p99 = latencies[int(len(latencies) * 0.99) - 1]
+    print(f"{name:<22} mean {statistics.mean(latencies):7.3f} ms   "
+          f"p50 {statistics.median(latencies):7.3f} ms   p99 {p99:7.3f} ms")
+
+
+async def main(calls: int) -> None:
+    port = _free_port()
+    server = _start_stand_in(port)
+    tools.API_URL = f"http://127.0.0.1:{port}/fenix"
+
+    try:
+        fresh = _FreshClientPerCall()
+        tools.http_client = fresh
+        await _measure(10)  # warm-up
+        _report("client per call", await _measure(calls))
+        await fresh.close()
+
+        tools.http_client = http_client
+        await _measure(10)
+        _report("shared pooled client", await _measure(calls))
+        await http_client.close_client()
+    finally:
+        server.should_exit = True
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=500)
+    asyncio.run(main(parser.parse_args().calls))
@@ -0,0 +1,102 @@
+import gzip
+import json
+import os
+import httpx
+
+from typing import Optional
+from fastmcp.server.lifespan import lifespan
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Límites del pool de conexiones hacia db_api
+HTTP_TIMEOUT = float(os.environ.get("DAMELO_HTTP_TIMEOUT", "30"))
+HTTP_MAX_CONNECTIONS = int(os.environ.get("DAMELO_HTTP_MAX_CONNECTIONS", "100"))
+HTTP_MAX_KEEPALIVE = int(os.environ.get("DAMELO_HTTP_MAX_KEEPALIVE", "20"))
+HTTP_KEEPALIVE_EXPIRY = float(os.environ.get("DAMELO_HTTP_KEEPALIVE_EXPIRY", "30"))
+HTTP2 = os.environ.get("DAMELO_HTTP2", "false").lower() in ("1", "true", "yes")
+# Cuerpos JSON de al menos este tamaño se envían comprimidos con gzip (0 = nunca)
+REQUEST_GZIP_MIN_BYTES = int(os.environ.get("DAMELO_REQUEST_GZIP_MIN_BYTES", "1024"))
+
+_client: Optional[httpx.AsyncClient] = None
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def create_client() -> httpx.AsyncClient:
+    """
+    Crea el cliente HTTP compartido hacia db_api.
+
+    Reutiliza conexiones TCP/TLS entre tool calls (keep-alive) en vez de
+    pagar un handshake nuevo por cada llamada.
+    """
+    http2 = HTTP2
+    if http2 and not _http2_available():
+        print("Warning: DAMELO_HTTP2 is set but 'h2' is not installed (pip install httpx[http2]), using HTTP/1.1")
+        http2 = False
+
+    return httpx.AsyncClient(
+        timeout=HTTP_TIMEOUT,
+        http2=http2,
+        limits=httpx.Limits(
+            max_connections=HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=HTTP_MAX_KEEPALIVE,
+            keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+        ),
+    )
+
+
+def get_client() -> httpx.AsyncClient:
+    """
+    Devuelve el cliente compartido del proceso.
+    Normalmente lo abre el lifespan de FastMCP; si no (scripts, tests) se crea al primer uso.
+    """
+    global _client
+    if _client is None or _client.is_closed:
+        _client = create_client()
+    return _client
+
+
+async def close_client() -> None:
+    """Cierra el cliente compartido y sus conexiones abiertas"""
+    global _client
+    if _client is not None and not _client.is_closed:
+        await _client.aclose()
+    _client = None
+
+
+def encode_json(payload: dict, headers: dict[str, str]) -> tuple[bytes, dict[str, str]]:
+    """
+    Serializa un payload JSON para db_api, comprimido con gzip si es grande.
+
+    Las respuestas ya llegan comprimidas sin hacer nada: httpx manda
+    Accept-Encoding y las descomprime solo.
+
+    Args:
+        payload: Cuerpo de la petición
+        headers: Headers de la API (ver utils.get_api_headers)
+
+    Returns:
+        Tupla (cuerpo, headers) para pasar como content= y headers= a httpx
+    """
+    # Mismo JSON que genera httpx con json=
+    body = json.dumps(payload, ensure_ascii=False, separators=(",", ":"), allow_nan=False).encode("utf-8")
+    if REQUEST_GZIP_MIN_BYTES and len(body) >= REQUEST_GZIP_MIN_BYTES:
+        return gzip.compress(body, compresslevel=6), {**headers, "Content-Encoding": "gzip"}
+    return body, headers
+
+
+@lifespan
+async def http_client_lifespan(server):
+    """Abre el cliente compartido al arrancar el servidor MCP y lo cierra al apagarlo"""
+    get_client()
+    try:
+        yield {}
+    finally:
+        await close_client()
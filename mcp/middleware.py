@@ -1,9 +1,9 @@
 import os
-import httpx
 import utils
-import tools
+import http_client
 
 from typing import Annotated, Optional
+from cachetools import TTLCache
 from pydantic import Field
 from fastmcp import FastMCP
 from fastmcp.exceptions import ToolError
@@ -17,11 +17,23 @@ load_dotenv()
 
 API_URL = os.environ.get("DAMELO_API_URL") + "/fenix"
 
+# Usuarios validados recientemente: (github_handle, email, display_name) -> True
+USER_CACHE_TTL = float(os.environ.get("DAMELO_USER_CACHE_TTL", "600"))
+USER_CACHE_MAXSIZE = int(os.environ.get("DAMELO_USER_CACHE_MAXSIZE", "10000"))
+
+
 class UserValidationMiddleware(Middleware):
     """
     Middleware que valida/crea el usuario en db_api después de la autenticación OAuth.
     Extrae el github_handle del token de GitHub y asegura que el usuario existe en db_api.
+
+    Los usuarios ya validados con los mismos datos se recuerdan durante USER_CACHE_TTL
+    segundos, así que los reconnects no vuelven a llamar a db_api.
     """
+    def __init__(self):
+        super().__init__()
+        self.validated_users = TTLCache(maxsize=USER_CACHE_MAXSIZE, ttl=USER_CACHE_TTL)
+
     async def on_initialize(self, context: MiddlewareContext, call_next):
 
         token = get_access_token()
@@ -30,29 +42,39 @@ class UserValidationMiddleware(Middleware):
         if not github_handle:
             raise ToolError("Could not extract GitHub handle from OAuth token")
 
-        async with httpx.AsyncClient(timeout=30) as client:
-            try:
-                resp = await client.post(
-                    f"{API_URL}/auth/validate-or-create",
-                    headers=utils.get_api_headers(github_handle),
-                    json={
-                        "email": token.claims.get("email"),
-                        "display_name": token.claims.get("name")
-                    }
-                )
-
-                if resp.status_code not in [200, 201]:
-                    print(f"Warning: Could not validate/create user in db_api: {resp.status_code}")
-                else:
-                    user_data = resp.json()
-                    existed = user_data.get("existed", False)
-                    if existed:
-                        print(f"User @{github_handle} validated in db_api")
-                    else:
-                        print(f"User @{github_handle} created in db_api")
+        email = token.claims.get("email")
+        display_name = token.claims.get("name")
+        cache_key = (github_handle, email, display_name)
 
-            except Exception as e:
-                print(f"Error validating user in db_api: {e}")
+        if cache_key not in self.validated_users:
+            await self._validate_user(github_handle, email, display_name)
 
         response = await call_next(context)
-        return response
\ No newline at end of file
+        return response
+
+    async def _validate_user(self, github_handle: str, email: Optional[str], display_name: Optional[str]) -> None:
+        """Llama a /auth/validate-or-create y cachea el usuario solo si db_api respondió bien"""
+        client = http_client.get_client()
+        try:
+            resp = await client.post(
+                f"{API_URL}/auth/validate-or-create",
+                headers=utils.get_api_headers(github_handle),
+                json={
+                    "email": email,
+                    "display_name": display_name
+                }
+            )
+
+            if resp.status_code not in [200, 201]:
+                print(f"Warning: Could not validate/create user in db_api: {resp.status_code}")
+            else:
+                self.validated_users[(github_handle, email, display_name)] = True
+                user_data = resp.json()
+                existed = user_data.get("existed", False)
+                if existed:
+                    print(f"User @{github_handle} validated in db_api")
+                else:
+                    print(f"User @{github_handle} created in db_api")
+
+        except Exception as e:
+            print(f"Error validating user in db_api: {e}")
\ No newline at end of file
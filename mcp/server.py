@@ -3,7 +3,7 @@ import httpx
 import utils
 import tools
 
-from typing import Annotated, Optional
+from typing import Annotated, Literal, Optional
 from pydantic import Field
 from fastmcp import FastMCP
 from fastmcp.exceptions import ToolError
@@ -13,6 +13,7 @@ from fastmcp.server.dependencies import get_access_token
 from key_value.aio.stores.dynamodb import DynamoDBStore
 from dotenv import load_dotenv
 from middleware import UserValidationMiddleware
+from http_client import http_client_lifespan
 
 load_dotenv()
 
@@ -48,6 +49,9 @@ mcp = FastMCP(
         - Browse sessions shared with your teams
         - Import sessions from teammates
         - Search sessions by repository
+        - Search sessions by text (title, description and content)
+        - See recent activity across all your teams
+        - Import, share and add members in batches (one call for many items)
 
         All sessions are stored securely and can be shared with your team members.
 
@@ -67,7 +71,8 @@ mcp = FastMCP(
         - Ensure all tags are properly closed and nested
         """
     ),
-    auth=auth
+    auth=auth,
+    lifespan=http_client_lifespan
 )
 
 mcp.add_middleware(UserValidationMiddleware())
@@ -78,37 +83,41 @@ mcp.add_middleware(UserValidationMiddleware())
 
 @mcp.tool(
     name="list_own_creations",
-    description="List all sessions created by the user",
+    description="List the sessions created by the user, newest first, one page at a time",
     annotations={
         "readOnlyHint": True,
         "destructiveHint": False,
         "openWorldHint": True,
     },
 )
-async def list_own_creations_tool() -> str:
-    """Lista todas las sesiones creadas por el usuario autenticado."""
+async def list_own_creations_tool(
+    cursor: Annotated[Optional[str], Field(description="Cursor returned by a previous call to fetch the next page")] = None,
+) -> str:
+    """Lista una página de las sesiones creadas por el usuario autenticado."""
     github_handle = utils.get_github_handle()
-    return await tools.list_own_creations(github_handle)
+    return await tools.list_own_creations(github_handle, cursor)
 
 
 @mcp.tool(
     name="list_user_teams",
-    description="List all teams where the user is a member",
+    description="List the teams where the user is a member, one page at a time",
     annotations={
         "readOnlyHint": True,
         "destructiveHint": False,
         "openWorldHint": True,
     },
 )
-async def list_user_teams_tool() -> str:
-    """Lista todos los equipos donde el usuario es miembro."""
+async def list_user_teams_tool(
+    cursor: Annotated[Optional[str], Field(description="Cursor returned by a previous call to fetch the next page")] = None,
+) -> str:
+    """Lista una página de los equipos donde el usuario es miembro."""
     github_handle = utils.get_github_handle()
-    return await tools.list_user_teams(github_handle)
+    return await tools.list_user_teams(github_handle, cursor)
 
 
 @mcp.tool(
     name="list_team_sessions",
-    description="List all sessions shared with a specific team",
+    description="List the sessions shared with a specific team, newest first, one page at a time",
     annotations={
         "readOnlyHint": True,
         "destructiveHint": False,
@@ -116,16 +125,17 @@ async def list_user_teams_tool() -> str:
     },
 )
 async def list_team_sessions_tool(
-    team_id: Annotated[str, Field(description="UUID of the team")]
+    team_id: Annotated[str, Field(description="UUID of the team")],
+    cursor: Annotated[Optional[str], Field(description="Cursor returned by a previous call to fetch the next page")] = None,
 ) -> str:
-    """Lista todas las sesiones compartidas con un equipo específico."""
+    """Lista una página de las sesiones compartidas con un equipo específico."""
     github_handle = utils.get_github_handle()
-    return await tools.list_team_sessions(team_id, github_handle)
+    return await tools.list_team_sessions(team_id, github_handle, cursor)
 
 
 @mcp.tool(
     name="list_repo_sessions",
-    description="List all sessions of a specific repository",
+    description="List the sessions of a specific repository, newest first, one page at a time",
     annotations={
         "readOnlyHint": True,
         "destructiveHint": False,
@@ -133,11 +143,55 @@ async def list_team_sessions_tool(
     },
 )
 async def list_repo_sessions_tool(
-    repo: Annotated[str, Field(description="Repository name in 'owner/repo' format")]
+    repo: Annotated[str, Field(description="Repository as 'owner/repo' or its git remote URL (HTTPS or SSH)")],
+    cursor: Annotated[Optional[str], Field(description="Cursor returned by a previous call to fetch the next page")] = None,
 ) -> str:
-    """Lista todas las sesiones de un repositorio específico."""
+    """Lista una página de las sesiones de un repositorio específico."""
     github_handle = utils.get_github_handle()
-    return await tools.list_repo_sessions(repo, github_handle)
+    return await tools.list_repo_sessions(repo, github_handle, cursor)
+
+
+@mcp.tool(
+    name="list_activity",
+    description=(
+        "What's new across all the user's teams in one call: sessions shared with their teams, "
+        "updates to shared sessions and new members. Newest first, one page at a time. "
+        "Pass 'since' to get only the activity after a given time."
+    ),
+    annotations={
+        "readOnlyHint": True,
+        "destructiveHint": False,
+        "openWorldHint": True,
+    },
+)
+async def list_activity_tool(
+    since: Annotated[Optional[str], Field(description="ISO 8601 timestamp; only activity after it is returned")] = None,
+    cursor: Annotated[Optional[str], Field(description="Cursor returned by a previous call to fetch the next page")] = None,
+) -> str:
+    """Lista una página del feed de actividad del usuario en todos sus equipos."""
+    github_handle = utils.get_github_handle()
+    return await tools.list_activity(github_handle, since, cursor)
+
+
+@mcp.tool(
+    name="search_sessions",
+    description=(
+        "Full-text search over the sessions the user can open (own, public and shared with their teams), "
+        "matching title, description and content. Results are ranked by relevance. "
+        "Supports \"exact phrases\", -excluded words and OR."
+    ),
+    annotations={
+        "readOnlyHint": True,
+        "destructiveHint": False,
+        "openWorldHint": True,
+    },
+)
+async def search_sessions_tool(
+    query: Annotated[str, Field(description="Text to search for")]
+) -> str:
+    """Busca sesiones por texto entre las que el usuario puede ver."""
+    github_handle = utils.get_github_handle()
+    return await tools.search_sessions(query, github_handle)
 
 
 @mcp.tool(
@@ -175,6 +229,78 @@ async def share_session_with_team_tool(
     return await tools.share_session_with_team(session_id, team_id, github_handle)
 
 
+@mcp.tool(
+    name="import_sessions",
+    description="Import several sessions by ID in one call. Returns the full data of each accessible session and the status of the rest",
+    annotations={
+        "readOnlyHint": True,
+        "destructiveHint": False,
+        "openWorldHint": True,
+    },
+)
+async def import_sessions_tool(
+    session_ids: Annotated[list[str], Field(description="UUIDs of the sessions to import (max 100)")]
+) -> str:
+    """Importa varias sesiones por ID."""
+    github_handle = utils.get_github_handle()
+    return await tools.import_sessions(session_ids, github_handle)
+
+
+@mcp.tool(
+    name="share_sessions_with_team",
+    description="Share several of your sessions with one team in one call. Returns the result for each session",
+    annotations={
+        "readOnlyHint": False,
+        "destructiveHint": False,
+        "openWorldHint": True,
+    },
+)
+async def share_sessions_with_team_tool(
+    session_ids: Annotated[list[str], Field(description="UUIDs of the sessions to share (max 100)")],
+    team_id: Annotated[str, Field(description="UUID of the team to share with")],
+) -> str:
+    """Comparte varias sesiones con un equipo."""
+    github_handle = utils.get_github_handle()
+    return await tools.share_sessions_with_team(session_ids, team_id, github_handle)
+
+
+@mcp.tool(
+    name="share_session_with_teams",
+    description="Share one of your sessions with several teams in one call. Returns the result for each team",
+    annotations={
+        "readOnlyHint": False,
+        "destructiveHint": False,
+        "openWorldHint": True,
+    },
+)
+async def share_session_with_teams_tool(
+    session_id: Annotated[str, Field(description="UUID of the session to share")],
+    team_ids: Annotated[list[str], Field(description="UUIDs of the teams to share with (max 100)")],
+) -> str:
+    """Comparte una sesión con varios equipos."""
+    github_handle = utils.get_github_handle()
+    return await tools.share_session_with_teams(session_id, team_ids, github_handle)
+
+
+@mcp.tool(
+    name="add_team_members",
+    description="Add several users to a team in one call (team owners and admins only). Returns the result for each user",
+    annotations={
+        "readOnlyHint": False,
+        "destructiveHint": False,
+        "openWorldHint": True,
+    },
+)
+async def add_team_members_tool(
+    team_id: Annotated[str, Field(description="UUID of the team")],
+    github_handles: Annotated[list[str], Field(description="GitHub handles of the users to add (max 100)")],
+    role: Annotated[Literal["member", "admin"], Field(description="Role for the new members")] = "member",
+) -> str:
+    """Añade varios miembros a un equipo."""
+    github_handle = utils.get_github_handle()
+    return await tools.add_team_members(team_id, github_handles, github_handle, role)
+
+
 @mcp.tool(
     name="update_session",
     description=(
@@ -1,6 +1,7 @@
+import hashlib
 import os
-import httpx
 import utils
+import http_client
 from typing import Annotated, Optional
 from pydantic import Field
 from fastmcp.exceptions import ToolError
@@ -8,33 +9,49 @@ from fastmcp.exceptions import ToolError
 # API URL de db_api
 API_URL = os.environ.get("DAMELO_API_URL") + "/fenix"
 
+# Tamaño de página pedido a db_api en los listados
+PAGE_SIZE = int(os.environ.get("DAMELO_PAGE_SIZE", "20"))
 
-async def list_own_creations(github_handle: str) -> str:
+# Campos pedidos a db_api (fields=) por cada herramienta: solo los que se muestran
+OWN_SESSION_FIELDS = "id,title,repo,description,report_url,is_public,created_at"
+TEAM_SESSION_FIELDS = "id,title,owner,repo,description,report_url"
+REPO_SESSION_FIELDS = "id,title,owner,description,report_url,metadata,created_at"
+SEARCH_SESSION_FIELDS = "id,title,owner,repo,description,report_url,created_at"
+IMPORT_SESSION_FIELDS = "title,description,report_url,report_status,session_data"
+
+# Exports de al menos este tamaño se suben directamente a S3 sin pasar por db_api (0 = nunca)
+DIRECT_UPLOAD_MIN_BYTES = int(os.environ.get("DAMELO_DIRECT_UPLOAD_MIN_BYTES", str(1024 * 1024)))
+
+
+async def list_own_creations(github_handle: str, cursor: Optional[str] = None) -> str:
     """
-    Lista todas las sesiones creadas por el usuario.
+    Lista una página de las sesiones creadas por el usuario.
 
     Args:
         github_handle: El handle de GitHub del usuario autenticado
+        cursor: Cursor de la página anterior (opcional)
 
     Returns:
         String formateado con la lista de sesiones
     """
-    async with httpx.AsyncClient(timeout=30) as client:
-        resp = await client.get(
-            f"{API_URL}/sessions",
-            headers=utils.get_api_headers(github_handle)
-        )
+    client = http_client.get_client()
+    resp = await client.get(
+        f"{API_URL}/sessions",
+        headers=utils.get_api_headers(github_handle),
+        params={"fields": OWN_SESSION_FIELDS, **utils.page_params(PAGE_SIZE, cursor)},
+    )
 
     if resp.status_code != 200:
         detail = resp.json().get("detail") if resp.status_code >= 400 else None
         utils.handle_api_error(resp.status_code, detail)
 
-    sessions = resp.json()
+    page = resp.json()
+    sessions = page["items"]
 
     if not sessions:
         return "No sessions found."
 
-    lines: list[str] = [f"## Your Sessions ({len(sessions)} found)\n"]
+    lines: list[str] = [f"## Your Sessions ({len(sessions)} shown)\n"]
 
     for s in sessions:
         lines.append(f"### {s.get('title', 'Untitled')}")
@@ -49,35 +66,40 @@ async def list_own_creations(github_handle: str) -> str:
         lines.append(f"- **Created:** {s.get('created_at', 'N/A')}")
         lines.append("")
 
+    utils.append_next_cursor(lines, page.get("next_cursor"))
+
     return "\n".join(lines)
 
 
-async def list_user_teams(github_handle: str) -> str:
+async def list_user_teams(github_handle: str, cursor: Optional[str] = None) -> str:
     """
-    Lista todos los equipos donde el usuario es miembro.
+    Lista una página de los equipos donde el usuario es miembro.
 
     Args:
         github_handle: El handle de GitHub del usuario autenticado
+        cursor: Cursor de la página anterior (opcional)
 
     Returns:
         String formateado con la lista de equipos
     """
-    async with httpx.AsyncClient(timeout=30) as client:
-        resp = await client.get(
-            f"{API_URL}/teams",
-            headers=utils.get_api_headers(github_handle)
-        )
+    client = http_client.get_client()
+    resp = await client.get(
+        f"{API_URL}/teams",
+        headers=utils.get_api_headers(github_handle),
+        params=utils.page_params(PAGE_SIZE, cursor),
+    )
 
     if resp.status_code != 200:
         detail = resp.json().get("detail") if resp.status_code >= 400 else None
         utils.handle_api_error(resp.status_code, detail)
 
-    teams = resp.json()
+    page = resp.json()
+    teams = page["items"]
 
     if not teams:
         return "No teams found. You are not a member of any team yet."
 
-    lines: list[str] = [f"## Your Teams ({len(teams)} found)\n"]
+    lines: list[str] = [f"## Your Teams ({len(teams)} shown)\n"]
 
     for t in teams:
         owner = t.get("owner", {})
@@ -90,25 +112,29 @@ async def list_user_teams(github_handle: str) -> str:
         lines.append(f"- **Created:** {t.get('created_at', 'N/A')}")
         lines.append("")
 
+    utils.append_next_cursor(lines, page.get("next_cursor"))
+
     return "\n".join(lines)
 
 
-async def list_team_sessions(team_id: str, github_handle: str) -> str:
+async def list_team_sessions(team_id: str, github_handle: str, cursor: Optional[str] = None) -> str:
     """
-    Lista todas las sesiones compartidas con un equipo específico.
+    Lista una página de las sesiones compartidas con un equipo específico.
 
     Args:
         team_id: UUID del equipo
         github_handle: El handle de GitHub del usuario autenticado
+        cursor: Cursor de la página anterior (opcional)
 
     Returns:
         String formateado con la lista de sesiones del equipo
     """
-    async with httpx.AsyncClient(timeout=30) as client:
-        resp = await client.get(
-            f"{API_URL}/teams/{team_id}/sessions",
-            headers=utils.get_api_headers(github_handle),
-        )
+    client = http_client.get_client()
+    resp = await client.get(
+        f"{API_URL}/teams/{team_id}/sessions",
+        headers=utils.get_api_headers(github_handle),
+        params={"fields": TEAM_SESSION_FIELDS, **utils.page_params(PAGE_SIZE, cursor)},
+    )
 
     if resp.status_code == 403:
         raise ToolError("Access denied: you are not a member of this team.")
@@ -119,12 +145,13 @@ async def list_team_sessions(team_id: str, github_handle: str) -> str:
         detail = resp.json().get("detail") if resp.status_code >= 400 else None
         utils.handle_api_error(resp.status_code, detail)
 
-    team_sessions = resp.json()
+    page = resp.json()
+    team_sessions = page["items"]
 
     if not team_sessions:
         return "No sessions shared with this team yet."
 
-    lines: list[str] = [f"## Team Sessions ({len(team_sessions)} found)\n"]
+    lines: list[str] = [f"## Team Sessions ({len(team_sessions)} shown)\n"]
 
     for ts in team_sessions:
         s = ts.get("session", {})
@@ -142,37 +169,41 @@ async def list_team_sessions(team_id: str, github_handle: str) -> str:
         lines.append(f"- **Shared:** {ts.get('shared_at', 'N/A')}")
         lines.append("")
 
+    utils.append_next_cursor(lines, page.get("next_cursor"))
+
     return "\n".join(lines)
 
 
-async def list_repo_sessions(repo: str, github_handle: str) -> str:
+async def list_repo_sessions(repo: str, github_handle: str, cursor: Optional[str] = None) -> str:
     """
-    Lista todas las sesiones de un repositorio específico.
+    Lista una página de las sesiones de un repositorio específico.
 
     Args:
-        repo: Nombre del repositorio en formato 'owner/repo'
+        repo: Repositorio en formato 'owner/repo' o URL del remote (HTTPS o SSH)
         github_handle: El handle de GitHub del usuario autenticado
+        cursor: Cursor de la página anterior (opcional)
 
     Returns:
         String formateado con la lista de sesiones del repositorio
     """
-    async with httpx.AsyncClient(timeout=30) as client:
-        resp = await client.get(
-            f"{API_URL}/sessions/by-repo",
-            headers=utils.get_api_headers(github_handle),
-            params={"repo": repo},
-        )
+    client = http_client.get_client()
+    resp = await client.get(
+        f"{API_URL}/sessions/by-repo",
+        headers=utils.get_api_headers(github_handle),
+        params={"repo": repo, "fields": REPO_SESSION_FIELDS, **utils.page_params(PAGE_SIZE, cursor)},
+    )
 
     if resp.status_code != 200:
         detail = resp.json().get("detail") if resp.status_code >= 400 else None
         utils.handle_api_error(resp.status_code, detail)
 
-    sessions = resp.json()
+    page = resp.json()
+    sessions = page["items"]
 
     if not sessions:
         return f"No sessions found for repository '{repo}'."
 
-    lines: list[str] = [f"## Sessions for {repo} ({len(sessions)} found)\n"]
+    lines: list[str] = [f"## Sessions for {repo} ({len(sessions)} shown)\n"]
 
     for s in sessions:
         owner = s.get("owner", {})
@@ -189,6 +220,117 @@ async def list_repo_sessions(repo: str, github_handle: str) -> str:
         lines.append(f"- **Created:** {s.get('created_at', 'N/A')}")
         lines.append("")
 
+    utils.append_next_cursor(lines, page.get("next_cursor"))
+
+    return "\n".join(lines)
+
+
+async def list_activity(github_handle: str, since: Optional[str] = None, cursor: Optional[str] = None) -> str:
+    """
+    Lista una página del feed de actividad del usuario en todos sus equipos.
+
+    Args:
+        github_handle: El handle de GitHub del usuario autenticado
+        since: Fecha ISO 8601; solo actividad posterior (opcional)
+        cursor: Cursor de la página anterior (opcional)
+
+    Returns:
+        String formateado con la actividad, de más nueva a más antigua
+    """
+    params = utils.page_params(PAGE_SIZE, cursor)
+    if since:
+        params["since"] = since
+
+    client = http_client.get_client()
+    resp = await client.get(
+        f"{API_URL}/activity",
+        headers=utils.get_api_headers(github_handle),
+        params=params,
+    )
+
+    if resp.status_code != 200:
+        detail = resp.json().get("detail") if resp.status_code >= 400 else None
+        utils.handle_api_error(resp.status_code, detail)
+
+    page = resp.json()
+    entries = page["items"]
+
+    if not entries:
+        return "No new activity in your teams."
+
+    lines: list[str] = [f"## Team Activity ({len(entries)} shown)\n"]
+
+    for e in entries:
+        actor = f"@{e['actor']}" if e.get('actor') else "Someone"
+        team = (e.get('team') or {}).get('name', 'a team')
+        session = e.get('session') or {}
+
+        if e['verb'] == 'session_shared':
+            lines.append(f"- {actor} shared **{session.get('title', 'Untitled')}** with {team}")
+        elif e['verb'] == 'session_updated':
+            changed = ", ".join(e.get('changed_fields') or [])
+            lines.append(f"- {actor} updated **{session.get('title', 'Untitled')}**" + (f" ({changed})" if changed else ""))
+        elif e['verb'] == 'member_added':
+            lines.append(f"- {actor} added @{e.get('member', 'unknown')} to {team}")
+        else:
+            lines.append(f"- {actor}: {e['verb']}")
+
+        if session:
+            lines.append(f"  - **Session ID:** `{session.get('id', 'N/A')}`")
+            if session.get('report_url'):
+                lines.append(f"  - **Report:** {session['report_url']}")
+        lines.append(f"  - **When:** {e.get('created_at', 'N/A')}")
+
+    lines.append("")
+    utils.append_next_cursor(lines, page.get("next_cursor"))
+
+    return "\n".join(lines)
+
+
+async def search_sessions(query: str, github_handle: str) -> str:
+    """
+    Busca sesiones por texto (título, descripción y contenido) entre las que el usuario puede ver.
+
+    Args:
+        query: Texto a buscar (admite "frase exacta", -excluir y OR)
+        github_handle: El handle de GitHub del usuario autenticado
+
+    Returns:
+        String formateado con las sesiones encontradas, de más a menos relevante
+    """
+    client = http_client.get_client()
+    resp = await client.get(
+        f"{API_URL}/sessions/search",
+        headers=utils.get_api_headers(github_handle),
+        params={"q": query, "limit": PAGE_SIZE, "fields": SEARCH_SESSION_FIELDS},
+    )
+
+    if resp.status_code != 200:
+        detail = resp.json().get("detail") if resp.status_code >= 400 else None
+        utils.handle_api_error(resp.status_code, detail)
+
+    sessions = resp.json()["items"]
+
+    if not sessions:
+        return f"No sessions found matching '{query}'."
+
+    lines: list[str] = [f"## Sessions matching '{query}' ({len(sessions)} found)\n"]
+
+    for s in sessions:
+        owner = s.get("owner", {})
+
+        lines.append(f"### {s.get('title', 'Untitled')}")
+        lines.append(f"- **ID:** `{s.get('id', 'N/A')}`")
+        lines.append(f"- **Owner:** @{owner.get('github_handle', 'unknown')}")
+        if s.get('repo'):
+            lines.append(f"- **Repo:** {s['repo']}")
+        if s.get('description'):
+            lines.append(f"- **Description:** {s['description']}")
+        if s.get('report_url'):
+            lines.append(f"- **Report:** {s['report_url']}")
+        lines.append(f"- **Created:** {s.get('created_at', 'N/A')}")
+        lines.append("")
+
     return "\n".join(lines)
 
 
@@ -203,16 +345,23 @@ async def import_session(session_id: str, github_handle: str) -> str:
     Returns:
         String formateado con los datos de la sesión
     """
-    async with httpx.AsyncClient(timeout=30) as client:
-        resp = await client.get(
-            f"{API_URL}/sessions/{session_id}",
-            headers=utils.get_api_headers(github_handle),
-        )
+    client = http_client.get_client()
+    resp = await client.get(
+        f"{API_URL}/sessions/{session_id}",
+        headers=utils.get_api_headers(github_handle),
+        params={"fields": IMPORT_SESSION_FIELDS},
+    )
 
     if resp.status_code == 403:
         raise ToolError("Access denied: you don't have access to this session.")
     if resp.status_code == 404:
         raise ToolError(f"Session '{session_id}' not found.")
+    if resp.status_code == 409:
+        # Subida directa aún sin ingerir: no hay session_data que devolver
+        error = resp.json()
+        if error.get("upload_status") == "failed":
+            raise ToolError(f"Session '{session_id}' content upload failed ({error['detail']}); export it again.")
+        raise ToolError(f"Session '{session_id}' content is still being uploaded; try again in a moment.")
 
     if resp.status_code != 200:
         detail = resp.json().get("detail") if resp.status_code >= 400 else None
@@ -226,8 +375,10 @@ async def import_session(session_id: str, github_handle: str) -> str:
         lines.append(f"**Description:** {data['description']}")
     if data.get('report_url'):
         lines.append(f"**Report URL:** {data['report_url']}")
+    elif data.get('report_status') == 'pending':
+        lines.append("**Report URL:** still being generated")
     lines.append(f"\n### Session Data\n")
-    lines.append(data.get("session_data", ""))
+    lines.append(data["session_data"])
 
     return "\n".join(lines)
 
@@ -250,12 +401,12 @@ async def share_session_with_team(
     """
     payload = {"session_id": session_id}
 
-    async with httpx.AsyncClient(timeout=30) as client:
-        resp = await client.post(
-            f"{API_URL}/teams/{team_id}/sessions",
-            headers=utils.get_api_headers(github_handle),
-            json=payload,
-        )
+    client = http_client.get_client()
+    resp = await client.post(
+        f"{API_URL}/teams/{team_id}/sessions",
+        headers=utils.get_api_headers(github_handle),
+        json=payload,
+    )
 
     if resp.status_code == 400:
         detail = resp.json().get("detail", "Bad request")
@@ -285,6 +436,179 @@ async def share_session_with_team(
     )
 
 
+# Icono por status de los resultados batch de db_api
+BATCH_STATUS_ICONS = {
+    "ok": "✅",
+    "shared": "✅",
+    "added": "✅",
+    "already_shared": "➖",
+    "already_member": "➖",
+    "forbidden": "⛔",
+    "not_found": "❓",
+    "upload_pending": "⏳",
+    "upload_failed": "❌",
+}
+
+
+def _batch_result_lines(results: list[dict], key: str) -> list[str]:
+    """Una línea por item del batch: icono, identificador y status"""
+    return [
+        f"- {BATCH_STATUS_ICONS.get(r['status'], '•')} `{r[key]}`: {r['status'].replace('_', ' ')}"
+        for r in results
+    ]
+
+
+async def import_sessions(session_ids: list[str], github_handle: str) -> str:
+    """
+    Importa varias sesiones por ID en una sola llamada.
+
+    Args:
+        session_ids: UUIDs de las sesiones a importar
+        github_handle: El handle de GitHub del usuario autenticado
+
+    Returns:
+        String formateado con los datos de cada sesión accesible y el status del resto
+    """
+    client = http_client.get_client()
+    resp = await client.post(
+        f"{API_URL}/sessions/batch-get",
+        headers=utils.get_api_headers(github_handle),
+        json={"session_ids": session_ids},
+    )
+
+    if resp.status_code != 200:
+        detail = resp.json().get("detail") if resp.status_code >= 400 else None
+        utils.handle_api_error(resp.status_code, detail)
+
+    results = resp.json()["results"]
+    failed = [r for r in results if r["status"] != "ok"]
+
+    lines: list[str] = []
+    for r in results:
+        if r["status"] != "ok":
+            continue
+        data = r["session"]
+        lines.append(f"## {data.get('title', 'Untitled')}")
+        lines.append(f"**ID:** `{data['id']}`")
+        if data.get('description'):
+            lines.append(f"**Description:** {data['description']}")
+        if data.get('report_url'):
+            lines.append(f"**Report URL:** {data['report_url']}")
+        elif data.get('report_status') == 'pending':
+            lines.append("**Report URL:** still being generated")
+        lines.append(f"\n### Session Data\n")
+        lines.append(data["session_data"])
+        lines.append("")
+
+    if failed:
+        lines.append("## Not imported")
+        lines.extend(_batch_result_lines(failed, "session_id"))
+
+    return "\n".join(lines)
+
+
+async def share_sessions_with_team(session_ids: list[str], team_id: str, github_handle: str) -> str:
+    """
+    Comparte varias sesiones propias con un equipo en una sola llamada.
+
+    Args:
+        session_ids: UUIDs de las sesiones a compartir
+        team_id: UUID del equipo
+        github_handle: El handle de GitHub del usuario autenticado
+
+    Returns:
+        String con el resultado de cada sesión
+    """
+    client = http_client.get_client()
+    resp = await client.post(
+        f"{API_URL}/teams/{team_id}/sessions/batch",
+        headers=utils.get_api_headers(github_handle),
+        json={"session_ids": session_ids},
+    )
+
+    if resp.status_code == 404:
+        raise ToolError(f"Team '{team_id}' not found.")
+
+    if resp.status_code != 200:
+        detail = resp.json().get("detail") if resp.status_code >= 400 else None
+        utils.handle_api_error(resp.status_code, detail)
+
+    data = resp.json()
+    lines = [f"## Shared {data['shared']} of {len(data['results'])} session(s) with team `{team_id}`\n"]
+    lines.extend(_batch_result_lines(data["results"], "session_id"))
+    return "\n".join(lines)
+
+
+async def share_session_with_teams(session_id: str, team_ids: list[str], github_handle: str) -> str:
+    """
+    Comparte una sesión propia con varios equipos en una sola llamada.
+
+    Args:
+        session_id: UUID de la sesión
+        team_ids: UUIDs de los equipos
+        github_handle: El handle de GitHub del usuario autenticado
+
+    Returns:
+        String con el resultado de cada equipo
+    """
+    client = http_client.get_client()
+    resp = await client.post(
+        f"{API_URL}/sessions/{session_id}/teams",
+        headers=utils.get_api_headers(github_handle),
+        json={"team_ids": team_ids},
+    )
+
+    if resp.status_code == 404:
+        raise ToolError(f"Session '{session_id}' not found.")
+
+    if resp.status_code != 200:
+        detail = resp.json().get("detail") if resp.status_code >= 400 else None
+        utils.handle_api_error(resp.status_code, detail)
+
+    data = resp.json()
+    lines = [f"## Shared session `{session_id}` with {data['shared']} of {len(data['results'])} team(s)\n"]
+    lines.extend(_batch_result_lines(data["results"], "team_id"))
+    return "\n".join(lines)
+
+
+async def add_team_members(
+    team_id: str,
+    github_handles: list[str],
+    github_handle: str,
+    role: str = "member",
+) -> str:
+    """
+    Añade varios miembros a un equipo en una sola llamada.
+
+    Args:
+        team_id: UUID del equipo
+        github_handles: Handles de GitHub de los usuarios a añadir
+        github_handle: El handle de GitHub del usuario autenticado
+        role: Rol de los nuevos miembros ('member' o 'admin')
+
+    Returns:
+        String con el resultado de cada usuario
+    """
+    client = http_client.get_client()
+    resp = await client.post(
+        f"{API_URL}/teams/{team_id}/members/batch",
+        headers=utils.get_api_headers(github_handle),
+        json={"members": [{"github_handle": h.lstrip("@"), "role": role} for h in github_handles]},
+    )
+
+    if resp.status_code == 404:
+        raise ToolError(f"Team '{team_id}' not found.")
+
+    if resp.status_code != 200:
+        detail = resp.json().get("detail") if resp.status_code >= 400 else None
+        utils.handle_api_error(resp.status_code, detail)
+
+    data = resp.json()
+    lines = [f"## Added {data['added']} of {len(data['results'])} member(s) to team `{team_id}`\n"]
+    lines.extend(_batch_result_lines(data["results"], "github_handle"))
+    return "\n".join(lines)
+
+
 async def update_session(
     session_id: str,
     session_data: str,
@@ -302,13 +626,14 @@ async def update_session(
         String con el resultado de la operación
     """
     payload = {"session_data": session_data}
+    body, headers = http_client.encode_json(payload, utils.get_api_headers(github_handle))
 
-    async with httpx.AsyncClient(timeout=30) as client:
-        resp = await client.patch(
-            f"{API_URL}/sessions/{session_id}",
-            headers=utils.get_api_headers(github_handle),
-            json=payload,
-        )
+    client = http_client.get_client()
+    resp = await client.patch(
+        f"{API_URL}/sessions/{session_id}",
+        headers=headers,
+        content=body,
+    )
 
     if resp.status_code == 403:
         raise ToolError("Access denied: only the session owner can update it.")
@@ -329,6 +654,46 @@ async def update_session(
     )
 
 
+def _normalize_session_data(html_content: str) -> str:
+    # Copia de content_service.normalize_session_data de db_api: el sha256 se calcula sobre esto
+    return html_content.replace('\r\n', '\n').replace('\r', '\n').strip()
+
+
+async def _upload_session_data(body: bytes, github_handle: str) -> dict:
+    """
+    Sube el HTML directamente al bucket con una URL prefirmada de db_api.
+
+    Args:
+        body: HTML de la sesión normalizado y codificado en UTF-8
+        github_handle: El handle de GitHub del usuario autenticado
+
+    Returns:
+        Campos sha256 y key para POST /sessions/uploads/finalize
+    """
+    sha256 = hashlib.sha256(body).hexdigest()
+
+    client = http_client.get_client()
+    resp = await client.post(
+        f"{API_URL}/sessions/uploads",
+        headers=utils.get_api_headers(github_handle),
+        json={"sha256": sha256, "size": len(body)},
+    )
+    if resp.status_code != 200:
+        detail = resp.json().get("detail") if resp.status_code >= 400 else None
+        utils.handle_api_error(resp.status_code, detail)
+
+    upload = resp.json()
+    if not upload["upload_required"]:
+        # El usuario ya tiene una sesión con este contenido
+        return {"sha256": sha256}
+
+    put = await client.put(upload["url"], headers=upload["headers"], content=body)
+    if put.status_code >= 300:
+        raise ToolError(f"Could not upload session to storage ({put.status_code})")
+
+    return {"sha256": sha256, "key": upload["key"]}
+
+
 async def export_session(
     title: str,
     description: str,
@@ -354,17 +719,26 @@ async def export_session(
     payload: dict = {
         "title": title,
         "description": description,
-        "session_data": session_data,
     }
     if repo is not None:
         payload["repo"] = repo
 
-    async with httpx.AsyncClient(timeout=30) as client:
-        resp = await client.post(
-            f"{API_URL}/sessions",
-            headers=utils.get_api_headers(github_handle),
-            json=payload,
-        )
+    # El umbral y el size que se declara son en bytes, no en caracteres
+    data = _normalize_session_data(session_data).encode("utf-8")
+    if DIRECT_UPLOAD_MIN_BYTES and len(data) >= DIRECT_UPLOAD_MIN_BYTES:
+        payload.update(await _upload_session_data(data, github_handle))
+        url = f"{API_URL}/sessions/uploads/finalize"
+    else:
+        payload["session_data"] = session_data
+        url = f"{API_URL}/sessions"
+    body, headers = http_client.encode_json(payload, utils.get_api_headers(github_handle))
+
+    client = http_client.get_client()
+    resp = await client.post(
+        url,
+        headers=headers,
+        content=body,
+    )
 
     if resp.status_code == 400:
         detail = resp.json().get("detail", "Bad request")
@@ -384,5 +758,7 @@ async def export_session(
 
     if data.get('report_url'):
         result.append(f"**Report:** {data['report_url']}")
+    elif data.get('report_status') == 'pending':
+        result.append("**Report:** being generated, use import_session later to get the link")
 
     return "\n".join(result)
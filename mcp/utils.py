@@ -1,4 +1,5 @@
 import os
+from typing import Optional
 from fastmcp.exceptions import ToolError
 from fastmcp.server.dependencies import get_access_token
 from dotenv import load_dotenv
@@ -58,3 +59,32 @@ def handle_api_error(status_code: int, detail: str = None) -> None:
         raise ToolError(f"Not found: {detail or 'Resource not found'}")
     elif status_code >= 400:
         raise ToolError(f"API error ({status_code}): {detail or 'Unknown error'}")
+
+
+def page_params(limit: int, cursor: Optional[str] = None) -> dict[str, str | int]:
+    """
+    Genera los query params de paginación por cursor para db_api.
+
+    Args:
+        limit: Tamaño de página
+        cursor: Cursor devuelto por la página anterior (opcional)
+
+    Returns:
+        Dict con limit y, si existe, cursor
+    """
+    params: dict[str, str | int] = {"limit": limit}
+    if cursor:
+        params["cursor"] = cursor
+    return params
+
+
+def append_next_cursor(lines: list[str], next_cursor: Optional[str]) -> None:
+    """
+    Añade al listado la indicación para pedir la página siguiente.
+
+    Args:
+        lines: Líneas del listado formateado
+        next_cursor: Cursor de la página siguiente, o None si es la última
+    """
+    if next_cursor:
+        lines.append(f"_More results available. Call again with cursor=`{next_cursor}`._")